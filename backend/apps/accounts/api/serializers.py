@@ -3,7 +3,7 @@ from rest_framework import serializers
 from rest_framework.response import Response
 from rest_framework.exceptions import AuthenticationFailed
 
-from django.contrib.auth import authenticate
+from django.db.models import F
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.contrib.sites.shortcuts import get_current_site
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -82,9 +82,31 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 
 
 class VerifyEmailSerializer(serializers.Serializer):
+    # Los códigos son por usuario: el email identifica a quién pertenece
+    email = serializers.EmailField(max_length=255, required=True)
     otp = serializers.CharField(max_length=6, required=True)
 
 
+# Campos del Management que se devuelven al iniciar sesión
+MANAGEMENT_PROFILE_FIELDS = ("pk_management", "name", "email", "phone_number", "phone_number_2", "rfc")
+
+
+def get_login_user(email):
+    """
+    User with the given email, annotated with its management profile as
+    management_<field> (None when it has none), in a single query.
+    """
+    return (
+        User.objects.filter(email=email)
+        .annotate(**{
+            f"management_{field}": F(f"management_users__fk_management__{field}")
+            for field in MANAGEMENT_PROFILE_FIELDS
+        })
+        .order_by("management_users__pk_management_user")
+        .first()
+    )
+
+
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
     password = serializers.CharField(
@@ -101,21 +123,18 @@ class LoginSerializer(serializers.Serializer):
     def validate(self, attrs):
         """
         Validate the login credentials.
-        Check if the user exists and the password is correct.
+        The user and its management profile are loaded in one query and the
+        password is hashed exactly once, also for unknown emails so both
+        failures take the same time.
         """
         email = attrs.get("email")
         password = attrs.get("password")
-        request = self.context.get("request")
-        user = authenticate(request=request, email=email, password=password)
 
-        try:
-            user_obj = User.objects.get(email=email)
-            username = user_obj.username
-        except User.DoesNotExist:
+        user = get_login_user(email)
+        if user is None:
+            User().set_password(password)
             raise AuthenticationFailed("Invalid credentials, try again.")
-
-        user = authenticate(request=request, username=username, password=password)
-        if not user:
+        if not user.check_password(password) or not user.is_active:
             raise AuthenticationFailed("Invalid credentials, try again.")
 
         tokens = user.tokens()
@@ -123,22 +142,12 @@ class LoginSerializer(serializers.Serializer):
         if not tokens:
             raise AuthenticationFailed("Token generation failed, try again.")
 
-        # Obtener información del Management asociado al usuario
+        # Información del Management asociado al usuario (vacía si no tiene)
         management_info = {}
-        try:
-            management_user = ManagementUser.objects.get(fk_user=user)
-            management = management_user.fk_management
+        if user.management_pk_management is not None:
             management_info = {
-                "pk_management": management.pk_management,
-                "name": management.name,
-                "email": management.email,
-                "phone_number": management.phone_number,
-                "phone_number_2": management.phone_number_2,
-                "rfc": management.rfc
+                field: getattr(user, f"management_{field}") for field in MANAGEMENT_PROFILE_FIELDS
             }
-        except ManagementUser.DoesNotExist:
-            # El usuario no está asociado a un Management
-            pass
 
         return {
             "access_token": tokens["access"],
@@ -3,13 +3,15 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ReadOnlyModelViewSet
+from django.db import transaction
 from django.utils import timezone
 
 
-from apps.accounts.models import User, OneTimePassword
+from apps.accounts.models import User
 from apps.accounts.api.serializers import UserRegisterSerializer, VerifyEmailSerializer, LoginSerializer, ResetPasswordSerializer, SetNewPasswordSerializer
 from apps.accounts.api.serializers import LogoutUserSerializer, UserListSerializer
-from apps.accounts.utils import send_otp_email
+from apps.accounts.utils import send_otp_email, find_otp
+from apps.core.pagination import KeysetPagination
 
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import smart_str, DjangoUnicodeDecodeError
@@ -30,10 +32,12 @@ class RegisterUserView(GenericAPIView):
         # Validate the serializer data
         # If the data is valid, save the user
         if serializer.is_valid(raise_exception=True):
-            user = serializer.save()
+            # Sin correo en la cola no queda un usuario que no puede verificarse
+            with transaction.atomic():
+                user = serializer.save()
 
-            # Optionally, send an OTP email after user creation
-            send_otp_email(user.email)
+                # Optionally, send an OTP email after user creation
+                send_otp_email(user.email)
 
             # Return a success response with the created user data
             # The user instance is returned by the serializer's save method
@@ -56,32 +60,32 @@ class VerifyUserEmail(GenericAPIView):
     Currently, it does not implement any specific functionality.
     """
     def post(self, request, *args, **kwargs):
-        otp = request.data.get("otp")
-        if not otp:
-            return Response({"message": "OTP is required"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            # Attempt to retrieve the OneTimePassword instance using the provided OTP
-            # If the OTP is valid, it will return the corresponding user
-            otp_instance = OneTimePassword.objects.get(otp=otp)
-
-            # Verify if the OTP has expired
-            # If the current time is greater than the expiration time, return an error
-            if timezone.now() > otp_instance.expires_at:
-                return Response({"message": "OTP has expired"}, status=status.HTTP_400_BAD_REQUEST)
-            user = otp_instance.user            
-
-            # Check if the user is already verified
-            # If not, mark the user as verified
-            if not user.is_verified:
-                user.is_verified = True
-                user.save()
-                return Response({"message": "Account verified successfully"}, status=status.HTTP_200_OK)
-
-            return Response({"message": "Account already verified"}, status=status.HTTP_204_NO_CONTENT)
-        except OneTimePassword.DoesNotExist:
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"message": "Email and OTP are required", "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Busca el código del usuario (usuario + código, ambos con índice único)
+        otp_instance = find_otp(serializer.validated_data["email"], serializer.validated_data["otp"])
+        if otp_instance is None:
             return Response({"message": "Invalid OTP. Does not exist"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Verify if the OTP has expired
+        # If the current time is greater than the expiration time, return an error
+        if timezone.now() > otp_instance.expires_at:
+            return Response({"message": "OTP has expired"}, status=status.HTTP_400_BAD_REQUEST)
+        user = otp_instance.user
+
+        # Check if the user is already verified
+        # If not, mark the user as verified
+        if not user.is_verified:
+            user.is_verified = True
+            user.save(update_fields=["is_verified"])
+            # El código es de un solo uso
+            otp_instance.delete()
+            return Response({"message": "Account verified successfully"}, status=status.HTTP_200_OK)
+
+        return Response({"message": "Account already verified"}, status=status.HTTP_204_NO_CONTENT)
+
 class LoginUserView(GenericAPIView):
     serializer_class = LoginSerializer
 
@@ -217,6 +221,8 @@ class UserViewSet(ReadOnlyModelViewSet):
     """
     queryset = User.objects.filter(is_active=True)
     serializer_class = UserListSerializer
+    pagination_class = KeysetPagination
+    ordering = ('first_name', 'last_name', 'id')
     # Removemos la autenticación requerida para permitir acceso a los filtros
     # permission_classes = [IsAuthenticated]
     
@@ -0,0 +1,123 @@
+"""
+JWT authentication with a cached user.
+
+The user resolved from an access token (with its role and the managements
+it belongs to) is kept in the cache for the remaining lifetime of the
+token, so authenticated requests do not query the User table. Any write
+to the user or to its ManagementUser/CollectorUsers rows deletes the
+entry, so deactivations and role or membership changes apply on the next
+request. Only CACHED_FIELDS are stored, never the password hash; the
+rest of the user is deferred and read from the database if used.
+
+The deletion is a signal: ``QuerySet.update()`` and raw SQL skip it, so
+``is_active``, ``role`` and memberships must change through ``save()``
+and ``delete()``. It also has to reach every server process, so the
+cache is only used when it is shared (setting CACHE_SHARED); with the
+per-process LocMemCache every request reads the user, like
+JWTAuthentication, and the memberships only if a view uses them.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+KEY_PREFIX = 'auth:user:'
+# Lo que usan los permisos y las vistas; la contraseña nunca va a la caché
+CACHED_FIELDS = ('email', 'username', 'first_name', 'last_name', 'role', 'is_active', 'is_staff', 'is_superuser', 'is_verified')
+
+
+def cache_key(user_id):
+    return f'{KEY_PREFIX}{user_id}'
+
+
+def invalidate(user_id):
+    """Drops the cached user so the next request reads it again."""
+    key = cache_key(user_id)
+    cache.delete(key)
+    # Otra vez al confirmar: una petición concurrente pudo guardar el usuario anterior
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def cache_entry(user):
+    """What is cached of an authenticated user (loads its memberships)."""
+    entry = {
+        'fields': {name: getattr(user, name) for name in (user._meta.pk.attname, *CACHED_FIELDS)},
+        'management_ids': user.management_ids,
+        'collector_management_ids': user.collector_management_ids,
+    }
+    if api_settings.CHECK_REVOKE_TOKEN:
+        entry['revoke_hash'] = get_md5_hash_password(user.password)
+    return entry
+
+
+def user_from_entry(entry):
+    """User rebuilt from a cache entry; the fields not cached stay deferred."""
+    from apps.accounts.models import User
+
+    fields = entry['fields']
+    # from_db espera los valores en el orden de los campos del modelo
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in fields]
+    user = User.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
+    # Ocupan el lugar de los cached_property de User: no se consultan
+    user.management_ids = entry['management_ids']
+    user.collector_management_ids = entry['collector_management_ids']
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reads the user from the cache when it is shared.
+    A cached user comes with its ``management_ids`` and
+    ``collector_management_ids`` already loaded.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if not getattr(settings, 'CACHE_SHARED', False):
+            return super().get_user(validated_token)
+
+        key = cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            # Valida que exista y esté activo como JWTAuthentication
+            user = super().get_user(validated_token)
+            timeout = max(int(validated_token['exp'] - time.time()), 1)
+            cache.set(key, cache_entry(user), timeout=timeout)
+            return user
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != entry['revoke_hash']:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user_from_entry(entry)
+
+
+def connect_signals():
+    """Invalidates the cached user on writes to it or to its memberships."""
+    from apps.accounts.models import User
+    from apps.management.models import CollectorUsers, ManagementUser
+
+    def user_changed(sender, instance, **kwargs):
+        invalidate(instance.pk)
+
+    def membership_changed(sender, instance, **kwargs):
+        invalidate(instance.fk_user_id)
+
+    for signal in (post_save, post_delete):
+        signal.connect(user_changed, sender=User, weak=False, dispatch_uid=f'auth_user_{signal is post_save}')
+        for model in (ManagementUser, CollectorUsers):
+            signal.connect(
+                membership_changed, sender=model, weak=False,
+                dispatch_uid=f'auth_{model._meta.label_lower}_{signal is post_save}',
+            )
@@ -0,0 +1,77 @@
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.api.serializers import LoginSerializer
+from apps.accounts.models import User
+from apps.management.models import Management, ManagementUser
+
+EMAIL = 'benchmark-login@example.com'
+PASSWORD = 'benchmark-password-123'
+
+
+def previous_login(email, password):
+    """The login sequence LoginSerializer.validate used before the single-hash path."""
+    authenticate(email=email, password=password)
+    username = User.objects.get(email=email).username
+    user = authenticate(username=username, password=password)
+    try:
+        ManagementUser.objects.get(fk_user=user).fk_management
+    except ManagementUser.DoesNotExist:
+        pass
+    return user.tokens()
+
+
+def current_login(email, password):
+    serializer = LoginSerializer(data={'email': email, 'password': password})
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+class Command(BaseCommand):
+    help = 'Measure logins per second on one core (single process) for the previous and the current login path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Logins per path')
+
+    def handle(self, *args, **options):
+        hasher = type(get_hasher())
+        encode = hasher.encode
+        hashes = []
+
+        def counting_encode(self, *args, **kwargs):
+            hashes.append(1)
+            return encode(self, *args, **kwargs)
+
+        # Usuario temporal: todo se deshace al terminar
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email=EMAIL, username='benchmark-login', first_name='Bench', last_name='Login', password=PASSWORD
+            )
+            management = Management.objects.create(name='Benchmark login', email=EMAIL)
+            ManagementUser.objects.create(fk_management=management, fk_user=user)
+
+            hasher.encode = counting_encode
+            try:
+                for label, login in (('previous', previous_login), ('current', current_login)):
+                    login(EMAIL, PASSWORD)  # calentamiento
+                    hashes.clear()
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        for _ in range(options['requests']):
+                            login(EMAIL, PASSWORD)
+                        seconds = time.perf_counter() - start
+                    count = options['requests']
+                    self.stdout.write(
+                        f'{label:<9} {count / seconds:8.2f} logins/s/core  '
+                        f'{seconds / count * 1000:8.1f} ms/login  '
+                        f'{len(queries) / count:4.1f} queries/login  '
+                        f'{len(hashes) / count:3.1f} hashes/login'
+                    )
+            finally:
+                hasher.encode = encode
+                transaction.set_rollback(True)
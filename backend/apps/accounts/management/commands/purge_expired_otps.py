@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.utils import purge_expired_otps, OTP_PURGE_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Delete expired one-time passwords (schedule it, e.g. every few minutes with cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OTP_PURGE_BATCH_SIZE, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        purged = purge_expired_otps(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {purged} expired OTPs')
+        )
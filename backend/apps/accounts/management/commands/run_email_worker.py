@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.accounts import outbox
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when nothing is due')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between outbox polls')
+
+    def handle(self, *args, **options):
+        sent = outbox.work(once=options['once'], interval=options['interval'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Sent {sent} emails')
+        )
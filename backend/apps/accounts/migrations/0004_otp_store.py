@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def purge_stale_otps(apps, schema_editor):
+    # Antes de la restricción única: sin códigos vencidos y solo el más reciente por usuario
+    OneTimePassword = apps.get_model('accounts', 'OneTimePassword')
+    OneTimePassword.objects.filter(expires_at__lte=timezone.now()).delete()
+    seen = set()
+    stale = []
+    for pk, user_id in OneTimePassword.objects.order_by('-created_at', '-pk').values_list('pk', 'user_id'):
+        if user_id in seen:
+            stale.append(pk)
+        seen.add(user_id)
+    OneTimePassword.objects.filter(pk__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_email_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(purge_stale_otps, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='onetimepassword',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='otp_codes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='onetimepassword',
+            index=models.Index(fields=['expires_at'], name='otp_expiry_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='onetimepassword',
+            constraint=models.UniqueConstraint(fields=('user', 'otp'), name='otp_user_code_uniq'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from .managers import UserManager
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -50,6 +51,28 @@ class User(AbstractUser, PermissionsMixin):
         Returns the full name of the user by combining first and last names.
         """
         return f"{self.first_name} {self.last_name}".strip()
+
+    @cached_property
+    def management_ids(self):
+        """Managements of the user's active ManagementUser rows (one query, on first use)."""
+        from apps.management.models import ManagementUser
+
+        return list(
+            ManagementUser.objects.filter(fk_user=self, is_active=True)
+            .order_by('pk_management_user')
+            .values_list('fk_management_id', flat=True)
+        )
+
+    @cached_property
+    def collector_management_ids(self):
+        """Managements of the user's CollectorUsers rows (one query, on first use)."""
+        from apps.management.models import CollectorUsers
+
+        return list(
+            CollectorUsers.objects.filter(fk_user=self)
+            .order_by('pk_collector_user')
+            .values_list('fk_management_id', flat=True)
+        )
     
     def tokens(self):
         """
@@ -74,7 +97,8 @@ class OneTimePassword(models.Model):
     Model to store One-Time Passwords (OTPs) for user verification.
     This model can be used to implement OTP-based authentication or verification.
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='otp_codes')
+    # Sin índice propio: lo cubre otp_user_code_uniq (user, otp)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='otp_codes', db_index=False)
     otp = models.CharField(max_length=6, verbose_name=_('OTP code'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('created at'))
     expires_at = models.DateTimeField(default=timezone.now, verbose_name=_('expires at'))
@@ -93,4 +117,54 @@ class OneTimePassword(models.Model):
     class Meta:
         verbose_name = _('One-Time Password')
         verbose_name_plural = _('One-Time Passwords')
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        constraints = [
+            # Los códigos son por usuario: la verificación busca (usuario, código)
+            models.UniqueConstraint(fields=['user', 'otp'], name='otp_user_code_uniq'),
+        ]
+        indexes = [
+            # Para purge_expired_otps
+            models.Index(fields=['expires_at'], name='otp_expiry_idx'),
+        ]
+
+class EmailOutbox(models.Model):
+    """
+    Email waiting to be delivered by the run_email_worker command, so
+    requests never wait on the SMTP server (see apps.accounts.outbox).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _('pending')),
+        (STATUS_SENDING, _('sending')),
+        (STATUS_SENT, _('sent')),
+        (STATUS_FAILED, _('failed')),
+    )
+
+    pk_email_outbox = models.BigAutoField(primary_key=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Próximo intento; mientras se envía, hasta cuándo dura la reserva del worker
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'EmailOutbox'
+        verbose_name = _('outgoing email')
+        verbose_name_plural = _('outgoing emails')
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailoutbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
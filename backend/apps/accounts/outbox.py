@@ -0,0 +1,143 @@
+"""
+Email outbox.
+
+Requests only insert an EmailOutbox row, in the transaction of the
+request. The callers that also change data (registration, a new OTP) make
+both writes inside transaction.atomic(), so the email is queued if and
+only if that change commits; enqueue() alone gives no such guarantee.
+The run_email_worker command claims due messages in batches, delivers
+each batch over a single SMTP connection and schedules failures for a
+retry with exponential backoff.
+"""
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.accounts.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 30)
+RETRY_MAX_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX_DELAY', 3600)
+# Tiempo que un worker reserva un lote; si muere, otro lo retoma después
+CLAIM_LEASE = datetime.timedelta(minutes=5)
+
+
+def enqueue(subject, body, recipients, from_email=None):
+    """Queues an email for the outbox worker and returns it."""
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt after ``attempts`` failures."""
+    return min(RETRY_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def claim_batch(limit=None):
+    """
+    Takes up to ``limit`` due messages (pending, or sending with an expired
+    lease) and leases them to this worker. SKIP LOCKED lets several workers
+    poll the table without taking the same messages.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=(EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING),
+                next_attempt_at__lte=now,
+            )
+            .order_by('next_attempt_at')[:limit or BATCH_SIZE]
+        )
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[message.pk for message in batch]).update(
+                status=EmailOutbox.STATUS_SENDING,
+                next_attempt_at=now + CLAIM_LEASE,
+                attempts=F('attempts') + 1,
+            )
+        for message in batch:
+            message.attempts += 1
+    return batch
+
+
+def _failed(message, error):
+    message.last_error = str(error) or error.__class__.__name__
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = EmailOutbox.STATUS_FAILED
+        logger.error('Email %s failed after %s attempts: %s', message.pk, message.attempts, message.last_error)
+    else:
+        message.status = EmailOutbox.STATUS_PENDING
+        message.next_attempt_at = timezone.now() + datetime.timedelta(seconds=retry_delay(message.attempts))
+        logger.warning('Email %s failed (attempt %s), retrying: %s', message.pk, message.attempts, message.last_error)
+    message.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def deliver(batch):
+    """
+    Sends a claimed batch over one connection. Returns the number of
+    messages sent; the rest are rescheduled (or failed after MAX_ATTEMPTS).
+    """
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # Sin conexión con el servidor: todo el lote se reintenta
+        for message in batch:
+            _failed(message, e)
+        return 0
+
+    sent = 0
+    try:
+        for message in batch:
+            try:
+                EmailMessage(
+                    message.subject, message.body, message.from_email, message.recipients, connection=connection
+                ).send()
+            except Exception as e:
+                _failed(message, e)
+                continue
+            message.status = EmailOutbox.STATUS_SENT
+            message.sent_at = timezone.now()
+            message.last_error = ''
+            message.save(update_fields=['status', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def send_pending(limit=None):
+    """Claims and delivers one batch. Returns (claimed, sent)."""
+    batch = claim_batch(limit)
+    if not batch:
+        return 0, 0
+    return len(batch), deliver(batch)
+
+
+def work(once=False, interval=2.0):
+    """
+    Delivers batches until the outbox has nothing due (``once``) or forever,
+    polling every ``interval`` seconds. Returns the number of emails sent.
+    """
+    sent = 0
+    while True:
+        claimed, delivered = send_pending()
+        sent += delivered
+        if claimed:
+            continue
+        if once:
+            return sent
+        time.sleep(interval)
@@ -1,9 +1,25 @@
-from django.test import TestCase
+import socketserver
+import threading
+
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.utils import timezone
-from apps.accounts.models import User, OneTimePassword
+from apps.accounts.models import User, OneTimePassword, EmailOutbox
+from apps.accounts import outbox
+from apps.accounts.utils import find_otp, issue_otp, purge_expired_otps
+from apps.accounts.authentication import CachedJWTAuthentication, cache_key
+from apps.management.models import CollectorUsers
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework.test import APIRequestFactory
+from apps.management.models import Management, ManagementUser
+from django.contrib.auth.hashers import get_hasher
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
 import random
 
 class UserRegistrationTestCase(TestCase):
@@ -58,4 +74,353 @@ class OneTimePasswordModelTestCase(TestCase):
         # Simulamos que ya pasó el tiempo de expiración
         self.otp_instance.expires_at = timezone.now() - timezone.timedelta(minutes=1)
         self.otp_instance.save()
-        self.assertFalse(self.otp_instance.is_valid())
\ No newline at end of file
+        self.assertFalse(self.otp_instance.is_valid())
+
+class VerifyEmailTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('user-verify-email')
+        self.users = [
+            User.objects.create_user(
+                email=f"verify{i}@example.com",
+                username=f"verify{i}",
+                first_name="Verify",
+                last_name=str(i),
+                password="testpassword123",
+            )
+            for i in range(2)
+        ]
+
+    def verify(self, user, otp):
+        return self.client.post(self.url, {"email": user.email, "otp": otp}, format='json')
+
+    def test_same_code_for_two_users_verifies_only_its_owner(self):
+        for user in self.users:
+            OneTimePassword.objects.create(user=user, otp="123456", expires_at=timezone.now() + timezone.timedelta(minutes=5))
+        response = self.verify(self.users[1], "123456")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.users[0].refresh_from_db()
+        self.users[1].refresh_from_db()
+        self.assertFalse(self.users[0].is_verified)
+        self.assertTrue(self.users[1].is_verified)
+        # Un solo uso: el código verificado se borra
+        self.assertEqual(list(OneTimePassword.objects.values_list('user', flat=True)), [self.users[0].pk])
+
+    def test_code_of_another_user_is_rejected(self):
+        OneTimePassword.objects.create(user=self.users[0], otp="654321", expires_at=timezone.now() + timezone.timedelta(minutes=5))
+        response = self.verify(self.users[1], "654321")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_email_is_required(self):
+        response = self.client.post(self.url, {"otp": "123456"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_code_is_rejected(self):
+        OneTimePassword.objects.create(user=self.users[0], otp="111111", expires_at=timezone.now() - timezone.timedelta(minutes=1))
+        response = self.verify(self.users[0], "111111")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["message"], "OTP has expired")
+
+    def test_new_code_replaces_the_previous_one(self):
+        first = issue_otp(self.users[0])
+        second = issue_otp(self.users[0])
+        self.assertEqual(list(OneTimePassword.objects.values_list('pk', flat=True)), [second.pk])
+        if first.otp != second.otp:
+            self.assertEqual(self.verify(self.users[0], first.otp).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.verify(self.users[0], second.otp).status_code, status.HTTP_200_OK)
+
+    def test_lookup_is_one_query_regardless_of_table_size(self):
+        others = User.objects.bulk_create([
+            User(email=f"bulk{i}@example.com", username=f"bulk{i}", first_name="Bulk", last_name=str(i))
+            for i in range(200)
+        ])
+        expires = timezone.now() + timezone.timedelta(minutes=5)
+        OneTimePassword.objects.bulk_create([OneTimePassword(user=user, otp="222222", expires_at=expires) for user in others])
+        OneTimePassword.objects.create(user=self.users[0], otp="222222", expires_at=expires)
+        with CaptureQueriesContext(connection) as queries:
+            otp = find_otp(self.users[0].email, "222222")
+        self.assertEqual(otp.user, self.users[0])
+        self.assertEqual(len(queries), 1)
+
+    def test_purge_deletes_only_expired_codes(self):
+        now = timezone.now()
+        OneTimePassword.objects.create(user=self.users[0], otp="333333", expires_at=now - timezone.timedelta(minutes=1))
+        OneTimePassword.objects.create(user=self.users[0], otp="444444", expires_at=now - timezone.timedelta(hours=1))
+        kept = OneTimePassword.objects.create(user=self.users[1], otp="333333", expires_at=now + timezone.timedelta(minutes=5))
+        self.assertEqual(purge_expired_otps(batch_size=1), 2)
+        self.assertEqual(list(OneTimePassword.objects.values_list('pk', flat=True)), [kept.pk])
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: enough for smtplib, recording messages and connections."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost fake smtp")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                address = line.split(":", 1)[1].strip().strip("<>")
+                if server.refusals.get(address, 0) > 0:
+                    server.refusals[address] -= 1
+                    self.reply("451 Try again later")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline().decode()
+                    if data.rstrip("\r\n") == ".":
+                        break
+                    lines.append(data)
+                server.messages.append((recipients, "".join(lines)))
+                self.reply("250 OK")
+            elif command == "RSET":
+                recipients = []
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.refusals = {}
+
+
+class EmailOutboxTestCase(TestCase):
+    def setUp(self):
+        self.smtp = FakeSMTPServer()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        smtp_settings = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        )
+        smtp_settings.enable()
+        self.addCleanup(smtp_settings.disable)
+
+    def test_registration_queues_otp_without_smtp(self):
+        response = APIClient().post(reverse('user-register'), {
+            "email": "nuevo@example.com",
+            "username": "nuevo",
+            "first_name": "Nuevo",
+            "last_name": "Usuario",
+            "password": "testpassword123",
+            "password2": "testpassword123",
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.smtp.connections, 0)
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.recipients, ["nuevo@example.com"])
+        self.assertIn(OneTimePassword.objects.get().otp, message.body)
+
+    def test_registration_is_rolled_back_without_its_email(self):
+        with mock.patch.object(outbox, 'enqueue', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            APIClient().post(reverse('user-register'), {
+                "email": "nuevo@example.com",
+                "username": "nuevo",
+                "first_name": "Nuevo",
+                "last_name": "Usuario",
+                "password": "testpassword123",
+                "password2": "testpassword123",
+            }, format='json')
+        self.assertFalse(User.objects.filter(email="nuevo@example.com").exists())
+        self.assertFalse(OneTimePassword.objects.exists())
+
+    def test_batch_uses_one_connection(self):
+        for i in range(5):
+            outbox.enqueue("Asunto", f"Mensaje {i}", [f"user{i}@example.com"])
+        self.assertEqual(outbox.work(once=True), 5)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 5)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 5)
+
+    def test_temporary_failure_is_retried_with_backoff(self):
+        self.smtp.refusals["lento@example.com"] = 1
+        message = outbox.enqueue("Asunto", "Mensaje", ["lento@example.com"])
+        outbox.enqueue("Asunto", "Mensaje", ["rapido@example.com"])
+
+        self.assertEqual(outbox.work(once=True), 1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (EmailOutbox.STATUS_PENDING, 1))
+        self.assertGreater(message.next_attempt_at, timezone.now() + timezone.timedelta(seconds=outbox.RETRY_DELAY - 5))
+
+        EmailOutbox.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.work(once=True), 1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (EmailOutbox.STATUS_SENT, 2))
+        self.assertEqual(outbox.retry_delay(3), outbox.RETRY_DELAY * 4)
+
+    def test_unreachable_server_reschedules_batch(self):
+        outbox.enqueue("Asunto", "Mensaje", ["user@example.com"])
+        with override_settings(EMAIL_PORT=1):
+            self.assertEqual(outbox.work(once=True), 0)
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+        self.assertTrue(message.last_error)
+
+    def test_gives_up_after_max_attempts(self):
+        message = outbox.enqueue("Asunto", "Mensaje", ["user@example.com"])
+        EmailOutbox.objects.filter(pk=message.pk).update(attempts=outbox.MAX_ATTEMPTS - 1)
+        self.smtp.refusals["user@example.com"] = 1
+        outbox.work(once=True)
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.STATUS_FAILED)
+
+
+class LoginTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('user-login')
+        self.user = User.objects.create_user(
+            email="login@example.com",
+            username="loginuser",
+            first_name="Log",
+            last_name="In",
+            password="loginpassword123",
+        )
+        self.management = Management.objects.create(name="Gerencia Login", email="gerencia@example.com")
+        ManagementUser.objects.create(fk_management=self.management, fk_user=self.user)
+
+    def login(self, email, password):
+        hasher = type(get_hasher())
+        with mock.patch.object(hasher, 'encode', autospec=True, side_effect=hasher.encode) as encode, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {"email": email, "password": password}, format='json')
+        return response, encode.call_count, len(queries)
+
+    def test_login_hashes_once_in_one_query(self):
+        response, hashes, queries = self.login("login@example.com", "loginpassword123")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((hashes, queries), (1, 1))
+        data = response.data["data"]
+        self.assertEqual(data["user"]["pk"], self.user.pk)
+        self.assertEqual(data["management"]["pk_management"], self.management.pk)
+        self.assertEqual(data["management"]["name"], "Gerencia Login")
+
+    def test_login_without_management(self):
+        ManagementUser.objects.all().delete()
+        response, _, _ = self.login("login@example.com", "loginpassword123")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["management"], {})
+
+    def test_failed_logins_hash_once(self):
+        for email, password in (("login@example.com", "wrongpassword123"), ("nadie@example.com", "loginpassword123")):
+            response, hashes, _ = self.login(email, password)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(hashes, 1)
+
+    def test_inactive_user_cannot_login(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response, _, _ = self.login("login@example.com", "loginpassword123")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(CACHE_SHARED=True)
+class CachedJWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="jwt@example.com", username="jwt", first_name="JWT", last_name="User", password="testpassword123"
+        )
+        self.management = Management.objects.create(name="Gerencia JWT", email="gerencia-jwt@example.com")
+        ManagementUser.objects.create(fk_management=self.management, fk_user=self.user)
+        self.token = self.user.tokens()['access']
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def test_user_is_cached_with_role_and_memberships(self):
+        with CaptureQueriesContext(connection) as queries:
+            user = self.authenticate()
+        self.assertEqual(len(queries), 3)
+        self.assertEqual((user.role, user.management_ids, user.collector_management_ids), ("management", [self.management.pk], []))
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.management_ids), (self.user.pk, [self.management.pk]))
+
+    def test_user_change_invalidates_the_entry(self):
+        self.authenticate()
+        self.user.role = "collector"
+        self.user.save()
+        self.assertEqual(self.authenticate().role, "collector")
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_membership_change_invalidates_the_entry(self):
+        self.authenticate()
+        CollectorUsers.objects.create(fk_management=self.management, fk_user=self.user, name="Col", last_name="Lector")
+        self.assertEqual(self.authenticate().collector_management_ids, [self.management.pk])
+        ManagementUser.objects.filter(fk_user=self.user).get().delete()
+        self.assertEqual(self.authenticate().management_ids, [])
+
+    def test_password_hash_is_not_cached(self):
+        self.authenticate()
+        entry = cache.get(cache_key(self.user.pk))
+        self.assertNotIn(self.user.password, str(entry))
+        user = self.authenticate()
+        self.assertIn('password', user.get_deferred_fields())
+        # Guardar el usuario de la caché solo escribe los campos cargados
+        user.first_name = "Cambiado"
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Cambiado")
+        self.assertTrue(self.user.check_password("testpassword123"))
+
+    # simplejwt reemplaza api_settings al cambiar SIMPLE_JWT y los módulos conservan el anterior
+    @mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True)
+    def test_changed_password_revokes_the_token(self):
+        old_token = self.user.tokens()['access']
+        self.user.set_password("otrapassword456")
+        self.user.save()
+        # El token nuevo guarda en la caché la marca de la contraseña nueva
+        self.token = self.user.tokens()['access']
+        self.authenticate()
+        self.token = old_token
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_is_not_used(self):
+        # Cada worker tendría su copia y no vería las invalidaciones de los demás
+        for _ in range(2):
+            # Solo el usuario, como JWTAuthentication; las gerencias al usarlas
+            with self.assertNumQueries(1):
+                user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.management_ids, [self.management.pk])
+        self.assertIsNone(cache.get(cache_key(self.user.pk)))
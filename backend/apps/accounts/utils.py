@@ -1,7 +1,8 @@
 import random
-from django.core.mail import EmailMessage
 from .models import User, OneTimePassword
+from . import outbox
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 import logging
 
@@ -13,35 +14,70 @@ def generate_otp():
     return str(random.randint(100000, 999999))
 
 
-def send_otp_email(email):
-    """Sends an OTP to the specified email address."""
-    user = User.objects.filter(email=email).first()
-    otp_code = generate_otp()
-    
-    subject = "Your OTP Code"
-    message = f"Your OTP code is: {otp_code}"
-    from_email = settings.DEFAULT_FROM_EMAIL
+OTP_TTL = getattr(settings, 'OTP_TTL_MINUTES', 5)
+OTP_PURGE_BATCH_SIZE = 1000
 
-    OneTimePassword.objects.create(
+
+def issue_otp(user):
+    """
+    Stores a new OTP for the user, replacing the previous ones, so the
+    table holds at most one code per user until purge_expired_otps runs.
+    """
+    OneTimePassword.objects.filter(user=user).delete()
+    return OneTimePassword.objects.create(
         user=user,
-        otp=otp_code,
-        expires_at=timezone.now() + timezone.timedelta(minutes=5),
+        otp=generate_otp(),
+        expires_at=timezone.now() + timezone.timedelta(minutes=OTP_TTL),
     )
-    try:
-        email_message = EmailMessage(subject, message, from_email, [email])
-        email_message.send(fail_silently=False)
-    except Exception as e:
-        logger.error(f"Error sending OTP email: {e}")
+
+
+def find_otp(email, otp):
+    """
+    The OTP ``otp`` of the user with ``email`` (with its user), or None.
+    One query over the unique indexes of User.email and (user, otp), so
+    it does not depend on how many codes the table holds.
+    """
+    return (
+        OneTimePassword.objects.select_related('user')
+        .filter(user__email=email, otp=otp)
+        .first()
+    )
+
+
+def purge_expired_otps(batch_size=OTP_PURGE_BATCH_SIZE):
+    """Deletes expired OTPs in batches (otp_expiry_idx). Returns how many."""
+    purged = 0
+    now = timezone.now()
+    while True:
+        batch = list(
+            OneTimePassword.objects.filter(expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return purged
+        purged += OneTimePassword.objects.filter(pk__in=batch).delete()[0]
+
+
+def send_otp_email(email):
+    """Creates an OTP for the user and queues it to the specified email address."""
+    user = User.objects.filter(email=email).first()
+    # El código y su correo se guardan juntos o ninguno de los dos
+    with transaction.atomic():
+        otp_code = issue_otp(user).otp
+
+        subject = "Your OTP Code"
+        message = f"Your OTP code is: {otp_code}"
+        from_email = settings.DEFAULT_FROM_EMAIL
+
+        # Se entrega en segundo plano (run_email_worker)
+        outbox.enqueue(subject, message, [email], from_email)
 
 def send_normal_email(data):
-    """Sends a normal email with the provided data."""
+    """Queues a normal email with the provided data (delivered by run_email_worker)."""
     subject = data.get('subject', 'No Subject')
     message = data.get('message', 'No Message')
     from_email = settings.EMAIL_HOST_USER or settings.DEFAULT_FROM_EMAIL
     recipient_list = data.get('recipient_list', [])
 
-    try:
-        email_message = EmailMessage(subject, message, from_email, recipient_list)
-        email_message.send(fail_silently=False)
-    except Exception as e:
-        logger.error(f"Error sending normal email: {e}")
+    outbox.enqueue(subject, message, recipient_list, from_email)
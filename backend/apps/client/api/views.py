@@ -3,10 +3,13 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from apps.client.api.serializer import ClientSerializer, ClientsLocationsSerializer, ClientsUsersSerializer, ClientLocationCreateSerializer
 from apps.client.models import Client, ClientsLocations, ClientsUsers
+from apps.core.pagination import KeysetPagination
 
 class ClientViewSet(viewsets.ModelViewSet):
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
+    pagination_class = KeysetPagination
+    ordering = ('name', 'pk_client')
 
 class ClientsLocationsViewSet(viewsets.ModelViewSet):
     queryset = ClientsLocations.objects.all()
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0001_initial'),
+        ('management', '0003_collectorusers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='client',
+            name='fk_management',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='management.management'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['fk_management', 'name', 'pk_client'], name='client_management_name_idx'),
+        ),
+    ]
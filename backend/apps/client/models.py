@@ -6,7 +6,7 @@ from apps.accounts.models import User
 # Create your models here
 class Client(models.Model):
     pk_client = models.AutoField(primary_key=True)
-    fk_management = models.ForeignKey(Management, on_delete=models.CASCADE)
+    fk_management = models.ForeignKey(Management, on_delete=models.CASCADE, db_index=False)  # Cubierto por client_management_name_idx
     
     name = models.CharField(max_length=255, unique=True)
     legal_name = models.CharField(max_length=255, unique=True)
@@ -19,6 +19,12 @@ class Client(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True) 
 
+    class Meta:
+        indexes = [
+            # Clientes de una gerencia, ordenados por nombre
+            models.Index(fields=['fk_management', 'name', 'pk_client'], name='client_management_name_idx'),
+        ]
+
 class ClientsLocations(models.Model):
     pk_client_location = models.AutoField(primary_key=True)
     fk_client = models.ForeignKey(Client, on_delete=models.CASCADE)
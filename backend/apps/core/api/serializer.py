@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from apps.core.models import Location
+from apps.core import geo, search, uploads
+from apps.core.models import ChunkedUpload, Location
 
 class LocationSerializer(serializers.ModelSerializer):
     """
@@ -9,7 +10,7 @@ class LocationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Location
-        fields = '__all__'  # Include all fields from the Location model
+        exclude = ['geo_cell']  # Include all fields from the Location model but the grid cell
         #read_only_fields = ['pk_location', 'created_at', 'updated_at', 'is_active']  # Make these fields read-only
     
     def validate_interior_number(self, value):
@@ -36,6 +37,18 @@ class LocationSerializer(serializers.ModelSerializer):
             return None
         return value
 
+    def validate(self, attrs):
+        """Latitude and longitude go together."""
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError('Latitude and longitude must be given together.')
+        return attrs
+
+class NearbyLocationSerializer(LocationSerializer):
+    """Location with its distance in km to the searched point."""
+    distance_km = serializers.FloatField(read_only=True)
+
 class LocationForServiceSerializer(serializers.ModelSerializer):
     """
     Serializer for locations in service forms.
@@ -48,7 +61,72 @@ class LocationForServiceSerializer(serializers.ModelSerializer):
         fields = ['pk_location', 'name', 'city', 'state', 'client_ids']
     
     def get_client_ids(self, obj):
-        """Return the IDs of clients associated with this location."""
+        """
+        Return the IDs of clients associated with this location. Views that
+        serialize many locations pass the mapping precomputed in
+        context['client_ids'] ({pk_location: [pk_client, ...]}).
+        """
+        client_ids = self.context.get('client_ids')
+        if client_ids is not None:
+            return client_ids.get(obj.pk_location, [])
         from apps.client.models import ClientsLocations
-        client_locations = ClientsLocations.objects.filter(fk_location=obj)
-        return [cl.fk_client.pk_client for cl in client_locations]
\ No newline at end of file
+        return list(ClientsLocations.objects.filter(fk_location=obj).values_list('fk_client_id', flat=True))
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Query parameters of the typeahead search."""
+    q = serializers.CharField(min_length=2, max_length=100)
+    types = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=search.MAX_LIMIT, default=search.DEFAULT_LIMIT)
+    management = serializers.IntegerField(required=False)
+
+    def validate_q(self, value):
+        if not search.terms(value):
+            raise serializers.ValidationError('Debe contener letras o números.')
+        return value
+
+    def validate_types(self, value):
+        types = [part.strip() for part in value.split(',') if part.strip()]
+        unknown = sorted(set(types) - set(search.TARGETS))
+        if unknown:
+            raise serializers.ValidationError(f"Tipos no válidos: {', '.join(unknown)}.")
+        return types
+
+class GeoPointQuerySerializer(serializers.Serializer):
+    """Point of the radius and nearest-neighbour queries."""
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+
+class NearbyQuerySerializer(GeoPointQuerySerializer):
+    """Query parameters of the radius search."""
+    radius_km = serializers.FloatField(min_value=0, max_value=geo.MAX_RADIUS_KM)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=50)
+
+class NearestQuerySerializer(GeoPointQuerySerializer):
+    """Query parameters of the k-nearest search."""
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    """Resumable upload: the client sends the chunks from ``offset`` on, up to ``chunk_size`` bytes each."""
+    size = serializers.IntegerField(min_value=1, max_value=uploads.MAX_SIZE)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ['pk_upload', 'filename', 'size', 'sha256', 'offset', 'status', 'file', 'chunk_size', 'created_at', 'updated_at']
+        read_only_fields = ('offset', 'status', 'file')
+
+    def get_chunk_size(self, obj):
+        return uploads.MAX_CHUNK_SIZE
+
+    def validate_sha256(self, value):
+        return value.lower()
+
+class CompletedUploadField(serializers.PrimaryKeyRelatedField):
+    """Id of a completed ChunkedUpload, to attach its file to a document field."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', ChunkedUpload.objects.filter(status=ChunkedUpload.STATUS_COMPLETE))
+        kwargs.setdefault('write_only', True)
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
@@ -1,10 +1,16 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from apps.core.api.views import LocationViewSet
+from apps.core.api.views import ChunkedUploadViewSet, LocationViewSet, search_view
 
 # Create a router and register the LocationViewSet with it
 router = DefaultRouter()
 router.register(r'locations', LocationViewSet, basename='location')
+router.register(r'uploads', ChunkedUploadViewSet, basename='upload')
 
 # Define the URL patterns for the core app
-urlpatterns = router.urls
+urlpatterns = [
+    path('search/', search_view, name='search'),
+]
+
+urlpatterns += router.urls
 
@@ -1,6 +1,10 @@
-from rest_framework import viewsets
-from apps.core.api.serializer import LocationSerializer
-from apps.core.models import Location
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action, api_view
+from rest_framework.response import Response
+from apps.core import geo, search, uploads
+from apps.core.api.serializer import ChunkedUploadSerializer, LocationSerializer, NearbyLocationSerializer, NearbyQuerySerializer, NearestQuerySerializer, SearchQuerySerializer
+from apps.core.models import ChunkedUpload, Location
+from apps.core.pagination import KeysetPagination
 
 class LocationViewSet(viewsets.ModelViewSet):
     """
@@ -9,4 +13,79 @@ class LocationViewSet(viewsets.ModelViewSet):
     """
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
-    http_method_names = ['get', 'post', 'put', 'patch', 'delete']  # Specify allowed HTTP methods
\ No newline at end of file
+    pagination_class = KeysetPagination
+    ordering = ('name', 'pk_location')
+    http_method_names = ['get', 'post', 'put', 'patch', 'delete']  # Specify allowed HTTP methods
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Locations within ``radius_km`` of ``latitude``/``longitude``, closest first."""
+        query = NearbyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        locations = geo.within(
+            self.get_queryset(), params['latitude'], params['longitude'], params['radius_km'],
+        )[:params['limit']]
+        return Response(NearbyLocationSerializer(locations, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        """The ``k`` locations closest to ``latitude``/``longitude``."""
+        query = NearestQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        locations = geo.nearest(self.get_queryset(), params['latitude'], params['longitude'], params['k'])
+        return Response(NearbyLocationSerializer(locations, many=True).data)
+
+
+class ChunkedUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads (apps.core.uploads). POST creates the upload, PATCH
+    sends the next chunk as the raw request body with its ``Upload-Offset``
+    header, GET tells where to resume and DELETE cancels it.
+    """
+    queryset = ChunkedUpload.objects.all()
+    serializer_class = ChunkedUploadSerializer
+    http_method_names = ['get', 'post', 'patch', 'delete']
+
+    def perform_create(self, serializer):
+        user = self.request.user if self.request.user.is_authenticated else None
+        serializer.save(fk_user=user)
+
+    def partial_update(self, request, pk=None):
+        """Appends the request body at ``Upload-Offset``; the last chunk completes the upload."""
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({'error': 'La cabecera "Upload-Offset" debe ser un entero.'}, status=status.HTTP_400_BAD_REQUEST)
+        upload = self.get_object()
+        try:
+            # Se lee el cuerpo en crudo por bloques: request.data lo cargaría completo en memoria
+            upload = uploads.append_chunk(upload.pk, offset, request.stream, length)
+        except uploads.OffsetMismatch as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+        except uploads.ChunkTooLarge as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except uploads.UploadClosed as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        if upload.status == ChunkedUpload.STATUS_FAILED:
+            return Response({'error': 'El SHA-256 del archivo no coincide con el declarado.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(upload).data)
+
+    def perform_destroy(self, instance):
+        uploads.discard(instance)
+
+@api_view(['GET'])
+def search_view(request):
+    """
+    Typeahead search. ``?q=`` matches clients (name, legal name, RFC),
+    locations (name, street, neighborhood, city, postcode) and service
+    numbers; ``?types=`` limits the targets and ``?management=`` the records.
+    """
+    query = SearchQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+    return Response(search.search(
+        params['q'], params.get('types'), params['limit'], params.get('management'),
+    ))
@@ -0,0 +1,167 @@
+"""
+Versioned cache for reference catalogs (statuses, service types, wastes...).
+
+Every catalog has a version stored in the cache (``catalog:version:<name>``,
+e.g. ``waste`` or ``management_waste:3``). A write to one of its models
+bumps the version through a signal, so cached responses are never deleted:
+their keys include the versions and simply stop being read.
+
+The versions also give the HTTP validators: the ETag is a hash of the
+versions and the URL, and Last-Modified is the time of the latest bump.
+A revalidation with a matching If-None-Match / If-Modified-Since gets a
+304 without touching the database, and a miss is built once and served
+from the cache until the next write.
+
+A bump only reaches the processes that share the cache: with a
+per-process cache (CACHE_SHARED off, the LocMemCache default) the other
+workers would keep serving the old catalog, so nothing is cached and
+every request is built.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+VERSION_PREFIX = 'catalog:version:'
+DATA_PREFIX = 'catalog:data:'
+# Las respuestas de versiones viejas nunca se vuelven a leer; que expiren solas
+DATA_TIMEOUT = 24 * 60 * 60
+
+
+def is_shared():
+    """Whether every server process sees the same cache (setting CACHE_SHARED)."""
+    return getattr(settings, 'CACHE_SHARED', False)
+
+
+def get_versions(names):
+    """Current version of each catalog (nanosecond timestamps), creating the missing ones."""
+    keys = [VERSION_PREFIX + name for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*names):
+    """Invalidates every cached response that depends on the given catalogs."""
+    now = time.time_ns()
+    cache.set_many({VERSION_PREFIX + name: now for name in names}, timeout=None)
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or any(value.removeprefix('W/') == etag for value in candidates)
+
+
+def cached_response(request, names, build):
+    """
+    Serves ``build()`` (a view call returning a Response) from the cache of
+    the ``names`` catalogs, answering revalidations with 304.
+    """
+    if not is_shared():
+        return build()
+    versions = get_versions(names)
+    url = request.build_absolute_uri()
+    signature = hashlib.md5(f'{names}:{versions}:{url}'.encode()).hexdigest()
+    etag = f'"{signature}"'
+    last_modified = max(versions) // 1_000_000_000
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        not_modified = since is not None and last_modified <= since
+
+    if not_modified:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = cache.get(DATA_PREFIX + signature)
+        if data is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            # Datos planos (sin ReturnList/serializer) para poder guardarlos en el caché
+            data = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+            cache.set(DATA_PREFIX + signature, data, timeout=DATA_TIMEOUT)
+        response = Response(data)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+class CatalogCacheMixin:
+    """
+    Caches the GET actions (list/retrieve) of a viewset. ``catalogs`` lists
+    the catalogs the responses depend on; override ``get_catalogs`` when
+    they depend on the request (e.g. on the management).
+    """
+    catalogs = ()
+
+    def get_catalogs(self):
+        return list(self.catalogs)
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, self.get_catalogs(), lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(request, self.get_catalogs(), lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs))
+
+
+def _invalidate(catalogs):
+    def receiver(sender, instance, **kwargs):
+        names = catalogs(instance)
+        bump(*names)
+        # Otra vez al confirmar: una lectura concurrente pudo guardar los datos
+        # anteriores a la escritura con la versión nueva
+        transaction.on_commit(lambda: bump(*names))
+    return receiver
+
+
+def _remember_management(sender, instance, raw=False, **kwargs):
+    """Keeps the stored management of a row: moving it changes two managements' catalogs."""
+    instance._catalog_management = None
+    if not raw and instance.pk is not None:
+        instance._catalog_management = sender.objects.filter(pk=instance.pk).values_list('fk_management_id', flat=True).first()
+
+
+def _managements(instance):
+    """Management of the row and, after a move, the one it had before."""
+    return sorted({instance.fk_management_id, getattr(instance, '_catalog_management', None)} - {None})
+
+
+def connect_signals():
+    """Bumps the catalog versions whenever one of their models is written."""
+    from apps.management.models import ManagementWaste
+    from apps.services.models import Status, TypeServices
+    from apps.waste.models import Waste, WasteSubCategory
+
+    invalidations = {
+        Status: lambda instance: ['status'],
+        TypeServices: lambda instance: ['type_services', *(f'type_services:{pk}' for pk in _managements(instance))],
+        Waste: lambda instance: ['waste'],
+        WasteSubCategory: lambda instance: ['waste'],
+        ManagementWaste: lambda instance: [f'management_waste:{pk}' for pk in _managements(instance)],
+    }
+    for model in (TypeServices, ManagementWaste):
+        pre_save.connect(_remember_management, sender=model, dispatch_uid=f'catalog_{model._meta.label_lower}_pre_save')
+    for model, catalogs in invalidations.items():
+        receiver = _invalidate(catalogs)
+        for signal in (post_save, post_delete):
+            signal.connect(receiver, sender=model, weak=False, dispatch_uid=f'catalog_{model._meta.label_lower}_{signal is post_save}')
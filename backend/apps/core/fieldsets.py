@@ -0,0 +1,107 @@
+"""
+Sparse fieldsets and opt-in expansion of nested relations.
+
+``?fields=a,b`` limits a GET response to those fields and ``?expand=x,y.z``
+lists the relations embedded as full objects (a dotted path expands a
+relation of an expanded object); the relations that are not expanded are
+returned as their ids. Without either parameter a serializer keeps its
+full nested representation, so existing clients are not affected.
+
+The queryset follows the requested shape: ``select_related_for`` returns
+only the joins that the returned fields and expansions read, so a list
+that asks for ids and names joins just the tables of those names.
+"""
+ALL = '*'
+
+
+def parse_list(value):
+    """Comma-separated query parameter as a set (None when absent)."""
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+def nested(expand, field):
+    """Expansions of the object embedded in ``field``."""
+    if expand == ALL:
+        return ALL
+    prefix = f'{field}.'
+    return {path[len(prefix):] for path in expand if path.startswith(prefix)}
+
+
+class ExpandableFieldsMixin:
+    """
+    Serializer mixin. ``expandable_fields`` maps a relation to the
+    serializer that embeds it and the joins that serializer needs
+    (``{'fk_clients': (ClientSerializer, ())}``); ``optional_fields`` maps
+    extra read-only fields, only returned when listed in ``?fields=``, to
+    the relation they read (``{'client_name': 'fk_clients'}``).
+    """
+    expandable_fields = {}
+    optional_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            fields, expand = self.requested_shape(self.context.get('request'))
+        self.expand = ALL if expand is None else expand
+
+        for name in list(self.fields):
+            if name in self.optional_fields and (fields is None or name not in fields):
+                self.fields.pop(name)
+            elif fields is not None and name not in fields:
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_shape(cls, request):
+        """
+        (fields, expand) asked for by a GET request; (None, ALL) (the full
+        representation) otherwise. Writes always answer with the full object.
+        """
+        if request is None or request.method != 'GET':
+            return None, ALL
+        fields = parse_list(request.query_params.get('fields'))
+        expand = parse_list(request.query_params.get('expand'))
+        if expand is None:
+            # Con ?fields= y sin ?expand= las relaciones van como ids
+            expand = ALL if fields is None else set()
+        elif ALL in expand:
+            expand = ALL
+        return fields, expand
+
+    @classmethod
+    def select_related_for(cls, fields=None, expand=ALL, prefix=''):
+        """Joins needed to serialize ``fields`` with ``expand`` without extra queries."""
+        paths = []
+        for field, (serializer, joins) in cls.expandable_fields.items():
+            if fields is not None and field not in fields:
+                continue
+            if expand != ALL and field not in expand:
+                continue
+            paths.append(prefix + field)
+            paths += [f'{prefix}{field}__{join}' for join in joins]
+            if issubclass(serializer, ExpandableFieldsMixin):
+                paths += serializer.select_related_for(None, nested(expand, field), f'{prefix}{field}__')
+        for field, relation in cls.optional_fields.items():
+            if fields is not None and field in fields:
+                paths.append(prefix + relation)
+        return paths
+
+    @classmethod
+    def select_related_for_request(cls, request):
+        fields, expand = cls.requested_shape(request)
+        return cls.select_related_for(fields, expand)
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        for field, (serializer, _) in self.expandable_fields.items():
+            if field not in representation or (self.expand != ALL and field not in self.expand):
+                continue
+            related = getattr(instance, field)
+            if related is None:
+                representation[field] = None
+            elif issubclass(serializer, ExpandableFieldsMixin):
+                representation[field] = serializer(related, context=self.context, expand=nested(self.expand, field)).data
+            else:
+                representation[field] = serializer(related, context=self.context).data
+        return representation
@@ -0,0 +1,113 @@
+"""
+Radius and nearest-neighbour queries over Location coordinates.
+
+Without PostGIS, locations are bucketed in a fixed grid of CELL_DEGREES
+(about 1.1 km of latitude): ``Location.geo_cell`` holds the number of the
+cell (row-major, rows by latitude) and has a btree index. The cells of one
+grid row are consecutive numbers, so the cells around a point are a few
+``BETWEEN`` ranges, one per row of the bounding box, that the index serves
+directly. The exact haversine distance is then computed only for the
+locations of those cells. The same code runs on PostgreSQL and SQLite.
+
+A k-nearest query searches a radius that doubles until it holds ``k``
+locations: every location outside that radius is farther than the ones
+inside, so the result is exact.
+"""
+import math
+
+from django.conf import settings
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEGREES = 0.01
+COLUMNS = round(360 / CELL_DEGREES)
+ROWS = round(180 / CELL_DEGREES)
+MAX_RADIUS_KM = getattr(settings, 'LOCATIONS_MAX_RADIUS_KM', 200)
+NEAREST_START_KM = 2
+
+
+def cell(latitude, longitude):
+    """Grid cell of a point (None without coordinates)."""
+    if latitude is None or longitude is None:
+        return None
+    row = min(int((latitude + 90) // CELL_DEGREES), ROWS - 1)
+    column = int((longitude + 180) // CELL_DEGREES) % COLUMNS
+    return row * COLUMNS + column
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """(first, last) cell ranges covering the circle of ``radius_km`` around the point."""
+    delta_latitude = math.degrees(radius_km / EARTH_RADIUS_KM)
+    first_row = max(int((latitude - delta_latitude + 90) // CELL_DEGREES), 0)
+    last_row = min(int((latitude + delta_latitude + 90) // CELL_DEGREES), ROWS - 1)
+
+    # El ancho en longitud crece hacia los polos: se usa la latitud más alejada del ecuador
+    widest = min(abs(latitude) + delta_latitude, 90)
+    cos_widest = math.cos(math.radians(widest))
+    if cos_widest < 1e-9 or radius_km / (EARTH_RADIUS_KM * cos_widest) >= math.pi:
+        columns = [(0, COLUMNS - 1)]
+    else:
+        delta_longitude = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_widest))
+        first_column = int((longitude - delta_longitude + 180) // CELL_DEGREES)
+        last_column = int((longitude + delta_longitude + 180) // CELL_DEGREES)
+        if first_column < 0:
+            # Cruza el antimeridiano: dos tramos por fila
+            columns = [(first_column % COLUMNS, COLUMNS - 1), (0, last_column)]
+        elif last_column >= COLUMNS:
+            columns = [(first_column, COLUMNS - 1), (0, last_column % COLUMNS)]
+        else:
+            columns = [(first_column, last_column)]
+
+    return [
+        (row * COLUMNS + first, row * COLUMNS + last)
+        for row in range(first_row, last_row + 1)
+        for first, last in columns
+    ]
+
+
+def distance_km(latitude, longitude, prefix=''):
+    """Haversine distance in km from the point to the ``{prefix}latitude/longitude`` of each row."""
+    row_latitude = Radians(F(f'{prefix}latitude'))
+    row_longitude = Radians(F(f'{prefix}longitude'))
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    half_chord = (
+        Power(Sin((row_latitude - Value(latitude)) / 2), 2)
+        + Value(math.cos(latitude)) * Cos(row_latitude) * Power(Sin((row_longitude - Value(longitude)) / 2), 2)
+    )
+    # Least: el redondeo puede pasar de 1 en puntos casi antípodas y ASIN fallaría
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(half_chord), Value(1.0)), output_field=FloatField())
+
+
+def within(queryset, latitude, longitude, radius_km, prefix=''):
+    """
+    Rows of ``queryset`` whose ``{prefix}`` location is within ``radius_km``
+    of the point, annotated with ``distance_km`` and ordered by it.
+    """
+    cells = Q.create(
+        [(f'{prefix}geo_cell__range', cell_range) for cell_range in cell_ranges(latitude, longitude, radius_km)],
+        Q.OR,
+    )
+    return (
+        queryset.filter(cells)
+        .annotate(distance_km=distance_km(latitude, longitude, prefix))
+        .filter(distance_km__lte=radius_km)
+        .order_by('distance_km')
+    )
+
+
+def nearest(queryset, latitude, longitude, k, prefix=''):
+    """The ``k`` rows of ``queryset`` closest to the point, with ``distance_km``."""
+    radius = NEAREST_START_KM
+    while radius < MAX_RADIUS_KM:
+        rows = list(within(queryset, latitude, longitude, radius, prefix)[:k])
+        if len(rows) == k:
+            return rows
+        radius *= 2
+    # Más allá de MAX_RADIUS_KM la rejilla ya no filtra: se ordena todo lo que tiene coordenadas
+    return list(
+        queryset.filter(**{f'{prefix}geo_cell__isnull': False})
+        .annotate(distance_km=distance_km(latitude, longitude, prefix))
+        .order_by('distance_km')[:k]
+    )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.core.uploads import EXPIRE_HOURS, purge_stale_uploads
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads not touched in the last hours, with their part files (schedule it, e.g. hourly with cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=EXPIRE_HOURS, help='Hours without new chunks before an upload is deleted')
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(options['hours'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {purged} stale uploads')
+        )
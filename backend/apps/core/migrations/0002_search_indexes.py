@@ -0,0 +1,81 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, transaction
+
+
+# Modelo -> (índice tsvector, columnas del tsvector, {columna: índice pg_trgm})
+# Las columnas del tsvector son las de apps.core.search.TARGETS
+SEARCH_INDEXES = {
+    ('client', 'Client'): (
+        'client_search_idx',
+        ('name', 'legal_name', 'rfc'),
+        {'name': 'client_name_trgm_idx', 'legal_name': 'client_legal_name_trgm_idx', 'rfc': 'client_rfc_trgm_idx'},
+    ),
+    ('core', 'Location'): (
+        'location_search_idx',
+        ('name', 'street_name', 'neighborhood', 'city', 'postcode'),
+        {
+            'name': 'location_name_trgm_idx',
+            'street_name': 'location_street_trgm_idx',
+            'neighborhood': 'location_neighborhood_trgm_idx',
+        },
+    ),
+    ('services', 'Services'): (
+        'services_search_idx',
+        ('service_number',),
+        {'service_number': 'services_number_trgm_idx'},
+    ),
+}
+
+
+def indexes(apps, trigram):
+    for (app_label, model_name), (name, vector_fields, trigram_indexes) in SEARCH_INDEXES.items():
+        model = apps.get_model(app_label, model_name)
+        yield model, GinIndex(SearchVector(*vector_fields, config='simple'), name=name)
+        if trigram:
+            for field, trigram_name in trigram_indexes.items():
+                yield model, GinIndex(OpClass(field, name='gin_trgm_ops'), name=trigram_name)
+
+
+def install_trigram(schema_editor):
+    """Creates pg_trgm when the server ships it; the search works without it."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return False
+        try:
+            # Punto de guardado: sin permisos para CREATE EXTENSION la migración sigue
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except Exception:
+            return False
+    return True
+
+
+def create_indexes(apps, schema_editor):
+    # Solo PostgreSQL: las demás bases usan la búsqueda sin índice
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model, index in indexes(apps, install_trigram(schema_editor)):
+        schema_editor.add_index(model, index)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for model, index in indexes(apps, trigram=True):
+            cursor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index.name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('client', '0002_hot_query_indexes'),
+        ('services', '0013_services_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,5 +1,12 @@
+import uuid
+
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from apps.core import geo
+from apps.core.storage import get_content_addressed_storage
+
 # Create your models here.
 class Location(models.Model):
     """
@@ -17,10 +24,69 @@ class Location(models.Model):
     state = models.CharField(max_length=100, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Celda de la rejilla de apps.core.geo; se calcula en save()
+    geo_cell = models.IntegerField(blank=True, null=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Consultas por radio y vecinos más cercanos (apps.core.geo)
+            models.Index(fields=['geo_cell'], name='location_geo_cell_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = geo.cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+        super().save(*args, **kwargs)
+
+
+class ChunkedUpload(models.Model):
+    """
+    File sent in chunks that can be resumed after a dropped connection
+    (see apps.core.uploads). Once complete, ``file`` points to the
+    content-addressed copy and the upload can be attached to a document
+    field by its id.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETE = 'complete'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'En curso'),
+        (STATUS_COMPLETE, 'Completa'),
+        (STATUS_FAILED, 'Fallida'),
+    )
+
+    # UUID: el id es lo único que el cliente necesita para reanudar, no debe poder adivinarse
+    pk_upload = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fk_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Bytes recibidos: el siguiente fragmento debe empezar aquí
+    offset = models.BigIntegerField(default=0)
+    # SHA-256 declarado por el cliente (opcional); se comprueba al completar
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.FileField(upload_to='uploads/', storage=get_content_addressed_storage, blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ChunkedUpload'
+        indexes = [
+            # Para purge_stale_uploads
+            models.Index(fields=['updated_at'], name='chunkedupload_stale_idx'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"ChunkedUpload {self.pk_upload} - {self.filename} ({self.offset}/{self.size})"
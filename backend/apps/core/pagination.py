@@ -0,0 +1,137 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a composite key.
+
+    DRF's CursorPagination only seeks on the first ordering field and falls
+    back to OFFSET for ties, so a page inside a large group of equal values
+    (e.g. many services on the same date) gets slower the deeper it is.
+    Here the cursor stores the value of every ordering field and the page
+    is located with a lexicographic WHERE clause, so every page costs the
+    same regardless of its position. No COUNT(*) is ever issued.
+
+    The ordering is taken from the view's ``ordering`` attribute (or from an
+    OrderingFilter, if the view has one) and the primary key is appended
+    as a tie-breaker when missing. Ordering fields must be non-nullable.
+    """
+    page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+    ordering = '-pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        self.position = self.decode_position(self.cursor.position) if self.cursor else None
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(ordering, self.position))
+            except (TypeError, ValueError, ValidationError):
+                # Valor que no corresponde al tipo del campo (cursor alterado)
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        if getattr(view, 'ordering', None):
+            self.ordering = view.ordering
+        ordering = super().get_ordering(request, queryset, view)
+
+        pk_name = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in ('pk', pk_name) for field in ordering):
+            ordering += (pk_name,)
+        return ordering
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Build the WHERE clause selecting the rows that follow ``position``
+        in ``ordering``: ``a < x OR (a = x AND (b > y OR ...))``, written as
+        ``a <= x AND (a < x OR ...)`` so the leading field bounds the index scan.
+        """
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = None
+        for field, value in reversed(list(zip(ordering, position))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            strict = Q(**{f'{name}__{lookup}': value})
+            if condition is None:
+                condition = strict
+            else:
+                condition = Q(**{f'{name}__{lookup}e': value}) & (strict | condition)
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.get_position(self.page[-1]) if self.page else self.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.get_position(self.page[0]) if self.page else self.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def encode_cursor(self, cursor):
+        position = json.dumps(cursor.position) if cursor.position is not None else None
+        return super().encode_cursor(cursor._replace(position=position))
+
+    def decode_position(self, position):
+        if position is None:
+            return None
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        # Solo escalares: un objeto o una lista no es un valor de un campo
+        if not isinstance(values, list) or not all(isinstance(value, (str, int, float)) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_position(self, instance):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif not isinstance(value, (int, str)):
+                value = str(value)
+            values.append(value)
+        return values
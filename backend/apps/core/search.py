@@ -0,0 +1,150 @@
+"""
+Typeahead search over clients, locations and services.
+
+On PostgreSQL every target has a GIN index over ``to_tsvector('simple', ...)``
+of its searchable columns (migration core 0002), so the index is updated
+by PostgreSQL itself on every write. A query matches the words that start
+with each typed term (``term:*``), in any order; only the first
+CANDIDATES matches are ranked by ts_rank, which keeps a broad term (two
+letters of a common name) within a few milliseconds on large tables.
+
+When the pg_trgm extension is installed the migration also adds
+``gin_trgm_ops`` indexes, and the results the prefix search leaves free are
+filled with fuzzy matches (typos, text in the middle of a word or of a
+service number). Without pg_trgm, or on other databases, the search still
+works: PostgreSQL keeps the prefix search and other backends fall back to
+unindexed ``icontains`` filters.
+"""
+import re
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Greatest
+
+from apps.client.models import Client, ClientsLocations
+from apps.core.models import Location
+from apps.services.models import Services
+
+
+SEARCH_CONFIG = 'simple'
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+CANDIDATES = 200
+
+# Objetivo -> (modelo, columnas del tsvector, columnas de pg_trgm, columnas devueltas)
+# Las columnas del tsvector deben coincidir con los índices de la migración core 0002
+TARGETS = {
+    'clients': (
+        Client,
+        ('name', 'legal_name', 'rfc'),
+        ('name', 'legal_name', 'rfc'),
+        ('pk_client', 'name', 'legal_name', 'rfc'),
+    ),
+    'locations': (
+        Location,
+        ('name', 'street_name', 'neighborhood', 'city', 'postcode'),
+        ('name', 'street_name', 'neighborhood'),
+        ('pk_location', 'name', 'street_name', 'neighborhood', 'city', 'postcode'),
+    ),
+    'services': (
+        Services,
+        ('service_number',),
+        ('service_number',),
+        ('pk_services', 'service_number', 'scheduled_date', 'fk_clients_id'),
+    ),
+}
+
+
+def terms(text):
+    """Words of ``text`` (letters and digits only, so they are safe in a tsquery)."""
+    return re.findall(r'\w+', text.lower())
+
+
+def search_vector(fields):
+    return SearchVector(*fields, config=SEARCH_CONFIG)
+
+
+def prefix_query(words):
+    """tsquery matching the words that start with every term."""
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), config=SEARCH_CONFIG, search_type='raw')
+
+
+@lru_cache(maxsize=None)
+def trigram_available():
+    """Whether pg_trgm is installed in the database (checked once per process)."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def scope(target, queryset, management):
+    """Restricts ``queryset`` to the records of one management."""
+    if target == 'clients':
+        return queryset.filter(fk_management_id=management)
+    if target == 'locations':
+        # Exists en lugar de join: una ubicación con varios clientes no se repite
+        return queryset.filter(Exists(ClientsLocations.objects.filter(
+            fk_location=OuterRef('pk'), fk_client__fk_management_id=management,
+        )))
+    return queryset.filter(fk_clients__fk_management_id=management)
+
+
+def search_target(target, text, limit=DEFAULT_LIMIT, management=None):
+    """Up to ``limit`` rows of ``target`` matching ``text``, best first."""
+    model, vector_fields, trigram_fields, values = TARGETS[target]
+    words = terms(text)
+    if not words:
+        return []
+    queryset = model.objects.all()
+    if management is not None:
+        queryset = scope(target, queryset, management)
+
+    if connection.vendor != 'postgresql':
+        matches = queryset
+        for word in words:
+            matches = matches.filter(Q.create([(f'{field}__icontains', word) for field in vector_fields], Q.OR))
+        return list(matches.order_by(*values[1:2], values[0]).values(*values)[:limit])
+
+    query = prefix_query(words)
+    # Un término corto coincide con miles de filas: solo se ordenan las primeras CANDIDATES
+    candidates = queryset.annotate(search=search_vector(vector_fields)).filter(search=query).values('pk')[:CANDIDATES]
+    results = list(
+        model.objects.filter(pk__in=candidates)
+        .annotate(rank=SearchRank(search_vector(vector_fields), query))
+        .order_by('-rank', values[1], values[0])
+        .values(*values)[:limit]
+    )
+    if len(results) < limit and trigram_available():
+        results += fuzzy_matches(
+            target, queryset, text, trigram_fields, values,
+            exclude=[row[values[0]] for row in results], limit=limit - len(results),
+        )
+    return results
+
+
+def fuzzy_matches(target, queryset, text, fields, values, exclude, limit):
+    """pg_trgm matches: similar words, or text inside a service number."""
+    if target == 'services':
+        # Los números se guardan en mayúsculas; LIKE '%...%' usa el índice gin_trgm_ops
+        matches = queryset.filter(service_number__contains=text.strip().upper()).order_by('-scheduled_date')
+    else:
+        # El operador %> (umbral pg_trgm.word_similarity_threshold) usa los índices gin_trgm_ops
+        similarities = [TrigramWordSimilarity(text, field) for field in fields]
+        matches = (
+            queryset.filter(Q.create([(f'{field}__trigram_word_similar', text) for field in fields], Q.OR))
+            .annotate(similarity=Greatest(*similarities) if len(similarities) > 1 else similarities[0])
+            .order_by('-similarity')
+        )
+    return list(matches.exclude(pk__in=exclude).values(*values)[:limit])
+
+
+def search(text, targets=None, limit=DEFAULT_LIMIT, management=None):
+    """``{target: rows}`` for each of ``targets`` (all of them by default)."""
+    return {
+        target: search_target(target, text, limit, management)
+        for target in (targets or TARGETS)
+    }
@@ -0,0 +1,93 @@
+"""
+Content-addressed file storage.
+
+Files are stored under ``blobs/<h[:2]>/<h[2:4]>/<h><extension>``, where
+``h`` is the SHA-256 of their content: the name a model field keeps is
+the same for every upload of the same bytes, so a duplicate upload is
+only a new reference to the file already on disk. The hash is computed
+in CHUNK_SIZE blocks, never with the whole file in memory, and a new
+file is written to a temporary name and renamed into place, so
+concurrent uploads of the same content never leave a partial file at the
+final name.
+
+Stored files are shared by every row that references them and are never
+deleted along with a row (Django's FileField does not delete files
+either).
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+BLOB_DIR = 'blobs'
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(content):
+    """Hex SHA-256 of a file object, read in CHUNK_SIZE blocks."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(sha256, filename=''):
+    """Storage name of the content with ``sha256``; keeps the extension of ``filename``."""
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the SHA-256 of their content."""
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        # Quien ya calculó el hash (apps.core.uploads) lo deja en content.sha256
+        sha256 = getattr(content, 'sha256', None) or file_sha256(content)
+        name = blob_name(sha256, name or content.name or '')
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        # El mismo nombre es el mismo contenido: nunca se agrega sufijo
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                # Archivo ya ensamblado en disco: se mueve en lugar de copiarse
+                os.close(descriptor)
+                file_move_safe(content.temporary_file_path(), temporary, allow_overwrite=True)
+            else:
+                with os.fdopen(descriptor, 'wb') as destination:
+                    for chunk in content.chunks(CHUNK_SIZE):
+                        destination.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            # Renombrado atómico: otro proceso con el mismo contenido deja el mismo archivo
+            os.replace(temporary, full_path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    """Storage of the FileFields with content-addressed files (callable, so migrations keep a reference)."""
+    return content_addressed_storage
@@ -1,3 +1,494 @@
-from django.test import TestCase
+import hashlib
+import io
+import math
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.client.models import Client, ClientsLocations
+from apps.core import geo, search, uploads
+from apps.core.models import ChunkedUpload, Location
+from apps.core.storage import BLOB_DIR, CHUNK_SIZE
+from apps.management.models import Certificate, Management
+from apps.services.models import ServiceLog, Services, Status
+from apps.services.tests import PlanStatisticsMixin, ServicesFixtureMixin
+
+
+class SearchFixtureMixin(ServicesFixtureMixin):
+    """
+    Clientes, ubicaciones y servicios de dos gerencias para las búsquedas;
+    se llama desde setUpTestData con la clase, como create_catalog.
+    """
+
+    def create_search_data(self, count=50):
+        self.create_catalog(self)
+        self.other_management = Management.objects.create(name="Otra", email="otra@example.com")
+        Client.objects.bulk_create(
+            Client(
+                fk_management=self.other_management if i % 2 else self.management,
+                name=f"Reciclados {i:03d}" if i % 5 else f"Transportes Garza {i:03d}",
+                legal_name=f"Empresa {i:03d} SA de CV",
+                rfc=f"RFC{i:09d}",
+                email=f"cliente{i}@example.com",
+            )
+            for i in range(count)
+        )
+        Location.objects.bulk_create(
+            Location(
+                name=f"Bodega {i:03d}",
+                street_name="Avenida Constitución" if i % 2 else "Calle Hidalgo",
+                neighborhood="Centro" if i % 3 else "Mitras",
+                city="Monterrey",
+            )
+            for i in range(count)
+        )
+        ClientsLocations.objects.create(
+            fk_client=self.client_obj, fk_location=Location.objects.get(name="Bodega 003"),
+        )
+        self.services = self.create_services(self, count)
+
+
+class SearchTestCase(SearchFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_search_data(cls)
+
+    def setUp(self):
+        self.api = APIClient()
+
+    def get(self, **params):
+        return self.api.get('/api/v1/core/search/', params)
+
+    def test_clients_by_partial_name_legal_name_and_rfc(self):
+        names = [row['name'] for row in self.get(q='transp', types='clients').data['clients']]
+        self.assertEqual(len(names), 10)
+        self.assertTrue(all(name.startswith('Transportes Garza') for name in names))
+
+        clients = self.get(q='garza 015', types='clients').data['clients']
+        self.assertEqual([client['name'] for client in clients], ['Transportes Garza 015'])
+        self.assertEqual(self.get(q='empresa 007', types='clients').data['clients'][0]['rfc'], 'RFC000000007')
+        self.assertEqual(self.get(q='rfc000000042', types='clients').data['clients'][0]['name'], 'Reciclados 042')
+
+    def test_locations_by_street_and_neighborhood(self):
+        locations = self.get(q='hidalgo mitras', types='locations', limit=50).data['locations']
+        expected = sorted(f"Bodega {i:03d}" for i in range(50) if i % 2 == 0 and i % 3 == 0)
+        self.assertEqual(sorted(location['name'] for location in locations), expected)
+
+    def test_service_numbers(self):
+        services = self.get(q='SRV-TEST-000042', types='services').data['services']
+        self.assertEqual([service['service_number'] for service in services], ['SRV-TEST-000042'])
+        numbers = {service['service_number'] for service in self.get(q='00004', types='services', limit=50).data['services']}
+        self.assertTrue({f"SRV-TEST-{i:06d}" for i in range(40, 50)} <= numbers)
+
+    def test_all_targets_and_limit(self):
+        data = self.get(q='bodega', limit=5).data
+        self.assertEqual(set(data), {'clients', 'locations', 'services'})
+        self.assertEqual(len(data['locations']), 5)
+        self.assertEqual(data['clients'], [])
+
+    def test_management_scope(self):
+        data = self.get(q='reciclados', management=self.management.pk, limit=50).data
+        self.assertTrue(data['clients'])
+        self.assertEqual(
+            set(Client.objects.filter(pk__in=[row['pk_client'] for row in data['clients']]).values_list('fk_management', flat=True)),
+            {self.management.pk},
+        )
+        self.assertEqual(
+            [row['name'] for row in self.get(q='bodega', types='locations', management=self.management.pk).data['locations']],
+            ['Bodega 003'],
+        )
+        self.assertEqual(len(self.get(q='srv', types='services', management=self.other_management.pk).data['services']), 0)
+
+    def test_writes_are_searchable_immediately(self):
+        client = Client.objects.create(
+            fk_management=self.management, name="Zapata Ambiental", legal_name="Zapata Ambiental SA",
+            rfc="ZAP010101AAA", email="zapata@example.com",
+        )
+        self.assertEqual([row['pk_client'] for row in self.get(q='zapata').data['clients']], [client.pk])
+        client.name = "Ortega Ambiental"
+        client.legal_name = "Ortega Ambiental SA"
+        client.save()
+        self.assertEqual(self.get(q='zapata').data['clients'], [])
+        self.assertEqual([row['pk_client'] for row in self.get(q='ortega').data['clients']], [client.pk])
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.get(q='a').status_code, 400)
+        self.assertEqual(self.get(q='--').status_code, 400)
+        self.assertEqual(self.get(q='bodega', types='clients,users').status_code, 400)
+        self.assertEqual(self.get(q='bodega', limit=search.MAX_LIMIT + 1).status_code, 400)
+        # Los operadores de tsquery se descartan, no llegan a la consulta
+        self.assertEqual(self.get(q="bodega & !(x) | 'y':*").status_code, 200)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN de PostgreSQL')
+class SearchPlanTestCase(PlanStatisticsMixin, SearchFixtureMixin, TestCase):
+    """The prefix search of every target is served by its GIN tsvector index."""
+    analyzed_models = (Client, Location, Services)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_search_data(cls, 2000)
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertSearchUses(self, target, text, index):
+        with CaptureQueriesContext(connection) as ctx:
+            search.search_target(target, text)
+        sql = next(query['sql'] for query in ctx.captured_queries if 'to_tsvector' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertNotIn('Seq Scan', plan, plan)
+        self.assertIn(index, plan, plan)
+
+    def test_clients(self):
+        self.assertSearchUses('clients', 'garza 01', 'client_search_idx')
+
+    def test_locations(self):
+        self.assertSearchUses('locations', 'constitu', 'location_search_idx')
+
+    def test_services(self):
+        self.assertSearchUses('services', '00012', 'services_search_idx')
+
+
+def haversine(a, b):
+    latitude_a, longitude_a, latitude_b, longitude_b = map(math.radians, (*a, *b))
+    half_chord = (
+        math.sin((latitude_b - latitude_a) / 2) ** 2
+        + math.cos(latitude_a) * math.cos(latitude_b) * math.sin((longitude_b - longitude_a) / 2) ** 2
+    )
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(half_chord))
+
+
+class GeoFixtureMixin(ServicesFixtureMixin):
+    """Ubicaciones al azar (con semilla) alrededor de Monterrey."""
+    CENTER = (25.6866, -100.3161)
+
+    def create_points(self, count):
+        rng = random.Random(7)
+        points = [
+            (self.CENTER[0] + rng.uniform(-0.6, 0.6), self.CENTER[1] + rng.uniform(-0.6, 0.6))
+            for _ in range(count)
+        ]
+        # bulk_create no llama a save(): la celda se asigna aquí
+        Location.objects.bulk_create(
+            Location(name=f"Punto {i:05d}", latitude=latitude, longitude=longitude, geo_cell=geo.cell(latitude, longitude))
+            for i, (latitude, longitude) in enumerate(points)
+        )
+        Location.objects.create(name="Sin coordenadas")
+        return dict(zip(Location.objects.filter(name__startswith="Punto ").order_by('name').values_list('pk', flat=True), points))
+
+
+class GeoTestCase(GeoFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.points = cls.create_points(cls, 600)
+
+    def setUp(self):
+        self.api = APIClient()
+
+    def by_distance(self, origin):
+        return sorted(self.points, key=lambda pk: haversine(origin, self.points[pk]))
+
+    def test_cell_ranges_cover_the_circle(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            origin = (rng.uniform(-85, 85), rng.uniform(-180, 180))
+            radius = rng.choice((0.5, 5, 50, 150))
+            ranges = geo.cell_ranges(*origin, radius)
+            # Puntos sobre el borde del círculo en varias direcciones
+            for bearing in range(0, 360, 15):
+                latitude, longitude = map(math.radians, origin)
+                angular = radius * 0.999 / geo.EARTH_RADIUS_KM
+                point_latitude = math.asin(
+                    math.sin(latitude) * math.cos(angular)
+                    + math.cos(latitude) * math.sin(angular) * math.cos(math.radians(bearing))
+                )
+                point_longitude = longitude + math.atan2(
+                    math.sin(math.radians(bearing)) * math.sin(angular) * math.cos(latitude),
+                    math.cos(angular) - math.sin(latitude) * math.sin(point_latitude),
+                )
+                point = (math.degrees(point_latitude), (math.degrees(point_longitude) + 540) % 360 - 180)
+                cell = geo.cell(*point)
+                self.assertTrue(any(first <= cell <= last for first, last in ranges), (origin, radius, bearing))
+
+    def test_antimeridian(self):
+        west = Location.objects.create(name="Oeste", latitude=-16.5, longitude=179.995)
+        east = Location.objects.create(name="Este", latitude=-16.5, longitude=-179.995)
+        found = list(geo.within(Location.objects.all(), -16.5, 179.999, 5).values_list('pk', flat=True))
+        self.assertEqual(sorted(found), sorted([west.pk, east.pk]))
+
+    def test_nearby(self):
+        origin = self.CENTER
+        response = self.api.get('/api/v1/core/locations/nearby/', {
+            'latitude': origin[0], 'longitude': origin[1], 'radius_km': 15, 'limit': 500,
+        })
+        self.assertEqual(response.status_code, 200)
+        expected = [pk for pk in self.by_distance(origin) if haversine(origin, self.points[pk]) <= 15]
+        self.assertTrue(expected)
+        self.assertEqual([row['pk_location'] for row in response.data], expected)
+        self.assertAlmostEqual(response.data[0]['distance_km'], haversine(origin, self.points[expected[0]]), places=6)
+        self.assertNotIn('geo_cell', response.data[0])
+
+    def test_nearest(self):
+        for origin, k in ((self.CENTER, 10), ((25.2, -100.9), 25), ((20.0, -90.0), 3)):
+            response = self.api.get('/api/v1/core/locations/nearest/', {'latitude': origin[0], 'longitude': origin[1], 'k': k})
+            self.assertEqual([row['pk_location'] for row in response.data], self.by_distance(origin)[:k])
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.api.get('/api/v1/core/locations/nearby/', {'latitude': 25, 'longitude': -100}).status_code, 400)
+        self.assertEqual(self.api.get('/api/v1/core/locations/nearby/', {
+            'latitude': 25, 'longitude': -100, 'radius_km': geo.MAX_RADIUS_KM + 1,
+        }).status_code, 400)
+        self.assertEqual(self.api.get('/api/v1/core/locations/nearest/', {'latitude': 91, 'longitude': 0}).status_code, 400)
+
+    def test_cell_follows_coordinates(self):
+        response = self.api.post('/api/v1/core/locations/', {'name': "Nueva", 'latitude': 25.7, 'longitude': -100.3}, format='json')
+        self.assertEqual(response.status_code, 201)
+        location = Location.objects.get(pk=response.data['pk_location'])
+        self.assertEqual(location.geo_cell, geo.cell(25.7, -100.3))
+
+        self.api.patch(f'/api/v1/core/locations/{location.pk}/', {'latitude': 19.43, 'longitude': -99.13}, format='json')
+        location.refresh_from_db()
+        self.assertEqual(location.geo_cell, geo.cell(19.43, -99.13))
+
+        location.latitude, location.longitude = 20.67, -103.35
+        location.save(update_fields=['latitude', 'longitude'])
+        location.refresh_from_db()
+        self.assertEqual(location.geo_cell, geo.cell(20.67, -103.35))
+
+        response = self.api.patch(f'/api/v1/core/locations/{location.pk}/', {'latitude': None}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_services_near_a_service(self):
+        self.create_catalog()
+        done = Status.objects.create(name="Completado")
+        origin_pk = self.by_distance(self.CENTER)[0]
+        services = {}
+        for i, pk in enumerate(self.points):
+            services[pk] = Services.objects.create(
+                service_number=f"SRV-GEO-{i:05d}", scheduled_date=date.today(),
+                fk_clients=self.client_obj, fk_locations_id=pk, fk_status=done if i % 2 else self.status,
+                fk_type_services=self.type_service, fk_waste=self.waste, fk_waste_subcategory=self.subcategory,
+            )
+        origin = services[origin_pk]
+        response = self.api.get(f'/api/v1/services/services/{origin.pk}/nearby/', {'k': 5, 'status': self.status.pk})
+        self.assertEqual(response.status_code, 200)
+        expected = [
+            services[pk].pk for pk in self.by_distance(self.points[origin_pk])
+            if pk != origin_pk and services[pk].fk_status_id == self.status.pk
+        ][:5]
+        self.assertEqual([row['pk_services'] for row in response.data], expected)
+
+        response = self.api.get(f'/api/v1/services/services/{origin.pk}/nearby/', {'radius_km': 3, 'k': 100})
+        self.assertTrue(all(row['distance_km'] <= 3 for row in response.data))
+        self.assertNotIn(origin.pk, [row['pk_services'] for row in response.data])
+
+        origin.fk_locations = Location.objects.get(name="Sin coordenadas")
+        origin.save()
+        self.assertEqual(self.api.get(f'/api/v1/services/services/{origin.pk}/nearby/').status_code, 400)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN de PostgreSQL')
+class GeoPlanTestCase(PlanStatisticsMixin, GeoFixtureMixin, TestCase):
+    """Radius queries read only the grid cells around the point through location_geo_cell_idx."""
+    analyzed_models = (Location,)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_points(cls, 5000)
+
+    def test_within(self):
+        plan = geo.within(Location.objects.all(), *self.CENTER, 5)[:50].explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+        self.assertIn('location_geo_cell_idx', plan, plan)
+
+
+class UploadTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.api = APIClient()
+        self.content = os.urandom(3 * CHUNK_SIZE + 123)
+
+    def start(self, content, filename='foto.jpg', **extra):
+        response = self.api.post('/api/v1/core/uploads/', {'filename': filename, 'size': len(content), **extra}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['pk_upload']
+
+    def send(self, upload, offset, chunk):
+        return self.api.generic(
+            'PATCH', f'/api/v1/core/uploads/{upload}/', chunk,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def upload(self, content, filename='foto.jpg', chunk_size=2 * CHUNK_SIZE, **extra):
+        upload = self.start(content, filename, **extra)
+        for offset in range(0, len(content), chunk_size):
+            response = self.send(upload, offset, content[offset:offset + chunk_size])
+            self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def blobs(self):
+        return sorted(
+            name for _, _, names in os.walk(os.path.join(self.media, BLOB_DIR)) for name in names
+        )
+
+    def test_resumable_upload(self):
+        upload = self.start(self.content, sha256=hashlib.sha256(self.content).hexdigest().upper())
+        first = self.send(upload, 0, self.content[:CHUNK_SIZE])
+        self.assertEqual(first.data['offset'], CHUNK_SIZE)
+        self.assertEqual(first.data['status'], ChunkedUpload.STATUS_PENDING)
+
+        # Fragmento repetido tras perder la respuesta: se rechaza e indica dónde seguir
+        retried = self.send(upload, 0, self.content[:CHUNK_SIZE])
+        self.assertEqual(retried.status_code, 409)
+        self.assertEqual(retried.data['offset'], CHUNK_SIZE)
+        self.assertEqual(self.api.get(f'/api/v1/core/uploads/{upload}/').data['offset'], CHUNK_SIZE)
+
+        last = self.send(upload, CHUNK_SIZE, self.content[CHUNK_SIZE:])
+        self.assertEqual(last.status_code, 200, last.data)
+        self.assertEqual(last.data['status'], ChunkedUpload.STATUS_COMPLETE)
+        stored = ChunkedUpload.objects.get(pk=upload).file
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(stored.name, f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        with stored.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        # La parte se movió a su nombre definitivo
+        self.assertEqual(os.listdir(os.path.join(self.media, uploads.PART_DIR)), [])
+        self.assertEqual(self.send(upload, len(self.content), b'x').status_code, 409)
+
+    def test_cut_chunk_is_resumed(self):
+        upload = ChunkedUpload.objects.create(filename='acta.pdf', size=len(self.content))
+        # La conexión se corta: solo llega parte del fragmento
+        stream = io.BytesIO(self.content[:1000])
+        uploads.append_chunk(upload.pk, 0, stream, CHUNK_SIZE)
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 1000)
+        # Bytes escritos tras el último offset confirmado se sobrescriben
+        with open(uploads.part_path(upload), 'ab') as part:
+            part.write(b'basura')
+        self.assertEqual(self.send(upload.pk, 1000, self.content[1000:]).status_code, 200)
+        upload.refresh_from_db()
+        with upload.file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_body_is_read_in_blocks(self):
+        upload = ChunkedUpload.objects.create(filename='foto.jpg', size=len(self.content))
+        stream = io.BytesIO(self.content)
+        reads = []
+        original = stream.read
+        stream.read = lambda size=-1: reads.append(size) or original(size)
+        uploads.append_chunk(upload.pk, 0, stream, len(self.content))
+        self.assertTrue(reads)
+        self.assertTrue(all(0 < size <= CHUNK_SIZE for size in reads), reads)
+
+    def test_duplicates_are_stored_once(self):
+        first = self.upload(self.content)
+        second = self.upload(self.content, chunk_size=CHUNK_SIZE)
+        self.assertEqual(first['file'], second['file'])
+        self.assertEqual(len(self.blobs()), 1)
+
+        # Los archivos subidos en una sola petición también se guardan por contenido
+        self.create_catalog()
+        service = self.create_services(1)[0]
+        logs = [
+            ServiceLog.objects.create(
+                fk_services=service, fk_user=self.collector, completed_date=timezone.now(), waste_amount=1,
+                document=SimpleUploadedFile(f'foto{i}.JPG', self.content),
+            )
+            for i in range(2)
+        ]
+        self.assertEqual(logs[0].document.name, logs[1].document.name)
+        self.assertEqual(logs[0].document.name, ChunkedUpload.objects.first().file.name)
+        self.assertEqual(len(self.blobs()), 1)
+
+    def test_checksum_mismatch(self):
+        upload = self.start(self.content, sha256='0' * 64)
+        self.send(upload, 0, self.content[:2 * CHUNK_SIZE])
+        response = self.send(upload, 2 * CHUNK_SIZE, self.content[2 * CHUNK_SIZE:])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ChunkedUpload.objects.get(pk=upload).status, ChunkedUpload.STATUS_FAILED)
+        self.assertEqual(self.blobs(), [])
+
+    def test_chunk_limits(self):
+        upload = self.start(self.content)
+        with mock.patch.object(uploads, 'MAX_CHUNK_SIZE', CHUNK_SIZE):
+            self.assertEqual(self.send(upload, 0, self.content[:CHUNK_SIZE + 1]).status_code, 413)
+        small = self.start(b'abc')
+        self.assertEqual(self.send(small, 0, b'abcd').status_code, 413)
+        missing = self.api.generic('PATCH', f'/api/v1/core/uploads/{small}/', b'abc')
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(self.send('no-es-un-uuid', 0, b'abc').status_code, 404)
+
+    def test_attach_to_service_log(self):
+        self.create_catalog()
+        service = self.create_services(1)[0]
+        pending = self.start(self.content)
+        response = self.api.post('/api/v1/services/service-logs/', {
+            'fk_services': service.pk, 'fk_user': self.collector.pk, 'waste_amount': '2.00', 'document_upload': pending,
+        }, format='json')
+        # Solo se aceptan subidas completas
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('document_upload', response.data)
+
+        upload = self.upload(self.content)
+        response = self.api.post('/api/v1/services/service-logs/', {
+            'fk_services': service.pk, 'fk_user': self.collector.pk, 'waste_amount': '2.00', 'document_upload': upload['pk_upload'],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        log = ServiceLog.objects.get(pk=response.data['pk_service_log'])
+        self.assertEqual(log.document.name, ChunkedUpload.objects.get(pk=upload['pk_upload']).file.name)
+        self.assertEqual(len(self.blobs()), 1)
+
+    def test_attach_to_certificate(self):
+        self.create_catalog()
+        pdf = b'%PDF-1.4 ' + self.content
+        upload = self.upload(pdf, filename='certificado.pdf')
+        response = self.api.post('/api/v1/management/certificate/', {
+            'fk_management': self.management.pk, 'certificate_name': 'Primero', 'pdf_upload': upload['pk_upload'],
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Certificate.objects.get(pk=response.data['pk_certificate']).pdf.name.startswith(f'{BLOB_DIR}/'))
+
+        # El mismo PDF subido de nuevo (otro nombre de archivo) no puede ser otro certificado
+        response = self.api.post('/api/v1/management/certificate/', {
+            'fk_management': self.management.pk, 'certificate_name': 'Segundo', 'pdf': SimpleUploadedFile('copia.pdf', pdf),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pdf', response.data)
+        response = self.api.post('/api/v1/management/certificate/', {
+            'fk_management': self.management.pk, 'certificate_name': 'Tercero',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Certificate.objects.count(), 1)
+
+    def test_purge_stale_uploads(self):
+        stale = self.start(self.content)
+        self.send(stale, 0, self.content[:CHUNK_SIZE])
+        fresh = self.start(self.content)
+        complete = self.upload(b'hola', filename='nota.txt')
+        ChunkedUpload.objects.exclude(pk=fresh).update(updated_at=timezone.now() - timedelta(hours=uploads.EXPIRE_HOURS + 1))
+
+        call_command('purge_stale_uploads', stdout=io.StringIO())
+        self.assertEqual([str(pk) for pk in ChunkedUpload.objects.values_list('pk', flat=True)], [fresh])
+        self.assertFalse(os.path.exists(os.path.join(self.media, uploads.PART_DIR, f'{stale}.part')))
+        # El archivo guardado puede estar en uso: no se borra con la subida
+        self.assertTrue(os.path.exists(os.path.join(self.media, complete['file'].split('/media/', 1)[-1])))
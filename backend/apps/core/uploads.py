@@ -0,0 +1,138 @@
+"""
+Resumable chunked uploads.
+
+A client creates a ChunkedUpload with the name and size of the file, then
+sends its bytes in order, in chunks of at most MAX_CHUNK_SIZE, each one
+with the offset where it starts. The request body is copied to a part
+file on disk in CHUNK_SIZE blocks, so memory stays bounded whatever the
+size of the file. After a dropped connection the client reads the
+upload and continues from its ``offset``; a chunk sent for any other
+offset is rejected, so a retried chunk is never written twice.
+
+With the last byte the part file is hashed and renamed (not copied) into
+the content-addressed storage (apps.core.storage); when the same content
+is already stored the part file is just deleted. The completed upload is
+then attached to a document field by its id (``document_upload`` of
+ServiceLog, ``pdf_upload`` of Certificate).
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.models import ChunkedUpload
+from apps.core.storage import CHUNK_SIZE, file_sha256
+
+
+MAX_SIZE = getattr(settings, 'UPLOADS_MAX_SIZE', 100 * 1024 * 1024)
+MAX_CHUNK_SIZE = getattr(settings, 'UPLOADS_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+EXPIRE_HOURS = getattr(settings, 'UPLOADS_EXPIRE_HOURS', 24)
+PART_DIR = 'uploads/parts'
+
+
+class UploadError(ValueError):
+    """Chunk that cannot be written."""
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, offset):
+        super().__init__(f'El fragmento debe empezar en el byte {offset}.')
+        self.offset = offset
+
+
+class ChunkTooLarge(UploadError):
+    pass
+
+
+class UploadClosed(UploadError):
+    pass
+
+
+class PartFile(File):
+    """Assembled part file; ``temporary_file_path`` lets the storage rename it."""
+
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def part_path(upload):
+    # En MEDIA_ROOT: el mismo sistema de archivos que los blobs, se mueve con un rename
+    return os.path.join(settings.MEDIA_ROOT, PART_DIR, f'{upload.pk}.part')
+
+
+def append_chunk(upload_id, offset, stream, length):
+    """
+    Writes ``length`` bytes of ``stream`` at ``offset`` and completes the
+    upload with its last byte. Returns the upload.
+    """
+    if length > MAX_CHUNK_SIZE:
+        raise ChunkTooLarge(f'Un fragmento no puede superar {MAX_CHUNK_SIZE} bytes.')
+    with transaction.atomic():
+        # Bloqueo de la fila: dos fragmentos de la misma subida no se escriben a la vez
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status != ChunkedUpload.STATUS_PENDING:
+            raise UploadClosed('La subida ya no admite fragmentos.')
+        if offset != upload.offset:
+            raise OffsetMismatch(upload.offset)
+        if offset + length > upload.size:
+            raise ChunkTooLarge('El fragmento excede el tamaño declarado del archivo.')
+
+        path = part_path(upload)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        received = 0
+        # Desde offset y truncando: lo que dejó un fragmento cortado a medias se sobrescribe
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as part:
+            part.seek(offset)
+            while received < length:
+                block = stream.read(min(CHUNK_SIZE, length - received))
+                if not block:
+                    break
+                part.write(block)
+                received += len(block)
+            part.truncate()
+
+        upload.offset = offset + received
+        if upload.offset == upload.size:
+            complete(upload)
+        upload.save()
+    return upload
+
+
+def complete(upload):
+    """Moves the part file into the content-addressed storage (or marks the upload failed)."""
+    path = part_path(upload)
+    with PartFile(path, upload.filename) as part:
+        part.sha256 = file_sha256(part)
+        if upload.sha256 and part.sha256 != upload.sha256:
+            upload.status = ChunkedUpload.STATUS_FAILED
+        else:
+            upload.file.save(upload.filename, part, save=False)
+            upload.status = ChunkedUpload.STATUS_COMPLETE
+    # Contenido ya guardado o suma que no coincide: la parte sobra
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def discard(upload):
+    """Deletes an upload and its part file; a stored file stays (it may be shared)."""
+    path = part_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    upload.delete()
+
+
+def purge_stale_uploads(hours=EXPIRE_HOURS):
+    """Deletes the uploads not touched in ``hours``; returns how many."""
+    stale = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    purged = 0
+    for upload in stale.iterator():
+        discard(upload)
+        purged += 1
+    return purged
@@ -3,7 +3,8 @@ from apps.management.models import Management, ManagementUser, ManagementLocatio
 from apps.accounts.models import User
 from apps.accounts.api.serializers import UserRegisterSerializer
 from apps.core.models import Location
-from apps.core.api.serializer import LocationSerializer
+from apps.core.api.serializer import CompletedUploadField, LocationSerializer
+from apps.core.storage import blob_name, file_sha256
 from apps.management.models import ManagementLocations
 
 class ManagementSerializer(serializers.ModelSerializer):
@@ -64,11 +65,37 @@ class ManagementWasteSerializer(serializers.ModelSerializer):
         #read_only_fields = ['pk_management_waste', 'created_at', 'updated_at', 'is_active']   
 
 class CertificateSerializer(serializers.ModelSerializer):
+    # Alternativa a subir el PDF en la petición: id de una subida por fragmentos completada
+    pdf_upload = CompletedUploadField()
+
     class Meta:
         model = Certificate
         fields = '__all__'
+        extra_kwargs = {'pdf': {'required': False}}
         #read_only_fields = ['pk_certificate', 'fk_management', 'created_at', 'updated_at', 'is_active']   
 
+    def validate(self, attrs):
+        upload = attrs.pop('pdf_upload', None)
+        if upload is not None:
+            attrs['pdf'] = upload.file.name
+        pdf = attrs.get('pdf')
+        if pdf is None:
+            if self.instance is None:
+                raise serializers.ValidationError({'pdf': 'Debe adjuntar el PDF o indicar pdf_upload.'})
+            return attrs
+        # El nombre guardado es el SHA-256 del contenido: el mismo PDF no puede ser dos certificados
+        if hasattr(pdf, 'chunks'):
+            pdf.sha256 = file_sha256(pdf)  # El almacenamiento reutiliza el hash al guardar
+            name = blob_name(pdf.sha256, pdf.name)
+        else:
+            name = pdf
+        duplicates = Certificate.objects.filter(pdf=name)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError({'pdf': 'Este PDF ya está registrado en otro certificado.'})
+        return attrs
+
 class CollectorUserSerializer(serializers.ModelSerializer):
     # ¡Clave! Usa 'fk_user' (nombre del campo en el modelo)
     fk_user = UserRegisterSerializer()
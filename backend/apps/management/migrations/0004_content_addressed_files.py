@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:00
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0003_collectorusers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='certificate',
+            name='pdf',
+            field=models.FileField(storage=apps.core.storage.get_content_addressed_storage, unique=True, upload_to='certificates/'),
+        ),
+    ]
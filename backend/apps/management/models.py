@@ -2,6 +2,7 @@ from django.db import models
 from apps.accounts.models import User
 from apps.waste.models import Waste
 from apps.core.models import Location
+from apps.core.storage import get_content_addressed_storage
 
 # Create your models here.
 class Management(models.Model):
@@ -73,7 +74,8 @@ class Certificate(models.Model):
     pk_certificate = models.AutoField(primary_key=True)
     fk_management = models.ForeignKey(Management, on_delete=models.CASCADE, related_name='management')
     certificate_name = models.CharField(max_length=255, unique=True)
-    pdf = models.FileField(upload_to='certificates/', unique=True)
+    # Nombre por SHA-256 (apps.core.storage): unique impide registrar el mismo PDF dos veces
+    pdf = models.FileField(upload_to='certificates/', storage=get_content_addressed_storage, unique=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
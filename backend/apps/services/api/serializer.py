@@ -1,9 +1,14 @@
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
-from apps.services.models import Status, TypeServices, Services, ServiceLog
+from apps.services.models import Status, TypeServices, Services, ServiceLog, BackupJob, ServiceRecurrence
 from apps.client.api.serializer import ClientSerializer
-from apps.core.api.serializer import LocationSerializer
+from apps.core.api.serializer import CompletedUploadField, LocationSerializer
 from apps.waste.api.serializer import WasteSerializer, WasteSubCategorySerializer
+from apps.services import recurrence
+from apps.services.scheduling import allocate_service_numbers
+from apps.core.fieldsets import ExpandableFieldsMixin
+from apps.core import geo
 
 class StatusSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,7 +25,34 @@ class TypeServicesSerializer(serializers.ModelSerializer):
             'name': {'validators': []},  # Allow duplicate names for different managements
         }
 
-class ServicesSerializer(serializers.ModelSerializer):
+class ServicesSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    # Relaciones que se anidan completas (opcionales con ?expand=, ver apps.core.fieldsets).
+    # Las vistas cargan las que se piden con select_related_for para que el número
+    # de consultas no dependa de las filas.
+    expandable_fields = {
+        'fk_clients': (ClientSerializer, ()),
+        'fk_locations': (LocationSerializer, ()),
+        'fk_status': (StatusSerializer, ()),
+        'fk_type_services': (TypeServicesSerializer, ()),
+        'fk_waste': (WasteSerializer, ()),
+        'fk_waste_subcategory': (WasteSubCategorySerializer, ('fk_waste',)),
+    }
+    # Nombres planos, solo si se piden en ?fields=
+    client_name = serializers.CharField(source='fk_clients.name', read_only=True)
+    location_name = serializers.CharField(source='fk_locations.name', read_only=True)
+    status_name = serializers.CharField(source='fk_status.name', read_only=True)
+    type_service_name = serializers.CharField(source='fk_type_services.name', read_only=True)
+    waste_name = serializers.CharField(source='fk_waste.name', read_only=True)
+    waste_subcategory_name = serializers.CharField(source='fk_waste_subcategory.name', read_only=True)
+    optional_fields = {
+        'client_name': 'fk_clients',
+        'location_name': 'fk_locations',
+        'status_name': 'fk_status',
+        'type_service_name': 'fk_type_services',
+        'waste_name': 'fk_waste',
+        'waste_subcategory_name': 'fk_waste_subcategory',
+    }
+
     class Meta:
         model = Services
         fields = '__all__'
@@ -33,35 +65,33 @@ class ServicesSerializer(serializers.ModelSerializer):
         """
         Crear un servicio generando automáticamente el número de servicio.
         """
-        # Generar número de servicio automáticamente
-        import uuid
-        from datetime import datetime
-        
-        # Generar un número único basado en timestamp y UUID corto
-        timestamp = datetime.now().strftime('%Y%m%d%H%M')
-        short_uuid = str(uuid.uuid4())[:8].upper()
-        service_number = f"SRV-{timestamp}-{short_uuid}"
-        
-        validated_data['service_number'] = service_number
+        # Número consecutivo de ServiceNumberSequence (el mismo que usa la carga masiva)
+        validated_data['service_number'] = allocate_service_numbers(1)[0]
         return super().create(validated_data)
-    
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)  # Obtiene la representación por defecto
-        
-        # Anidar objetos completos de las relaciones (usando sus propios serializers)
-        representation['fk_clients'] = ClientSerializer(instance.fk_clients).data if instance.fk_clients else None
-        representation['fk_locations'] = LocationSerializer(instance.fk_locations).data if instance.fk_locations else None
-        representation['fk_status'] = StatusSerializer(instance.fk_status).data if instance.fk_status else None
-        representation['fk_type_services'] = TypeServicesSerializer(instance.fk_type_services).data if instance.fk_type_services else None
-        representation['fk_waste'] = WasteSerializer(instance.fk_waste).data if instance.fk_waste else None
-        representation['fk_waste_subcategory'] = WasteSubCategorySerializer(instance.fk_waste_subcategory).data if instance.fk_waste_subcategory else None
-        
-        return representation
-    
-class ServiceLogSerializer(serializers.ModelSerializer):
+
+class CollectorSummarySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+    full_name = serializers.CharField(source='get_full_name')
+    role = serializers.CharField()
+
+class ServiceLogSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'fk_user': (CollectorSummarySerializer, ()),
+        'fk_services': (ServicesSerializer, ()),
+    }
+    user_name = serializers.CharField(source='fk_user.get_full_name', read_only=True)
+    service_number = serializers.CharField(source='fk_services.service_number', read_only=True)
+    # Alternativa a subir el archivo en la petición: id de una subida por fragmentos completada
+    document_upload = CompletedUploadField()
+    optional_fields = {
+        'user_name': 'fk_user',
+        'service_number': 'fk_services',
+    }
+
     class Meta:
         model = ServiceLog
-        fields = ['pk_service_log', 'completed_date', 'waste_amount', 'document', 'notes', 'fk_user', 'fk_services']
+        fields = ['pk_service_log', 'completed_date', 'waste_amount', 'document', 'document_upload', 'notes', 'fk_user', 'fk_services', 'user_name', 'service_number']
         read_only_fields = ('pk_service_log', 'completed_date')  # completed_date es solo lectura
     
     def validate_fk_user(self, value):
@@ -78,6 +108,13 @@ class ServiceLogSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El recolector seleccionado no está activo.")
         
         return value
+
+    def validate(self, attrs):
+        upload = attrs.pop('document_upload', None)
+        if upload is not None:
+            # El archivo ya está en el almacenamiento por contenido: basta con su nombre
+            attrs['document'] = upload.file.name
+        return attrs
     
     def create(self, validated_data):
         """
@@ -85,15 +122,153 @@ class ServiceLogSerializer(serializers.ModelSerializer):
         """
         validated_data['completed_date'] = timezone.now()
         return super().create(validated_data)
-    
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        # Anidar objetos completos de las relaciones
-        representation['fk_services'] = ServicesSerializer(instance.fk_services).data if instance.fk_services else None
-        representation['fk_user'] = {
-            'id': instance.fk_user.id,
-            'username': instance.fk_user.username,
-            'full_name': instance.fk_user.get_full_name,
-            'role': instance.fk_user.role
-        } if instance.fk_user else None
-        return representation
\ No newline at end of file
+
+class BulkServiceItemSerializer(serializers.Serializer):
+    """
+    One service of a bulk scheduling request. Only the shape is validated
+    here; the foreign keys are checked for the whole batch at once
+    (apps.services.scheduling.check_foreign_keys).
+    """
+    scheduled_date = serializers.DateField()
+    fk_clients = serializers.IntegerField(min_value=1)
+    fk_locations = serializers.IntegerField(min_value=1)
+    fk_status = serializers.IntegerField(min_value=1)
+    fk_type_services = serializers.IntegerField(min_value=1)
+    fk_waste = serializers.IntegerField(min_value=1)
+    fk_waste_subcategory = serializers.IntegerField(min_value=1)
+
+    def validate_scheduled_date(self, value):
+        if value < timezone.localdate():
+            raise serializers.ValidationError('La fecha programada no puede ser anterior a hoy.')
+        return value
+
+class ServicesFilterSerializer(serializers.Serializer):
+    """
+    Selection of services by their fields: query parameters of the
+    services list and "filter" of bulk operations.
+    """
+    management = serializers.IntegerField(required=False)
+    client = serializers.IntegerField(required=False)
+    location = serializers.IntegerField(required=False)
+    status = serializers.IntegerField(required=False)
+    type = serializers.IntegerField(required=False)
+    waste = serializers.IntegerField(required=False)
+    subcategory = serializers.IntegerField(required=False)
+    scheduled_date = serializers.DateField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    # Cada relación tiene un índice (relación, -scheduled_date, pk_services)
+    lookups = {
+        'management': 'fk_clients__fk_management_id',
+        'client': 'fk_clients_id',
+        'location': 'fk_locations_id',
+        'status': 'fk_status_id',
+        'type': 'fk_type_services_id',
+        'waste': 'fk_waste_id',
+        'subcategory': 'fk_waste_subcategory_id',
+        'scheduled_date': 'scheduled_date',
+        'date_from': 'scheduled_date__gte',
+        'date_to': 'scheduled_date__lte',
+    }
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'Debe ser posterior a date_from.'})
+        return attrs
+
+    @classmethod
+    def filter_queryset(cls, queryset, filters):
+        """Applies validated filters to a Services queryset."""
+        return queryset.filter(**{cls.lookups[field]: value for field, value in filters.items()})
+
+class ServiceNearbyQuerySerializer(ServicesFilterSerializer):
+    """Query parameters of the services near a service: a radius or the k nearest."""
+    radius_km = serializers.FloatField(min_value=0, max_value=geo.MAX_RADIUS_KM, required=False)
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+class BulkStatusSerializer(serializers.Serializer):
+    """Target status and the services to move: a list of ids or a filter."""
+    status = serializers.PrimaryKeyRelatedField(queryset=Status.objects.filter(is_active=True))
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = ServicesFilterSerializer(required=False)
+
+    def validate_filter(self, value):
+        # Sin filtros se cambiaría toda la tabla
+        if not value:
+            raise serializers.ValidationError('Indique al menos un filtro.')
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Indique "ids" o "filter", no ambos.')
+        return attrs
+
+class ServiceRecurrenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ServiceRecurrence
+        fields = '__all__'
+        read_only_fields = ('pk_service_recurrence', 'generated_until', 'created_at', 'updated_at')
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({'end_date': 'Debe ser posterior a start_date.'})
+        waste = attrs.get('fk_waste', getattr(self.instance, 'fk_waste', None))
+        subcategory = attrs.get('fk_waste_subcategory', getattr(self.instance, 'fk_waste_subcategory', None))
+        if waste and subcategory and subcategory.fk_waste_id != waste.pk:
+            raise serializers.ValidationError({'fk_waste_subcategory': 'La subcategoría no pertenece al residuo.'})
+        return attrs
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            # Bloquea la regla: el generador no la toma mientras se cambia
+            ServiceRecurrence.objects.select_for_update().filter(pk=instance.pk).exists()
+            # Los servicios futuros sin empezar son de la regla anterior (otro día,
+            # otra ubicación); el generador los vuelve a calcular desde hoy
+            recurrence.discard_future(instance)
+            instance.generated_until = None
+            return super().update(instance, validated_data)
+
+class BackupJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BackupJob
+        fields = [
+            'pk_backup_job', 'kind', 'status', 'phase', 'bytes_processed', 'total_bytes',
+            'result', 'error', 'attempts', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+class WasteRollupQuerySerializer(serializers.Serializer):
+    """Query parameters of the waste totals report."""
+    management = serializers.IntegerField(required=False)
+    client = serializers.IntegerField(required=False)
+    waste = serializers.IntegerField(required=False)
+    subcategory = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=('day', 'week', 'month'), default='day')
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'Debe ser posterior a date_from.'})
+        return attrs
+
+class ManifestServiceSerializer(serializers.ModelSerializer):
+    """Compact service entry of the collector's daily manifest."""
+    client = serializers.CharField(source='fk_clients.name')
+    status = serializers.CharField(source='fk_status.name')
+    type_service = serializers.CharField(source='fk_type_services.name')
+    waste = serializers.CharField(source='fk_waste.name')
+    waste_subcategory = serializers.CharField(source='fk_waste_subcategory.name')
+
+    related_fields = ('fk_clients', 'fk_locations', 'fk_status', 'fk_type_services', 'fk_waste', 'fk_waste_subcategory')
+
+    class Meta:
+        model = Services
+        fields = [
+            'pk_services', 'service_number', 'scheduled_date', 'fk_clients', 'client',
+            'fk_status', 'status', 'type_service', 'waste', 'waste_subcategory',
+        ]
+        read_only_fields = fields
@@ -1,12 +1,14 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from apps.services.api.views import StatusViewSet, TypeServicesViewSet,ServiceLogViewSet, ServicesViewSet, backup_database, destroy_and_restore_last_backup, export_table_to_csv, destroy_and_restore_base, restore_table_from_latest_csv,CreateTypeServiceView
+from apps.services.api.views import StatusViewSet, TypeServicesViewSet,ServiceLogViewSet, ServicesViewSet, ServiceRecurrenceViewSet, BackupJobViewSet, backup_database, destroy_and_restore_last_backup, export_table_to_csv, destroy_and_restore_base, restore_table_from_latest_csv,CreateTypeServiceView, ServiceFormDataAPIView, waste_totals, collector_manifest, collector_route
 router = DefaultRouter()
 router.register(r'status', StatusViewSet, basename='status')
 router.register(r'typeServices', TypeServicesViewSet, basename='typeServices')
 router.register(r'services', ServicesViewSet, basename='services')
+router.register(r'recurrences', ServiceRecurrenceViewSet, basename='recurrences')
 router.register(r'service-logs', ServiceLogViewSet, basename='service-logs')
+router.register(r'backup-jobs', BackupJobViewSet, basename='backup-jobs')
 
 urlpatterns = router.urls + [
     path('backupCompleteDB/', backup_database, name='backup-database'),
@@ -18,5 +20,13 @@ urlpatterns = router.urls + [
         CreateTypeServiceView.as_view(),
         name='type-services-create'
     ),
+    path(
+        'management/<int:management_id>/form-data/',
+        ServiceFormDataAPIView.as_view(),
+        name='service-form-data'
+    ),
+    path('waste-totals/', waste_totals, name='waste-totals'),
+    path('manifest/', collector_manifest, name='collector-manifest'),
+    path('route/', collector_route, name='collector-route'),
     path('export-csv/', export_table_to_csv, name='export-clientsusers'),  # 👈 Aquí
 ]
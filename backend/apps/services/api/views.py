@@ -1,267 +1,155 @@
 from rest_framework import viewsets
-from apps.services.models import Status, TypeServices, Services, ServiceLog
-from apps.management.models import Management
-from apps.services.api.serializer import StatusSerializer, TypeServicesSerializer, ServicesSerializer, ServiceLogSerializer
-from rest_framework.decorators import api_view
+from rest_framework.filters import OrderingFilter
+from apps.services.models import Status, TypeServices, Services, ServiceLog, BackupJob, WasteRollup, ServiceRecurrence
+from apps.management.models import Management, CollectorUsers, ManagementWaste
+from apps.core.api.serializer import LocationSerializer, LocationForServiceSerializer, GeoPointQuerySerializer
+from apps.client.models import Client, ClientsLocations
+from apps.client.api.serializer import ClientSerializer
+from apps.waste.models import Waste, WasteSubCategory
+from apps.waste.api.serializer import WasteSerializer, WasteSubCategorySerializer
+from apps.services.api.serializer import StatusSerializer, TypeServicesSerializer, ServicesSerializer, ServiceLogSerializer, BackupJobSerializer, WasteRollupQuerySerializer, ManifestServiceSerializer, BulkServiceItemSerializer, ServiceRecurrenceSerializer, BulkStatusSerializer, ServicesFilterSerializer, ServiceNearbyQuerySerializer
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-import subprocess
 import os
-import psycopg2
 import datetime
-import csv
 import glob
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from apps.services import backups, jobs, routing, scheduling, transitions
+from apps.core import geo
+from apps.core.pagination import KeysetPagination
+from apps.core.catalog_cache import CatalogCacheMixin
+
+def _queued_response(request, job):
+    return Response(
+        {
+            'message': 'Operación en cola.',
+            'job': str(job.pk_backup_job),
+            'status': job.status,
+            'status_url': request.build_absolute_uri(reverse('backup-jobs-detail', args=[job.pk_backup_job])),
+        },
+        status=status.HTTP_202_ACCEPTED
+    )
+
+def _parallel_jobs(request):
+    """
+    Number of pg_dump/pg_restore workers requested with "parallel": true
+    (settings.BACKUP_PARALLEL_JOBS) or "jobs": <n>, at most
+    settings.BACKUP_MAX_PARALLEL_JOBS. None means single process.
+    Raises ValueError with the message for the client.
+    """
+    requested = request.data.get('jobs')
+    if requested:
+        try:
+            requested = max(1, int(requested))
+        except (TypeError, ValueError):
+            raise ValueError('El parámetro "jobs" debe ser un entero.')
+        if requested > backups.BACKUP_MAX_PARALLEL_JOBS:
+            raise ValueError(f'El parámetro "jobs" no puede ser mayor que {backups.BACKUP_MAX_PARALLEL_JOBS}.')
+        return requested
+    if str(request.data.get('parallel', '')).lower() in ('1', 'true'):
+        return min(backups.BACKUP_PARALLEL_JOBS, backups.BACKUP_MAX_PARALLEL_JOBS)
+    return None
 
 @api_view(['POST'])
 def backup_database(request):
-    db = settings.DATABASES['default']
-    db_name = db['NAME']
-    db_user = db['USER']
-    db_password = db['PASSWORD']
-    db_host = db.get('HOST', 'localhost')
-    db_port = db.get('PORT', '5432')
-
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups/CompleteDB')
-    os.makedirs(backup_dir, exist_ok=True)
-    backup_file = os.path.join(backup_dir, f'backup_{timestamp}.backup')
-
+    """
+    Queues a full pg_dump backup; progress is reported at backup-jobs/<id>/.
+    A parallel backup is written in directory format.
+    """
     try:
-        subprocess.run(
-            [
-                'pg_dump',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-F', 'c',
-                '-f', backup_file,
-                db_name
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-        return Response({'message': f'Backup creado en: {backup_file}'}, status=status.HTTP_201_CREATED)
-    except subprocess.CalledProcessError as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        parallel_jobs = _parallel_jobs(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    job = jobs.enqueue(BackupJob.KIND_BACKUP, jobs=parallel_jobs)
+    return _queued_response(request, job)
 
 @api_view(['POST'])
 def destroy_and_restore_last_backup(request):
-    db = settings.DATABASES['default']
-    db_name = db['NAME']
-    db_user = db['USER']
-    db_password = db['PASSWORD']
-    db_host = db.get('HOST', 'localhost')
-    db_port = db.get('PORT', '5432')
-
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups/CompleteDB')
-    backup_files = [f for f in os.listdir(backup_dir) if f.endswith('.backup')]
-    if not backup_files:
+    """Queues a drop-and-restore of the most recent backup."""
+    if not backups.latest_backup():
         return Response({'error': 'No hay backups disponibles.'}, status=status.HTTP_404_NOT_FOUND)
-
-    # Último backup (más reciente por nombre)
-    backup_files.sort(reverse=True)
-    latest_backup = os.path.join(backup_dir, backup_files[0])
-
     try:
-        # 1. Cerrar conexiones activas a la base de datos
-        subprocess.run(
-            [
-                'psql',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', 'postgres',
-                '-c',
-                f"""
-                SELECT pg_terminate_backend(pid)
-                FROM pg_stat_activity
-                WHERE datname = '{db_name}' AND pid <> pg_backend_pid();
-                """
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-
-        # 2. Eliminar la base de datos actual
-        subprocess.run(
-            [
-                'psql',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', 'postgres',
-                '-c', f'DROP DATABASE IF EXISTS "{db_name}";'
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-
-        # 3. Crear la base de datos vacía
-        subprocess.run(
-            [
-                'psql',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', 'postgres',
-                '-c', f'CREATE DATABASE "{db_name}";'
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-
-        # 4. Restaurar desde el backup
-        subprocess.run(
-            [
-                'pg_restore',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', db_name,
-                '--no-owner',
-                latest_backup
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-
-        return Response({'message': f'DB restaurada desde: {latest_backup}'}, status=status.HTTP_200_OK)
+        parallel_jobs = _parallel_jobs(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    except subprocess.CalledProcessError as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    job = jobs.enqueue(BackupJob.KIND_RESTORE_LAST, jobs=parallel_jobs)
+    return _queued_response(request, job)
 
 
 @api_view(['POST'])
 def destroy_and_restore_base(request):
-    db = settings.DATABASES['default']
-    db_name = db['NAME']
-    db_user = db['USER']
-    db_password = db['PASSWORD']
-    db_host = db.get('HOST', 'localhost')
-    db_port = db.get('PORT', '5432')
-
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups/CompleteDB')
-    initial_backup = os.path.join(backup_dir, 'BDInitial.backup')
-
-    if not os.path.exists(initial_backup):
+    """Queues a drop-and-restore of BDInitial.backup."""
+    if not os.path.exists(backups.BASE_BACKUP):
         return Response({'error': 'El archivo BDInitial.backup no existe.'}, status=status.HTTP_404_NOT_FOUND)
-
     try:
-        # 1. Cerrar conexiones activas a la base de datos
-        subprocess.run(
-            [
-                'psql',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', 'postgres',
-                '-c',
-                f"""
-                SELECT pg_terminate_backend(pid)
-                FROM pg_stat_activity
-                WHERE datname = '{db_name}' AND pid <> pg_backend_pid();
-                """
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
+        parallel_jobs = _parallel_jobs(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 2. Eliminar la base de datos actual
-        subprocess.run(
-            [
-                'psql',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', 'postgres',
-                '-c', f'DROP DATABASE IF EXISTS "{db_name}";'
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-
-        # 3. Crear la base de datos vacía
-        subprocess.run(
-            [
-                'psql',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', 'postgres',
-                '-c', f'CREATE DATABASE "{db_name}";'
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-
-        # 4. Restaurar desde el archivo BDInitial.backup
-        subprocess.run(
-            [
-                'pg_restore',
-                '-h', db_host,
-                '-p', str(db_port),
-                '-U', db_user,
-                '-d', db_name,
-                '--no-owner',
-                initial_backup
-            ],
-            env={**os.environ, 'PGPASSWORD': db_password},
-            check=True
-        )
-
-        return Response({'message': f'DB restaurada desde: {initial_backup}'}, status=status.HTTP_200_OK)
-
-    except subprocess.CalledProcessError as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    job = jobs.enqueue(BackupJob.KIND_RESTORE_BASE, jobs=parallel_jobs)
+    return _queued_response(request, job)
 
 
 @api_view(['POST'])
 def export_table_to_csv(request):
+    """
+    Exports a table as CSV without loading it into memory.
+    By default the file is written under backups/CSV/<table>/; with
+    "download": true the CSV is streamed back in the response instead.
+    "mode": "incremental" exports only the rows changed since the previous
+    incremental export ("mode": "base" starts a new chain).
+    """
     table_name = request.data.get('table')
     if not table_name:
         return Response({'error': 'El parámetro "table" es obligatorio.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    db = settings.DATABASES['default']
-    db_name = db['NAME']
-    db_user = db['USER']
-    db_password = db['PASSWORD']
-    db_host = db.get('HOST', 'localhost')
-    db_port = db.get('PORT', '5432')
-
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    export_dir = os.path.join(settings.BASE_DIR, f'backups/CSV/{table_name}')
-    os.makedirs(export_dir, exist_ok=True)
-    csv_file = os.path.join(export_dir, f'{table_name}_{timestamp}.csv')
-
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        cursor = conn.cursor()
+        backups.validate_table(table_name)
+    except backups.UnknownTableError as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
 
-        # Comillas dobles para evitar problemas con nombres raros o sensibles a mayúsculas
-        cursor.execute(f'SELECT * FROM "{table_name}";')
-        rows = cursor.fetchall()
-        column_names = [desc[0] for desc in cursor.description]
+    mode = request.data.get('mode', 'full')
+    if mode in ('incremental', 'base'):
+        try:
+            export = backups.export_incremental(table_name, force_base=(mode == 'base'))
+        except backups.UnknownTableError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(
+            {
+                'message': f'CSV exportado en: {export.file}',
+                'kind': export.kind,
+                'rows': export.rows,
+                'deleted': export.deleted,
+                'since': export.since,
+                'until': export.until,
+            },
+            status=status.HTTP_201_CREATED
+        )
 
-        with open(csv_file, mode='w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(column_names)
-            writer.writerows(rows)
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
 
-        cursor.close()
-        conn.close()
+    if str(request.data.get('download', '')).lower() in ('1', 'true'):
+        response = StreamingHttpResponse(backups.iter_table_csv(table_name), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{table_name}_{timestamp}.csv"'
+        return response
 
+    try:
+        csv_file = backups.export_table_to_file(table_name, backups.csv_export_path(table_name, timestamp))
         return Response({'message': f'CSV exportado en: {csv_file}'}, status=status.HTTP_201_CREATED)
 
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 def get_latest_csv_for_table(table_name):
     export_dir = os.path.join(settings.BASE_DIR, f'backups/CSV/{table_name}')
     if not os.path.exists(export_dir):
@@ -280,71 +168,366 @@ def restore_table_from_latest_csv(request):
     if not table_name:
         return Response({'error': 'El parámetro "table" es obligatorio.'}, status=status.HTTP_400_BAD_REQUEST)
 
+    if request.data.get('mode') == 'incremental':
+        try:
+            stats = backups.restore_incremental(table_name)
+        except backups.UnknownTableError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except FileNotFoundError as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'message': f'Tabla "{table_name}" restaurada desde la exportación incremental', **stats}, status=status.HTTP_200_OK)
+
     latest_csv = get_latest_csv_for_table(table_name)
     if not latest_csv:
         return Response({'error': f'No se encontró ningún respaldo CSV para la tabla "{table_name}".'}, status=status.HTTP_404_NOT_FOUND)
 
     try:
-        db = settings.DATABASES['default']
-        conn = psycopg2.connect(
-            dbname=db['NAME'],
-            user=db['USER'],
-            password=db['PASSWORD'],
-            host=db.get('HOST', 'localhost'),
-            port=db.get('PORT', '5432')
-        )
-        cursor = conn.cursor()
-
-        # Leer CSV
-        with open(latest_csv, mode='r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            headers = next(reader)
-            rows = list(reader)
+        backups.validate_table(table_name)
+    except backups.UnknownTableError as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
 
-        # Limpiar tabla
-        cursor.execute(f'TRUNCATE TABLE "{table_name}" RESTART IDENTITY CASCADE;')
-
-        # Insertar datos
-        placeholders = ','.join(['%s'] * len(headers))
-        insert_query = f'INSERT INTO "{table_name}" ({",".join(headers)}) VALUES ({placeholders})'
-
-        for row in rows:
-            cursor.execute(insert_query, row)
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-        return Response({'message': f'Tabla "{table_name}" restaurada desde: {latest_csv}'}, status=status.HTTP_200_OK)
+    try:
+        stats = backups.restore_table(table_name, latest_csv)
+        return Response(
+            {'message': f'Tabla "{table_name}" restaurada desde: {latest_csv}', **stats},
+            status=status.HTTP_200_OK
+        )
 
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class StatusViewSet(viewsets.ModelViewSet):
+# Filtros del reporte -> columnas de WasteRollup
+ROLLUP_FILTERS = {
+    'management': 'fk_management_id',
+    'client': 'fk_client_id',
+    'waste': 'fk_waste_id',
+    'subcategory': 'fk_waste_subcategory_id',
+    'date_from': 'day__gte',
+    'date_to': 'day__lte',
+}
+ROLLUP_INTERVALS = {
+    'day': F('day'),
+    'week': TruncWeek('day'),
+    'month': TruncMonth('day'),
+}
+
+@api_view(['GET'])
+def waste_totals(request):
+    """
+    Waste collected in a date range, read from the WasteRollup table:
+    overall totals, a time series by day/week/month and totals per waste.
+    """
+    query = WasteRollupQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+
+    rollups = WasteRollup.objects.filter(**{
+        lookup: params[name] for name, lookup in ROLLUP_FILTERS.items() if name in params
+    })
+    totals = rollups.aggregate(waste_amount=Sum('waste_amount'), logs=Sum('log_count'))
+    series = (
+        rollups.annotate(period=ROLLUP_INTERVALS[params['interval']])
+        .values('period')
+        .annotate(waste_amount=Sum('waste_amount'), logs=Sum('log_count'))
+        .order_by('period')
+    )
+    by_waste = (
+        rollups.values('fk_waste', waste_name=F('fk_waste__name'))
+        .annotate(waste_amount=Sum('waste_amount'), logs=Sum('log_count'))
+        .order_by('-waste_amount')
+    )
+
+    return Response({
+        'interval': params['interval'],
+        'totals': {
+            'waste_amount': totals['waste_amount'] or 0,
+            'logs': totals['logs'] or 0,
+        },
+        'series': list(series),
+        'by_waste': list(by_waste),
+    })
+
+def _collector_day(request):
+    """
+    (day, collector id, management ids, status id) of a manifest or route
+    request, or an error Response. ``date`` defaults to today and
+    ``collector`` to the authenticated collector.
+    """
+    try:
+        day = datetime.date.fromisoformat(request.query_params['date']) if request.query_params.get('date') else datetime.date.today()
+    except ValueError:
+        return Response({'error': 'El parámetro "date" debe tener formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    collector_id = request.query_params.get('collector')
+    management_ids = None
+    if not collector_id:
+        if not (request.user.is_authenticated and request.user.role == 'collector'):
+            return Response({'error': 'El parámetro "collector" es obligatorio.'}, status=status.HTTP_400_BAD_REQUEST)
+        collector_id = request.user.pk
+        # De la caché de CachedJWTAuthentication o, sin ella, una consulta al usarlo
+        management_ids = getattr(request.user, 'collector_management_ids', None)
+    if not str(collector_id).isdigit():
+        return Response({'error': 'El parámetro "collector" debe ser un entero.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if management_ids is None:
+        management_ids = list(
+            CollectorUsers.objects.filter(fk_user_id=collector_id, fk_user__role='collector')
+            .values_list('fk_management_id', flat=True)
+        )
+    if not management_ids:
+        return Response({'error': 'El recolector no existe o no pertenece a ninguna gerencia.'}, status=status.HTTP_404_NOT_FOUND)
+
+    status_id = request.query_params.get('status')
+    if status_id:
+        if not status_id.isdigit():
+            return Response({'error': 'El parámetro "status" debe ser un entero.'}, status=status.HTTP_400_BAD_REQUEST)
+        status_id = int(status_id)
+    return day, int(collector_id), management_ids, status_id or None
+
+@api_view(['GET'])
+def collector_manifest(request):
+    """
+    One day's services for a collector, grouped by location.
+
+    ``date`` defaults to today and ``collector`` to the authenticated
+    collector; ``status`` optionally narrows the list. The services of the
+    collector's managements are read with services_schedule_idx
+    (scheduled_date, location, status), so the cost depends on that day's
+    services only, not on the history.
+    """
+    params = _collector_day(request)
+    if isinstance(params, Response):
+        return params
+    day, collector_id, management_ids, status_id = params
+
+    services = (
+        Services.objects.select_related(*ManifestServiceSerializer.related_fields)
+        .filter(scheduled_date=day, fk_clients__fk_management_id__in=management_ids)
+        .order_by('fk_locations__name', 'fk_locations_id', 'service_number')
+    )
+    if status_id:
+        services = services.filter(fk_status_id=status_id)
+
+    # Agrupar por ubicación conservando el orden de la consulta
+    locations = {}
+    by_status = {}
+    for service in services:
+        entry = locations.get(service.fk_locations_id)
+        if entry is None:
+            entry = locations[service.fk_locations_id] = {
+                'location': LocationSerializer(service.fk_locations).data,
+                'services': [],
+            }
+        entry['services'].append(ManifestServiceSerializer(service).data)
+        by_status[service.fk_status.name] = by_status.get(service.fk_status.name, 0) + 1
+
+    return Response({
+        'date': day,
+        'collector': collector_id,
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'locations': list(locations.values()),
+    })
+
+@api_view(['GET'])
+def collector_route(request):
+    """
+    Visiting order of a collector's stops for one day (the manifest's
+    locations), from ``start_latitude``/``start_longitude`` when given.
+    Same ``date``, ``collector`` and ``status`` parameters as the manifest.
+    The plan is cached until a service of that day or a location changes.
+    """
+    params = _collector_day(request)
+    if isinstance(params, Response):
+        return params
+    day, collector_id, management_ids, status_id = params
+
+    start = None
+    if 'start_latitude' in request.query_params or 'start_longitude' in request.query_params:
+        query = GeoPointQuerySerializer(data={
+            'latitude': request.query_params.get('start_latitude'),
+            'longitude': request.query_params.get('start_longitude'),
+        })
+        query.is_valid(raise_exception=True)
+        start = (query.validated_data['latitude'], query.validated_data['longitude'])
+
+    return Response({
+        'date': day,
+        'collector': collector_id,
+        **routing.cached_route(day, management_ids, status_id, start),
+    })
+
+class StatusViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing Status instances.
     """
     queryset = Status.objects.all()
     serializer_class = StatusSerializer
+    catalogs = ('status',)
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
 
-class TypeServicesViewSet(viewsets.ModelViewSet):
+class TypeServicesViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing TypeServices instances.
+    ?management=<id> limits the list to one management's types.
     """
     queryset = TypeServices.objects.all()
     serializer_class = TypeServicesSerializer
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
 
+    def get_catalogs(self):
+        management_id = self.request.query_params.get('management')
+        if management_id and self.action == 'list':
+            return [f'type_services:{management_id}']
+        return ['type_services']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        management_id = self.request.query_params.get('management')
+        if management_id and self.action == 'list':
+            queryset = queryset.filter(fk_management_id=management_id)
+        return queryset
+
 class ServicesViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing Services instances.
     """
     queryset = Services.objects.all()
     serializer_class = ServicesSerializer
+    pagination_class = KeysetPagination
+    # ?ordering= solo sobre columnas no nulas (KeysetPagination agrega pk_services)
+    filter_backends = [OrderingFilter]
+    ordering_fields = ('scheduled_date', 'pk_services', 'service_number', 'updated_at')
+    ordering = ('-scheduled_date', 'pk_services')
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
 
+    def get_queryset(self):
+        # Solo los JOIN de los campos y relaciones pedidos (?fields=, ?expand=)
+        queryset = super().get_queryset().select_related(*ServicesSerializer.select_related_for_request(self.request))
+        if self.action == 'list':
+            # ?management=, ?client=, ?status=, ?date_from=... (ServicesFilterSerializer)
+            filters = ServicesFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            queryset = ServicesFilterSerializer.filter_queryset(queryset, filters.validated_data)
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def nearby(self, request, pk=None):
+        """
+        Services whose location is closest to this service's location:
+        the ones within ``?radius_km=`` or the ``?k=`` nearest. Accepts the
+        filters of the list (``?status=`` for the pending ones, ...).
+        """
+        query = ServiceNearbyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = dict(query.validated_data)
+        radius_km = filters.pop('radius_km', None)
+        k = filters.pop('k')
+
+        location = self.get_object().fk_locations
+        if location.latitude is None:
+            return Response({'detail': 'La ubicación del servicio no tiene coordenadas.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        services = ServicesFilterSerializer.filter_queryset(Services.objects.exclude(pk=pk), filters).values(
+            'pk_services', 'service_number', 'scheduled_date', 'fk_status', 'fk_locations',
+        )
+        if radius_km is None:
+            rows = geo.nearest(services, location.latitude, location.longitude, k, prefix='fk_locations__')
+        else:
+            rows = geo.within(services, location.latitude, location.longitude, radius_km, prefix='fk_locations__')[:k]
+        return Response(list(rows))
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Schedules many services in one request: a list of services (or
+        {"services": [...]}) with the same fields as a single POST. Valid
+        items are created even if others fail; ``errors`` lists the failed
+        ones by their position in the request.
+        """
+        items = request.data.get('services') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Se espera una lista de servicios.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > scheduling.BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'Máximo {scheduling.BULK_MAX_ITEMS} servicios por solicitud.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        valid = {}
+        errors = {}
+        for index, item in enumerate(items):
+            serializer = BulkServiceItemSerializer(data=item)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+        if valid:
+            errors.update(scheduling.check_foreign_keys(valid))
+        created = scheduling.create_services({index: item for index, item in valid.items() if index not in errors})
+
+        return Response(
+            {
+                'created': len(created),
+                'failed': len(errors),
+                'services': [
+                    {
+                        'index': index,
+                        'pk_services': service.pk_services,
+                        'service_number': service.service_number,
+                        'scheduled_date': service.scheduled_date,
+                    }
+                    for index, service in created.items()
+                ],
+                'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        Moves many services to one status: {"status": <id>, "ids": [...]}
+        or {"status": <id>, "filter": {"scheduled_date": ..., "location": ...}}.
+        Only allowed transitions are applied (apps.services.transitions);
+        the response has the counts and the rejected ids, not the services.
+        """
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['status']
+        ids = serializer.validated_data.get('ids')
+        if ids is not None:
+            if len(ids) > scheduling.BULK_MAX_ITEMS:
+                return Response(
+                    {'error': f'Máximo {scheduling.BULK_MAX_ITEMS} servicios por solicitud.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            ids = set(ids)
+            services = Services.objects.filter(pk__in=ids)
+        else:
+            services = ServicesFilterSerializer.filter_queryset(Services.objects.all(), serializer.validated_data['filter'])
+        return Response(transitions.apply(services, target, ids))
+
+class ServiceRecurrenceViewSet(viewsets.ModelViewSet):
+    """
+    Recurrence rules of clients and locations. Their services are created by
+    the generate_recurring_services command up to the rolling horizon.
+    """
+    queryset = ServiceRecurrence.objects.all()
+    serializer_class = ServiceRecurrenceSerializer
+    pagination_class = KeysetPagination
+    ordering = ('pk_service_recurrence',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        client_id = self.request.query_params.get('client')
+        if client_id:
+            queryset = queryset.filter(fk_client_id=client_id)
+        return queryset
+
 class ServiceLogViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing ServiceLog instances.
@@ -352,13 +535,16 @@ class ServiceLogViewSet(viewsets.ModelViewSet):
     """
     queryset = ServiceLog.objects.all()
     serializer_class = ServiceLogSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-completed_date', '-pk_service_log')
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
     
     def get_queryset(self):
         """
         Optionally filters ServiceLogs by service_id or user_id from query params
         """
-        queryset = ServiceLog.objects.all()
+        # Solo los JOIN de los campos y relaciones pedidos (?fields=, ?expand=)
+        queryset = super().get_queryset().select_related(*ServiceLogSerializer.select_related_for_request(self.request))
         service_id = self.request.query_params.get('service_id', None)
         user_id = self.request.query_params.get('user_id', None)
         
@@ -367,7 +553,16 @@ class ServiceLogViewSet(viewsets.ModelViewSet):
         if user_id is not None:
             queryset = queryset.filter(fk_user__id=user_id)
             
-        return queryset.order_by('-completed_date')
+        return queryset
+
+class BackupJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of queued backup/restore jobs: phase, bytes processed and result.
+    """
+    queryset = BackupJob.objects.all()
+    serializer_class = BackupJobSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', 'pk_backup_job')
 
 class CreateTypeServiceView(APIView):
     def post(self, request, management_id):
@@ -388,3 +583,52 @@ class CreateTypeServiceView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class ServiceFormDataAPIView(APIView):
+    """
+    Everything the service form needs for one management, in one response:
+    clients, locations (with the ids of their clients), statuses, service
+    types, wastes and subcategories. Built from a fixed number of queries.
+    GET /services/management/<int:management_id>/form-data/
+    """
+    def get(self, request, management_id):
+        if not Management.objects.filter(pk_management=management_id).exists():
+            return Response({'error': 'Management no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+        clients = Client.objects.filter(fk_management_id=management_id).order_by('name', 'pk_client')
+
+        # Ubicaciones de los clientes y la relación ubicación -> clientes en una sola consulta
+        links = (
+            ClientsLocations.objects.filter(fk_client__fk_management_id=management_id)
+            .select_related('fk_location')
+            .order_by('fk_location__name', 'fk_location_id', 'fk_client_id')
+        )
+        locations = {}
+        client_ids = {}
+        for link in links:
+            locations.setdefault(link.fk_location_id, link.fk_location)
+            ids = client_ids.setdefault(link.fk_location_id, [])
+            if link.fk_client_id not in ids:
+                ids.append(link.fk_client_id)
+
+        waste_ids = ManagementWaste.objects.filter(fk_management_id=management_id).values('fk_waste')
+        wastes = Waste.objects.filter(pk_waste__in=waste_ids).order_by('name')
+        subcategories = (
+            WasteSubCategory.objects.filter(fk_waste__in=waste_ids)
+            .select_related('fk_waste')
+            .order_by('fk_waste__name', 'name')
+        )
+
+        return Response({
+            'management_id': management_id,
+            'clients': ClientSerializer(clients, many=True).data,
+            'locations': LocationForServiceSerializer(
+                list(locations.values()), many=True, context={'client_ids': client_ids}
+            ).data,
+            'statuses': StatusSerializer(Status.objects.all(), many=True).data,
+            'type_services': TypeServicesSerializer(
+                TypeServices.objects.filter(fk_management_id=management_id), many=True
+            ).data,
+            'wastes': WasteSerializer(wastes, many=True).data,
+            'waste_subcategories': WasteSubCategorySerializer(subcategories, many=True).data,
+        })
@@ -0,0 +1,671 @@
+import csv
+import datetime
+import io
+import logging
+import os
+import subprocess
+import time
+
+import psycopg2
+from psycopg2 import sql
+from django.conf import settings
+from django.db import connection, models
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+CSV_EXPORT_DIR = os.path.join(settings.BASE_DIR, 'backups/CSV')
+BACKUP_DIR = os.path.join(settings.BASE_DIR, 'backups/CompleteDB')
+BASE_BACKUP = os.path.join(BACKUP_DIR, 'BDInitial.backup')
+BACKUP_DIR_SUFFIX = '.dir'
+
+# Respaldos en paralelo (formato directorio): procesos de pg_dump/pg_restore
+# y compresión que pg_dump aplica a cada tabla mientras la escribe
+BACKUP_PARALLEL_JOBS = getattr(settings, 'BACKUP_PARALLEL_JOBS', 4)
+BACKUP_MAX_PARALLEL_JOBS = getattr(settings, 'BACKUP_MAX_PARALLEL_JOBS', os.cpu_count() or 1)
+BACKUP_COMPRESSION = getattr(settings, 'BACKUP_COMPRESSION', '6')
+
+# Cada cuántos segundos se reporta el avance de pg_dump / pg_restore
+PROGRESS_INTERVAL = 1.0
+
+# Filas por lote al leer con cursor del lado del servidor
+EXPORT_BATCH_SIZE = 2000
+
+# Bytes que se envían al servidor por cada lectura del CSV durante COPY FROM
+RESTORE_CHUNK_SIZE = 1024 * 1024
+
+
+class UnknownTableError(ValueError):
+    pass
+
+
+def get_db_params():
+    """Returns the connection settings of the default database."""
+    db = connection.settings_dict
+    return {
+        'dbname': db['NAME'],
+        'user': db['USER'],
+        'password': db['PASSWORD'],
+        'host': db.get('HOST') or 'localhost',
+        'port': db.get('PORT') or '5432',
+    }
+
+
+def connect():
+    """Opens a dedicated psycopg2 connection to the default database."""
+    return psycopg2.connect(**get_db_params())
+
+
+def _pg_args(params):
+    return ['-h', params['host'], '-p', str(params['port']), '-U', params['user']]
+
+
+def _pg_env(params):
+    return {**os.environ, 'PGPASSWORD': params['password'] or ''}
+
+
+def _psql(params, command):
+    subprocess.run(
+        ['psql', *_pg_args(params), '-d', 'postgres', '-c', command],
+        env=_pg_env(params),
+        check=True
+    )
+
+
+def new_backup_path(timestamp, directory=False):
+    """Path for a new backup: a custom-format file, or a directory-format dump."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    suffix = BACKUP_DIR_SUFFIX if directory else '.backup'
+    return os.path.join(BACKUP_DIR, f'backup_{timestamp}{suffix}')
+
+
+def latest_backup():
+    """Most recent backup_* file or directory dump (by name), or None."""
+    if not os.path.isdir(BACKUP_DIR):
+        return None
+    backup_files = sorted(
+        f for f in os.listdir(BACKUP_DIR)
+        if f.startswith('backup_') and f.endswith(('.backup', BACKUP_DIR_SUFFIX))
+    )
+    if not backup_files:
+        return None
+    return os.path.join(BACKUP_DIR, backup_files[-1])
+
+
+def backup_size(path):
+    """Size in bytes of a backup file or of every file in a directory dump."""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def dump_database(path, progress=None, jobs=None, params=None):
+    """
+    Runs pg_dump into ``path``. While it runs, ``progress(phase,
+    bytes_written)`` is called every PROGRESS_INTERVAL seconds.
+
+    With ``jobs`` the dump uses directory format (``-F d -j jobs``): one
+    compressed file per table, written by ``jobs`` parallel workers.
+    Otherwise a single custom-format file is written (``-F c``).
+    The job queue table is dumped without data so a restore does not bring
+    back stale job rows.
+    """
+    from apps.services.models import BackupJob
+
+    params = params or get_db_params()
+    if jobs:
+        dump_format = ['-F', 'd', '-j', str(jobs), '-Z', BACKUP_COMPRESSION]
+    else:
+        dump_format = ['-F', 'c']
+    process = subprocess.Popen(
+        [
+            'pg_dump', *_pg_args(params),
+            *dump_format,
+            '--exclude-table-data', f'"{BackupJob._meta.db_table}"',
+            '-f', path,
+            params['dbname'],
+        ],
+        env=_pg_env(params),
+    )
+    while True:
+        try:
+            process.wait(timeout=PROGRESS_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            if progress:
+                progress('dumping', backup_size(path))
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, 'pg_dump')
+    return backup_size(path)
+
+
+def recreate_database(params, report=None):
+    """Terminates the connections to the database, drops it and creates it empty."""
+    db_name = params['dbname']
+    report = report or (lambda phase, bytes_processed=None: None)
+
+    # 1. Cerrar conexiones activas a la base de datos
+    report('terminating connections')
+    _psql(params, f"""
+        SELECT pg_terminate_backend(pid)
+        FROM pg_stat_activity
+        WHERE datname = '{db_name}' AND pid <> pg_backend_pid();
+    """)
+
+    # 2. Eliminar la base de datos actual
+    report('dropping database')
+    _psql(params, f'DROP DATABASE IF EXISTS "{db_name}";')
+
+    # 3. Crear la base de datos vacía
+    report('creating database')
+    _psql(params, f'CREATE DATABASE "{db_name}";')
+
+
+def restore_database(path, progress=None, chunk_size=RESTORE_CHUNK_SIZE, jobs=None, params=None):
+    """
+    Drops the database, recreates it empty and loads ``path`` with
+    pg_restore.
+
+    A single-process restore feeds the file through stdin so the bytes sent
+    can be reported as ``progress(phase, bytes_processed)``. With ``jobs``
+    (or for a directory dump) pg_restore reads ``path`` itself and loads
+    the tables and rebuilds the indexes with ``jobs`` parallel workers.
+    """
+    params = params or get_db_params()
+
+    def report(phase, bytes_processed=None):
+        if progress:
+            progress(phase, bytes_processed)
+
+    recreate_database(params, report)
+
+    # 4. Restaurar desde el respaldo
+    if jobs or os.path.isdir(path):
+        report('restoring')
+        subprocess.run(
+            [
+                'pg_restore', *_pg_args(params),
+                '-d', params['dbname'],
+                '--no-owner',
+                '-j', str(jobs or 1),
+                path,
+            ],
+            env=_pg_env(params),
+            check=True
+        )
+        size = backup_size(path)
+        report('restoring', size)
+        return size
+
+    process = subprocess.Popen(
+        ['pg_restore', *_pg_args(params), '-d', params['dbname'], '--no-owner'],
+        stdin=subprocess.PIPE,
+        env=_pg_env(params),
+    )
+    sent = 0
+    last_report = 0
+    try:
+        with open(path, mode='rb') as f:
+            while chunk := f.read(chunk_size):
+                process.stdin.write(chunk)
+                sent += len(chunk)
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    report('restoring', sent)
+                    last_report = time.monotonic()
+    except BrokenPipeError:
+        # pg_restore terminó antes de tiempo; su código de salida indica el error
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+    if process.wait():
+        raise subprocess.CalledProcessError(process.returncode, 'pg_restore')
+    report('restoring', sent)
+    return sent
+
+
+def validate_table(table_name):
+    """
+    Ensures the table exists in the database before using its name in SQL
+    or in a filesystem path.
+    """
+    if table_name not in connection.introspection.table_names():
+        raise UnknownTableError(f'La tabla "{table_name}" no existe.')
+    return table_name
+
+
+def csv_export_path(table_name, timestamp):
+    export_dir = os.path.join(CSV_EXPORT_DIR, table_name)
+    os.makedirs(export_dir, exist_ok=True)
+    return os.path.join(export_dir, f'{table_name}_{timestamp}.csv')
+
+
+def export_table(table_name, fileobj):
+    """
+    Writes the table as CSV (with header) into ``fileobj`` using
+    ``COPY ... TO STDOUT``. psycopg2 hands the data to ``fileobj.write`` as it
+    arrives from the server, so memory use does not depend on table size.
+    """
+    query = sql.SQL('COPY {} TO STDOUT WITH (FORMAT csv, HEADER true)').format(sql.Identifier(table_name))
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.copy_expert(query, fileobj)
+    finally:
+        conn.close()
+
+
+def export_table_to_file(table_name, path):
+    with open(path, mode='w', newline='', encoding='utf-8') as f:
+        export_table(table_name, f)
+    return path
+
+
+def iter_table_csv(table_name, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yields the table as CSV text, one chunk per batch of rows.
+
+    Uses a named (server-side) cursor so only ``batch_size`` rows are held
+    in memory at a time; meant to feed a StreamingHttpResponse.
+    """
+    conn = connect()
+    try:
+        with conn.cursor(name=f'export_{table_name}') as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(sql.SQL('SELECT * FROM {}').format(sql.Identifier(table_name)))
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            header_written = False
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not header_written:
+                    # description solo está disponible después del primer fetch
+                    writer.writerow([desc[0] for desc in cursor.description])
+                    header_written = True
+                if not rows:
+                    break
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+            if buffer.tell():
+                yield buffer.getvalue()
+    finally:
+        conn.close()
+
+
+def _secondary_indexes(cursor, table):
+    """Non-unique indexes that do not back a constraint, with their definitions."""
+    cursor.execute(
+        """
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = %s::regclass
+          AND NOT i.indisprimary
+          AND NOT i.indisunique
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _foreign_keys(cursor, table):
+    """Foreign keys declared on the table, with their definitions."""
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _reset_sequences(cursor, table_name, table):
+    """Moves every serial/identity sequence of the table past its current maximum."""
+    cursor.execute(
+        """
+        SELECT attname, pg_get_serial_sequence(%s, attname)
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        """,
+        [table, table],
+    )
+    for column, sequence in cursor.fetchall():
+        if not sequence:
+            continue
+        cursor.execute(
+            sql.SQL('SELECT setval(%s, COALESCE(MAX({col}), 1), MAX({col}) IS NOT NULL) FROM {table}').format(
+                col=sql.Identifier(column), table=sql.Identifier(table_name)
+            ),
+            [sequence],
+        )
+
+
+def _read_header(f):
+    return next(csv.reader([f.readline().decode('utf-8-sig')]))
+
+
+def _column_list(headers):
+    return sql.SQL(', ').join(sql.Identifier(header) for header in headers)
+
+
+def _load_table(conn, cursor, table_name, path, chunk_size):
+    """
+    Truncates the table and bulk-loads ``path`` into it, without its
+    secondary indexes and foreign keys. Returns the row count and what
+    _finish_load has to recreate.
+    """
+    with open(path, mode='rb') as f:
+        headers = _read_header(f)
+
+        cursor.execute(sql.SQL('TRUNCATE TABLE {} RESTART IDENTITY CASCADE').format(sql.Identifier(table_name)))
+
+        table = sql.Identifier(table_name).as_string(conn)
+        indexes = _secondary_indexes(cursor, table)
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {name}')
+        foreign_keys = _foreign_keys(cursor, table)
+        for name, _ in foreign_keys:
+            cursor.execute(
+                sql.SQL('ALTER TABLE {} DROP CONSTRAINT {}').format(sql.Identifier(table_name), sql.Identifier(name))
+            )
+
+        # FREEZE es válido porque la tabla se truncó en esta misma transacción
+        copy = sql.SQL('COPY {} ({}) FROM STDIN WITH (FORMAT csv, FREEZE true)').format(
+            sql.Identifier(table_name), _column_list(headers)
+        )
+        cursor.copy_expert(copy, f, size=chunk_size)
+        rows = cursor.rowcount
+    return rows, (indexes, foreign_keys)
+
+
+def _finish_load(conn, cursor, table_name, dropped):
+    """Rebuilds the indexes, re-adds (and so validates) the foreign keys, resets the sequences and ANALYZEs."""
+    indexes, foreign_keys = dropped
+    for _, definition in indexes:
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute(
+            sql.SQL('ALTER TABLE {} ADD CONSTRAINT {} ').format(sql.Identifier(table_name), sql.Identifier(name))
+            + sql.SQL(definition)
+        )
+    _reset_sequences(cursor, table_name, sql.Identifier(table_name).as_string(conn))
+    cursor.execute(sql.SQL('ANALYZE {}').format(sql.Identifier(table_name)))
+
+
+def _load_stats(table_name, source, rows, started):
+    seconds = time.monotonic() - started
+    stats = {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds) if seconds else rows,
+    }
+    logger.info('Restored %s from %s: %s', table_name, source, stats)
+    return stats
+
+
+def _refresh_rollups(table_name):
+    """COPY skips the model signals, so WasteRollup is rebuilt when one of its sources is replaced."""
+    from apps.services import rollups
+    from apps.services.models import Services, ServiceLog
+
+    if table_name in (Services._meta.db_table, ServiceLog._meta.db_table):
+        rollups.rebuild()
+
+
+def restore_table(table_name, path, chunk_size=RESTORE_CHUNK_SIZE):
+    """
+    Replaces the contents of a table with a CSV export (header row required).
+
+    Everything runs in one transaction: TRUNCATE ... CASCADE, drop the
+    table's secondary indexes and foreign keys, stream the file with
+    ``COPY FROM STDIN`` in ``chunk_size`` reads, then rebuild the indexes,
+    re-add (and so validate) the foreign keys in one pass each, move the
+    identity sequences past the loaded ids and ANALYZE. Any failure rolls
+    the table back to its previous state.
+
+    Returns a dict with the loaded row count, elapsed seconds and rows/s.
+    """
+    started = time.monotonic()
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            rows, dropped = _load_table(conn, cursor, table_name, path, chunk_size)
+            _finish_load(conn, cursor, table_name, dropped)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    _refresh_rollups(table_name)
+    return _load_stats(table_name, path, rows, started)
+
+
+# --- Exportaciones incrementales -------------------------------------------
+
+# Margen que se vuelve a exportar en cada delta: una fila guardada justo antes
+# del corte pero confirmada después no se pierde (el upsert es idempotente).
+WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+
+
+def incremental_models():
+    """Models that support incremental export, keyed by table name."""
+    from apps.client.models import Client
+    from apps.core.models import Location
+    from apps.management.models import Management
+    from apps.services.models import Status, Services, ServiceLog
+
+    return {
+        model._meta.db_table: model
+        for model in (Client, Location, Management, Status, Services, ServiceLog)
+    }
+
+
+def set_null_dependents():
+    """
+    ``{target model: [(incremental model, field), ...]}`` for the foreign keys
+    with SET_NULL. Django clears them with an UPDATE that leaves
+    ``updated_at`` as it was, so the delete of a target has to touch them
+    itself or the next delta would miss the change.
+    """
+    dependents = {}
+    for model in incremental_models().values():
+        for field in model._meta.concrete_fields:
+            if field.many_to_one and field.remote_field.on_delete is models.SET_NULL:
+                dependents.setdefault(field.related_model, []).append((model, field))
+    return dependents
+
+
+def touch_set_null_dependents(sender, instance, **kwargs):
+    """pre_delete: marks as changed the rows whose foreign key to ``instance`` is about to be cleared."""
+    now = timezone.now()
+    for model, field in set_null_dependents().get(sender, ()):
+        model.objects.filter(**{field.name: instance.pk}).update(updated_at=now)
+
+
+def purge_tombstones(table_name, until):
+    """
+    Deletes the DeletedRecord rows of ``table_name`` that no future delta
+    reads: the next one starts at ``until - WATERMARK_OVERLAP``.
+    """
+    from apps.services.models import DeletedRecord
+
+    purged, _ = DeletedRecord.objects.filter(table_name=table_name, deleted_at__lte=until - WATERMARK_OVERLAP).delete()
+    return purged
+
+
+def _incremental_dir(table_name):
+    export_dir = os.path.join(CSV_EXPORT_DIR, table_name, 'incremental')
+    os.makedirs(export_dir, exist_ok=True)
+    return export_dir
+
+
+def _copy_query_to_file(conn, query, params, path):
+    with conn.cursor() as cursor, open(path, mode='w', newline='', encoding='utf-8') as f:
+        select = cursor.mogrify(query, params).decode()
+        cursor.copy_expert(f'COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)', f)
+        return cursor.rowcount
+
+
+def export_incremental(table_name, force_base=False):
+    """
+    Exports the rows of ``table_name`` changed since its last export.
+
+    The first export (or one with ``force_base``) is a full base file. The
+    following ones are deltas with the rows whose ``updated_at`` falls in
+    ``(previous until - WATERMARK_OVERLAP, now]`` plus a ``.deleted.csv``
+    file with the primary keys deleted in that window. Every export is
+    recorded in TableExport, which holds the watermark of the chain; the
+    tombstones older than the new watermark are purged.
+    """
+    from apps.services.models import DeletedRecord, TableExport
+
+    model = incremental_models().get(table_name)
+    if model is None:
+        raise UnknownTableError(f'La tabla "{table_name}" no admite exportación incremental.')
+
+    last = TableExport.objects.filter(table_name=table_name).order_by('-until').first()
+    until = timezone.now()
+    timestamp = until.strftime('%Y%m%d_%H%M%S_%f')
+    export_dir = _incremental_dir(table_name)
+    table = sql.Identifier(table_name)
+
+    conn = connect()
+    try:
+        if last is None or force_base:
+            kind, since, deleted_path, deleted = TableExport.KIND_BASE, None, '', 0
+            path = os.path.join(export_dir, f'{table_name}_{timestamp}_base.csv')
+            rows = _copy_query_to_file(
+                conn, sql.SQL('SELECT * FROM {} WHERE updated_at <= %s').format(table).as_string(conn), [until], path
+            )
+        else:
+            kind, since = TableExport.KIND_DELTA, last.until - WATERMARK_OVERLAP
+            path = os.path.join(export_dir, f'{table_name}_{timestamp}_delta.csv')
+            rows = _copy_query_to_file(
+                conn,
+                sql.SQL('SELECT * FROM {} WHERE updated_at > %s AND updated_at <= %s').format(table).as_string(conn),
+                [since, until],
+                path,
+            )
+            deleted_path = os.path.join(export_dir, f'{table_name}_{timestamp}_delta.deleted.csv')
+            deleted = _copy_query_to_file(
+                conn,
+                sql.SQL(
+                    'SELECT record_pk FROM {} WHERE table_name = %s AND deleted_at > %s AND deleted_at <= %s'
+                ).format(sql.Identifier(DeletedRecord._meta.db_table)).as_string(conn),
+                [table_name, since, until],
+                deleted_path,
+            )
+    finally:
+        conn.close()
+
+    export = TableExport.objects.create(
+        table_name=table_name,
+        kind=kind,
+        file=path,
+        deleted_file=deleted_path,
+        since=since,
+        until=until,
+        rows=rows,
+        deleted=deleted,
+    )
+    purge_tombstones(table_name, until)
+    return export
+
+
+def _apply_delta(cursor, table_name, pk_column, export, chunk_size):
+    """
+    Replays a delta export: removes the rows it lists as deleted and the
+    previous version of every row it contains, then inserts its rows.
+
+    Delete and insert instead of ``ON CONFLICT (pk) DO UPDATE``: a row of
+    the delta may take a unique value (``service_number``, ``Status.name``)
+    that another row held before, and the upsert only resolves conflicts on
+    the primary key. Django declares the foreign keys DEFERRABLE INITIALLY
+    DEFERRED, so the rows that reference a re-inserted one are checked at
+    commit, when it is back.
+    """
+    table = sql.Identifier(table_name)
+    pk = sql.Identifier(pk_column)
+    if export.deleted_file:
+        with open(export.deleted_file, mode='rb') as f:
+            _read_header(f)
+            cursor.execute('CREATE TEMP TABLE deleted_pks (record_pk text) ON COMMIT DROP')
+            cursor.copy_expert('COPY deleted_pks FROM STDIN WITH (FORMAT csv)', f, size=chunk_size)
+        cursor.execute(
+            sql.SQL('DELETE FROM {} WHERE {}::text IN (SELECT record_pk FROM deleted_pks)').format(table, pk)
+        )
+        cursor.execute('DROP TABLE deleted_pks')
+
+    tmp = sql.Identifier(f'delta_{table_name}')
+    with open(export.file, mode='rb') as f:
+        headers = _read_header(f)
+        cursor.execute(
+            sql.SQL('CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP').format(tmp, table)
+        )
+        cursor.copy_expert(
+            sql.SQL('COPY {} ({}) FROM STDIN WITH (FORMAT csv)').format(tmp, _column_list(headers)), f, size=chunk_size
+        )
+    cursor.execute(sql.SQL('DELETE FROM {table} WHERE {pk} IN (SELECT {pk} FROM {tmp})').format(table=table, pk=pk, tmp=tmp))
+    cursor.execute(
+        sql.SQL('INSERT INTO {table} ({cols}) SELECT {cols} FROM {tmp}').format(
+            table=table, cols=_column_list(headers), tmp=tmp,
+        )
+    )
+    cursor.execute(sql.SQL('DROP TABLE {}').format(tmp))
+    # Comprueba ya las claves diferidas: con eventos pendientes no se pueden recrear los índices
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+
+def restore_incremental(table_name, chunk_size=RESTORE_CHUNK_SIZE):
+    """
+    Rebuilds a table from its latest base export followed by every delta
+    recorded after it, in order, inside a single transaction. Indexes and
+    foreign keys are restored once, after the last delta.
+    """
+    from apps.services.models import TableExport
+
+    model = incremental_models().get(table_name)
+    if model is None:
+        raise UnknownTableError(f'La tabla "{table_name}" no admite exportación incremental.')
+
+    base = TableExport.objects.filter(table_name=table_name, kind=TableExport.KIND_BASE).order_by('-until').first()
+    if base is None:
+        raise FileNotFoundError(f'No hay exportación base para la tabla "{table_name}".')
+    deltas = list(
+        TableExport.objects.filter(table_name=table_name, kind=TableExport.KIND_DELTA, until__gt=base.until)
+        .order_by('until')
+    )
+
+    started = time.monotonic()
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            rows, dropped = _load_table(conn, cursor, table_name, base.file, chunk_size)
+            for delta in deltas:
+                _apply_delta(cursor, table_name, model._meta.pk.column, delta, chunk_size)
+                rows += delta.rows
+            # Las claves foráneas se validan con el último delta aplicado: la base
+            # puede apuntar a filas que un delta posterior ya desvinculó
+            _finish_load(conn, cursor, table_name, dropped)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    _refresh_rollups(table_name)
+    stats = _load_stats(table_name, base.file, rows, started)
+    stats['deltas'] = len(deltas)
+    return stats
@@ -0,0 +1,154 @@
+import datetime
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.services import backups
+from apps.services.models import BackupJob
+
+logger = logging.getLogger(__name__)
+
+# Tiempo que un worker reserva un job desde started_at; si muere, otro lo retoma después
+JOB_LEASE = datetime.timedelta(minutes=getattr(settings, 'BACKUP_JOB_LEASE_MINUTES', 360))
+MAX_ATTEMPTS = 2
+
+
+def enqueue(kind, **params):
+    """Queues a job for the backup worker and returns it."""
+    return BackupJob.objects.create(kind=kind, params=params)
+
+
+def claim_next_job():
+    """
+    Takes the oldest job that is queued, or running with an expired lease
+    (its worker died), and marks it as running. A job whose worker died
+    MAX_ATTEMPTS times is marked failed instead. SKIP LOCKED lets several
+    workers poll the same table without picking the same job.
+    """
+    now = timezone.now()
+    while True:
+        with transaction.atomic():
+            job = (
+                BackupJob.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=BackupJob.STATUS_QUEUED)
+                    | Q(status=BackupJob.STATUS_RUNNING, started_at__lt=now - JOB_LEASE)
+                )
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            if job.status == BackupJob.STATUS_RUNNING:
+                logger.warning('Backup job %s was abandoned by its worker', job.pk)
+                if job.attempts >= MAX_ATTEMPTS:
+                    job.status = BackupJob.STATUS_FAILED
+                    job.error = 'El worker dejó de responder durante el job.'
+                    job.finished_at = now
+                    job.save(update_fields=['status', 'error', 'finished_at'])
+                    continue
+            job.status = BackupJob.STATUS_RUNNING
+            job.started_at = now
+            job.attempts += 1
+            job.save(update_fields=['status', 'started_at', 'attempts'])
+            return job
+
+
+def _progress_reporter(job):
+    def report(phase, bytes_processed=None):
+        job.phase = phase
+        if bytes_processed is not None:
+            job.bytes_processed = bytes_processed
+        try:
+            BackupJob.objects.filter(pk=job.pk).update(phase=job.phase, bytes_processed=job.bytes_processed)
+        except DatabaseError:
+            # Durante una restauración la base de datos se elimina y se vuelve a crear;
+            # el avance se guarda al terminar.
+            connection.close()
+    return report
+
+
+def _run_backup(job, report):
+    parallel_jobs = job.params.get('jobs')
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    backup_file = backups.new_backup_path(timestamp, directory=bool(parallel_jobs))
+    size = backups.dump_database(backup_file, progress=report, jobs=parallel_jobs)
+    job.bytes_processed = size
+    return {'message': f'Backup creado en: {backup_file}', 'file': backup_file, 'bytes': size, 'jobs': parallel_jobs}
+
+
+def _run_restore(job, report, backup_file):
+    job.total_bytes = backups.backup_size(backup_file)
+    size = backups.restore_database(backup_file, progress=report, jobs=job.params.get('jobs'))
+    connection.close()
+    # El respaldo puede ser anterior a las migraciones actuales
+    report('migrating')
+    call_command('migrate', interactive=False, verbosity=0)
+    return {'message': f'DB restaurada desde: {backup_file}', 'file': backup_file, 'bytes': size}
+
+
+def _run_restore_last(job, report):
+    latest = backups.latest_backup()
+    if not latest:
+        raise FileNotFoundError('No hay backups disponibles.')
+    return _run_restore(job, report, latest)
+
+
+def _run_restore_base(job, report):
+    if not os.path.exists(backups.BASE_BACKUP):
+        raise FileNotFoundError('El archivo BDInitial.backup no existe.')
+    return _run_restore(job, report, backups.BASE_BACKUP)
+
+
+HANDLERS = {
+    BackupJob.KIND_BACKUP: _run_backup,
+    BackupJob.KIND_RESTORE_LAST: _run_restore_last,
+    BackupJob.KIND_RESTORE_BASE: _run_restore_base,
+}
+
+
+def run_job(job):
+    """Executes a claimed job and stores its final state."""
+    report = _progress_reporter(job)
+    try:
+        job.result = HANDLERS[job.kind](job, report)
+        job.status = BackupJob.STATUS_SUCCEEDED
+        job.phase = 'done'
+    except Exception as e:
+        logger.exception('Backup job %s failed', job.pk)
+        job.status = BackupJob.STATUS_FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+
+    # Tras una restauración la fila del job no existe en la base restaurada:
+    # save() hace UPDATE y, si no encuentra la fila, INSERT.
+    try:
+        job.save()
+    except DatabaseError:
+        # La conexión pudo quedar cerrada por pg_terminate_backend
+        connection.close()
+        job.save()
+    return job
+
+
+def work(once=False, interval=2.0):
+    """
+    Worker loop: runs queued jobs one at a time. With ``once`` it returns
+    as soon as the queue is empty.
+    """
+    processed = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            if once:
+                return processed
+            time.sleep(interval)
+            continue
+        run_job(job)
+        processed += 1
@@ -0,0 +1,127 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import psycopg2
+from psycopg2 import sql
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.services import backups
+from apps.services.models import DeletedRecord, ServiceLog
+
+class Command(BaseCommand):
+    help = (
+        'Compare single-process (-F c) and parallel (-F d -j N) pg_dump/pg_restore '
+        'wall-clock time on a scratch copy of the schema seeded to --size-mb'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=2048, help='Target size of the seeded database')
+        parser.add_argument('--jobs', type=int, default=backups.BACKUP_PARALLEL_JOBS, help='Parallel workers')
+        parser.add_argument('--batch-rows', type=int, default=500000, help='Rows inserted per seeding step')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch databases and dumps')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('El benchmark requiere PostgreSQL.')
+
+        source = backups.get_db_params()
+        bench = {**source, 'dbname': f"{source['dbname']}_bench"}
+        target = {**source, 'dbname': f"{source['dbname']}_bench_restore"}
+        workdir = tempfile.mkdtemp(prefix='backup_bench_')
+
+        try:
+            self.create_schema(source, bench)
+            size = self.seed(bench, options['size_mb'] * 1024 * 1024, options['batch_rows'])
+            self.stdout.write(f"Base sembrada: {size / 1024 ** 2:.0f} MB")
+
+            single_file = os.path.join(workdir, 'bench.backup')
+            parallel_dir = os.path.join(workdir, 'bench.dir')
+            results = [
+                ('dump -F c', self.timed(backups.dump_database, single_file, params=bench)),
+                (f"dump -F d -j {options['jobs']}", self.timed(
+                    backups.dump_database, parallel_dir, jobs=options['jobs'], params=bench
+                )),
+                ('restore (stdin)', self.timed(backups.restore_database, single_file, params=target)),
+                (f"restore -j {options['jobs']}", self.timed(
+                    backups.restore_database, parallel_dir, jobs=options['jobs'], params=target
+                )),
+            ]
+            for label, (seconds, size) in results:
+                self.stdout.write(f'{label:<22} {seconds:8.2f} s  {size / 1024 ** 2:10.1f} MB')
+
+            dump_speedup = results[0][1][0] / results[1][1][0]
+            restore_speedup = results[2][1][0] / results[3][1][0]
+            self.stdout.write(self.style.SUCCESS(
+                f'Aceleración: dump x{dump_speedup:.2f}, restore x{restore_speedup:.2f}'
+            ))
+        finally:
+            if options['keep']:
+                self.stdout.write(f'Respaldos conservados en {workdir}')
+            else:
+                for params in (bench, target):
+                    backups._psql(params, f'DROP DATABASE IF EXISTS "{params["dbname"]}";')
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    def timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        size = func(*args, **kwargs)
+        return time.perf_counter() - start, size
+
+    def create_schema(self, source, bench):
+        """Creates the scratch database with the schema (no data) of the current one."""
+        backups.recreate_database(bench)
+        dump = subprocess.Popen(
+            ['pg_dump', *backups._pg_args(source), '-s', '--no-owner', source['dbname']],
+            stdout=subprocess.PIPE,
+            env=backups._pg_env(source),
+        )
+        subprocess.run(
+            ['psql', *backups._pg_args(bench), '-q', '-d', bench['dbname']],
+            stdin=dump.stdout,
+            stdout=subprocess.DEVNULL,
+            env=backups._pg_env(bench),
+            check=True
+        )
+        dump.stdout.close()
+        if dump.wait():
+            raise subprocess.CalledProcessError(dump.returncode, 'pg_dump')
+
+    def seed(self, params, target_bytes, batch_rows):
+        """
+        Fills ServiceLog and DeletedRecord with generate_series until the
+        database reaches ``target_bytes``. Both tables have no required
+        foreign keys, so an empty schema is enough; using two tables lets
+        the parallel dump and restore split the work.
+        """
+        statements = [
+            sql.SQL("""
+                INSERT INTO {table} (completed_date, waste_amount, notes, updated_at)
+                SELECT now() - (g %% 365) * interval '1 day', (g %% 10000) / 100.0,
+                       md5(g::text) || repeat('x', 200), now()
+                FROM generate_series(1, %s) AS g
+            """).format(table=sql.Identifier(ServiceLog._meta.db_table)),
+            sql.SQL("""
+                INSERT INTO {table} (table_name, record_pk, deleted_at)
+                SELECT 'services_services', g::text || md5(g::text), now()
+                FROM generate_series(1, %s) AS g
+            """).format(table=sql.Identifier(DeletedRecord._meta.db_table)),
+        ]
+
+        conn = psycopg2.connect(**params)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                while True:
+                    cursor.execute('SELECT pg_database_size(current_database())')
+                    size = cursor.fetchone()[0]
+                    if size >= target_bytes:
+                        return size
+                    for statement in statements:
+                        cursor.execute(statement, [batch_rows])
+                    self.stdout.write(f'  {size / 1024 ** 2:.0f} MB...')
+        finally:
+            conn.close()
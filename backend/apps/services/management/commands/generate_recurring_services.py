@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from apps.services import recurrence
+
+class Command(BaseCommand):
+    help = 'Generate the services of the recurrence rules up to the rolling horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int, default=None, help='Days ahead to generate (default SERVICES_RECURRENCE_HORIZON_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=recurrence.BATCH_SIZE, help='Rules per transaction')
+        parser.add_argument('--interval', type=float, default=None, help='Keep running, generating every N seconds')
+
+    def handle(self, *args, **options):
+        if options['interval']:
+            recurrence.work(options['interval'], options['horizon_days'], options['batch_size'])
+        rules, created = recurrence.generate(options['horizon_days'], options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Generated {created} services from {rules} recurrences')
+        )
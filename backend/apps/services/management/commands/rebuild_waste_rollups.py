@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from apps.services import rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the WasteRollup table from ServiceLog'
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {created} waste rollup rows')
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.services import jobs
+
+class Command(BaseCommand):
+    help = 'Run queued backup/restore jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between queue polls')
+
+    def handle(self, *args, **options):
+        processed = jobs.work(once=options['once'], interval=options['interval'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {processed} jobs')
+        )
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:35
+
+import datetime
+import django.core.validators
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_alter_services_scheduled_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='services',
+            name='scheduled_date',
+            field=models.DateField(validators=[django.core.validators.MinValueValidator(datetime.date(2026, 10, 18))], verbose_name='Fecha Programada'),
+        ),
+        migrations.CreateModel(
+            name='BackupJob',
+            fields=[
+                ('pk_backup_job', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('backup', 'Respaldo completo'), ('restore_last', 'Restaurar último respaldo'), ('restore_base', 'Restaurar respaldo base')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'En cola'), ('running', 'En ejecución'), ('succeeded', 'Completado'), ('failed', 'Fallido')], default='queued', max_length=10)),
+                ('phase', models.CharField(blank=True, default='', max_length=100)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('bytes_processed', models.BigIntegerField(default=0)),
+                ('total_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'BackupJob',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='backupjob_queue_idx')],
+            },
+        ),
+    ]
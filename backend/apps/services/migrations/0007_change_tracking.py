@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0006_backupjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicelog',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('pk_deleted_record', models.BigAutoField(primary_key=True, serialize=False)),
+                ('table_name', models.CharField(max_length=100)),
+                ('record_pk', models.CharField(max_length=64)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'DeletedRecord',
+                'indexes': [models.Index(fields=['table_name', 'deleted_at'], name='deletedrecord_window_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TableExport',
+            fields=[
+                ('pk_table_export', models.AutoField(primary_key=True, serialize=False)),
+                ('table_name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('base', 'Base'), ('delta', 'Delta')], max_length=5)),
+                ('file', models.CharField(max_length=500)),
+                ('deleted_file', models.CharField(blank=True, default='', max_length=500)),
+                ('since', models.DateTimeField(blank=True, null=True)),
+                ('until', models.DateTimeField()),
+                ('rows', models.BigIntegerField(default=0)),
+                ('deleted', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'TableExport',
+                'ordering': ['-until'],
+                'indexes': [models.Index(fields=['table_name', 'until'], name='tableexport_chain_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0001_initial'),
+        ('management', '0003_collectorusers'),
+        ('services', '0007_change_tracking'),
+        ('waste', '0003_wastesubcategory_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WasteRollup',
+            fields=[
+                ('pk_waste_rollup', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('waste_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('log_count', models.IntegerField(default=0)),
+                ('fk_client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='client.client')),
+                ('fk_management', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='management.management')),
+                ('fk_waste', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='waste.waste')),
+                ('fk_waste_subcategory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='waste.wastesubcategory')),
+            ],
+            options={
+                'db_table': 'WasteRollup',
+                'constraints': [models.UniqueConstraint(fields=('fk_management', 'day', 'fk_client', 'fk_waste', 'fk_waste_subcategory'), name='wasterollup_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0001_initial'),
+        ('core', '0001_initial'),
+        ('services', '0008_waste_rollup'),
+        ('waste', '0003_wastesubcategory_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['scheduled_date', 'fk_locations', 'fk_status'], name='services_schedule_idx'),
+        ),
+    ]
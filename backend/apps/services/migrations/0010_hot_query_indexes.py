@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_hot_query_indexes'),
+        ('core', '0001_initial'),
+        ('services', '0009_services_schedule_idx'),
+        ('waste', '0003_wastesubcategory_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='servicelog',
+            name='fk_services',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='services.services'),
+        ),
+        migrations.AlterField(
+            model_name='servicelog',
+            name='fk_user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='servicelog',
+            index=models.Index(condition=models.Q(('fk_services__isnull', False)), fields=['fk_services', 'completed_date', 'pk_service_log'], name='servicelog_service_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicelog',
+            index=models.Index(condition=models.Q(('fk_user__isnull', False)), fields=['fk_user', 'completed_date', 'pk_service_log'], name='servicelog_user_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicelog',
+            index=models.Index(fields=['completed_date', 'pk_service_log'], name='servicelog_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['-scheduled_date', 'pk_services'], name='services_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:18
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_hot_query_indexes'),
+        ('core', '0001_initial'),
+        ('services', '0011_service_number_sequence'),
+        ('waste', '0003_wastesubcategory_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceRecurrence',
+            fields=[
+                ('pk_service_recurrence', models.AutoField(primary_key=True, serialize=False)),
+                ('frequency', models.CharField(choices=[('daily', 'Diaria'), ('weekly', 'Semanal'), ('monthly', 'Mensual')], max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('generated_until', models.DateField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('fk_client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_recurrences', to='client.client')),
+                ('fk_location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_recurrences', to='core.location')),
+                ('fk_status', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='services.status')),
+                ('fk_type_services', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='services.typeservices')),
+                ('fk_waste', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='waste.waste')),
+                ('fk_waste_subcategory', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='waste.wastesubcategory')),
+            ],
+            options={
+                'db_table': 'ServiceRecurrence',
+            },
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='fk_recurrence',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='services', to='services.servicerecurrence', verbose_name='Recurrencia'),
+        ),
+        migrations.AddConstraint(
+            model_name='services',
+            constraint=models.UniqueConstraint(condition=models.Q(('fk_recurrence__isnull', False)), fields=('fk_recurrence', 'scheduled_date'), name='services_recurrence_date_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerecurrence',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['generated_until', 'pk_service_recurrence'], name='recurrence_pending_idx'),
+        ),
+    ]
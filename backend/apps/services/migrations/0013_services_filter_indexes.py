@@ -0,0 +1,72 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_hot_query_indexes'),
+        ('core', '0001_initial'),
+        ('services', '0012_service_recurrence'),
+        ('waste', '0003_wastesubcategory_name'),
+    ]
+
+    operations = [
+        # Los índices nuevos antes de quitar los de cada FK
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['fk_clients', '-scheduled_date', 'pk_services'], name='services_clients_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['fk_locations', '-scheduled_date', 'pk_services'], name='services_locations_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['fk_status', '-scheduled_date', 'pk_services'], name='services_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['fk_type_services', '-scheduled_date', 'pk_services'], name='services_type_services_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['fk_waste', '-scheduled_date', 'pk_services'], name='services_waste_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['fk_waste_subcategory', '-scheduled_date', 'pk_services'], name='services_waste_subcategory_idx'),
+        ),
+        migrations.AlterField(
+            model_name='services',
+            name='fk_clients',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='client.client', verbose_name='Cliente'),
+        ),
+        migrations.AlterField(
+            model_name='services',
+            name='fk_locations',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='core.location', verbose_name='Ubicación'),
+        ),
+        migrations.AlterField(
+            model_name='services',
+            name='fk_status',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='services.status', verbose_name='Estado'),
+        ),
+        migrations.AlterField(
+            model_name='services',
+            name='fk_type_services',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='services.typeservices', verbose_name='Tipo de Servicio'),
+        ),
+        migrations.AlterField(
+            model_name='services',
+            name='fk_waste',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='waste.waste', verbose_name='Residuo'),
+        ),
+        migrations.AlterField(
+            model_name='services',
+            name='fk_waste_subcategory',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='waste.wastesubcategory', verbose_name='Subcategoría de Residuo'),
+        ),
+    ]
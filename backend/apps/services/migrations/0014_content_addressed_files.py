@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:00
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0013_services_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='servicelog',
+            name='document',
+            field=models.FileField(blank=True, null=True, storage=apps.core.storage.get_content_addressed_storage, upload_to='service_logs/'),
+        ),
+    ]
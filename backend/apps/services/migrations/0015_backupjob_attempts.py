@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0014_content_addressed_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
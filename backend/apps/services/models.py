@@ -1,11 +1,13 @@
 from django.db import models
 from apps.management.models import Management
 from apps.core.models import Location
+from apps.core.storage import get_content_addressed_storage
 from apps.client.models import Client
 from apps.waste.models import Waste, WasteSubCategory
 from apps.accounts.models import User
 from django.core.validators import MinValueValidator
 from datetime import date  # Para validar fechas
+import uuid
 
 
 # Create your models here.
@@ -43,42 +45,133 @@ class Services(models.Model):
     fk_clients = models.ForeignKey(
         Client,  # Asume que existe un modelo Clients
         on_delete=models.PROTECT,  # Evita borrar si hay servicios asociados
+        db_index=False,  # Cubierto por services_clients_idx
         verbose_name="Cliente"
     )
     fk_locations = models.ForeignKey(
         Location,  # Modelo Locations
         on_delete=models.PROTECT,
+        db_index=False,  # Cubierto por services_locations_idx
         verbose_name="Ubicación"
     )
     fk_status = models.ForeignKey(
         Status,  # Modelo Status (ej: "Pendiente", "Completado")
         on_delete=models.PROTECT,
+        db_index=False,  # Cubierto por services_status_idx
         verbose_name="Estado"
     )
     fk_type_services = models.ForeignKey(
         TypeServices,  # Modelo TypeServices
         on_delete=models.PROTECT,
+        db_index=False,  # Cubierto por services_type_services_idx
         verbose_name="Tipo de Servicio"
     )
     fk_waste = models.ForeignKey(
         Waste,  # Modelo Waste (Residuos)
         on_delete=models.PROTECT,
+        db_index=False,  # Cubierto por services_waste_idx
         verbose_name="Residuo"
     )
     fk_waste_subcategory = models.ForeignKey(
         WasteSubCategory,  # Modelo WasteSubcategory
         on_delete=models.PROTECT,
+        db_index=False,  # Cubierto por services_waste_subcategory_idx
         verbose_name="Subcategoría de Residuo"
     )
+
+    # Regla que generó el servicio (apps.services.recurrence); sin índice propio,
+    # lo cubre services_recurrence_date_uniq
+    fk_recurrence = models.ForeignKey(
+        'ServiceRecurrence',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='services',
+        verbose_name="Recurrencia"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         verbose_name = "Servicio"
         verbose_name_plural = "Servicios"
         ordering = ['-scheduled_date']  # Ordenar por fecha descendente
+        indexes = [
+            # Índice de agenda: manifiesto diario por fecha, ubicación y estado
+            models.Index(fields=['scheduled_date', 'fk_locations', 'fk_status'], name='services_schedule_idx'),
+            # Listado (KeysetPagination: -scheduled_date, pk_services), en el mismo sentido que el orden
+            models.Index(fields=['-scheduled_date', 'pk_services'], name='services_recent_idx'),
+            # Filtros del listado (?client=, ?status=, ...): la relación y después el orden
+            # por defecto, así el filtro con rango de fechas se pagina sin ordenar
+            models.Index(fields=['fk_clients', '-scheduled_date', 'pk_services'], name='services_clients_idx'),
+            models.Index(fields=['fk_locations', '-scheduled_date', 'pk_services'], name='services_locations_idx'),
+            models.Index(fields=['fk_status', '-scheduled_date', 'pk_services'], name='services_status_idx'),
+            models.Index(fields=['fk_type_services', '-scheduled_date', 'pk_services'], name='services_type_services_idx'),
+            models.Index(fields=['fk_waste', '-scheduled_date', 'pk_services'], name='services_waste_idx'),
+            models.Index(fields=['fk_waste_subcategory', '-scheduled_date', 'pk_services'], name='services_waste_subcategory_idx'),
+        ]
+        constraints = [
+            # Una ocurrencia por regla y fecha: el generador puede repetirse sin duplicar
+            models.UniqueConstraint(
+                fields=['fk_recurrence', 'scheduled_date'],
+                name='services_recurrence_date_uniq',
+                condition=models.Q(fk_recurrence__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"Servicio #{self.service_number} - {self.fk_clients}"
 
+class ServiceRecurrence(models.Model):
+    """
+    Recurring pickup of a client at a location. The generate_recurring_services
+    command materializes its Services up to a rolling horizon;
+    ``generated_until`` is the watermark of what has been generated.
+    """
+    FREQUENCY_DAILY = 'daily'
+    FREQUENCY_WEEKLY = 'weekly'
+    FREQUENCY_MONTHLY = 'monthly'
+    FREQUENCY_CHOICES = (
+        (FREQUENCY_DAILY, 'Diaria'),
+        (FREQUENCY_WEEKLY, 'Semanal'),
+        (FREQUENCY_MONTHLY, 'Mensual'),
+    )
+
+    pk_service_recurrence = models.AutoField(primary_key=True)
+    fk_client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='service_recurrences')
+    fk_location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='service_recurrences')
+    fk_status = models.ForeignKey(Status, on_delete=models.PROTECT, related_name='+')
+    fk_type_services = models.ForeignKey(TypeServices, on_delete=models.PROTECT, related_name='+')
+    fk_waste = models.ForeignKey(Waste, on_delete=models.PROTECT, related_name='+')
+    fk_waste_subcategory = models.ForeignKey(WasteSubCategory, on_delete=models.PROTECT, related_name='+')
+
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    # Cada cuántos días/semanas/meses
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    # La primera ocurrencia; las mensuales repiten su día del mes
+    start_date = models.DateField()
+    end_date = models.DateField(blank=True, null=True)
+    generated_until = models.DateField(blank=True, null=True, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'ServiceRecurrence'
+        indexes = [
+            # Reglas activas pendientes de generar (por marca de agua)
+            models.Index(
+                fields=['generated_until', 'pk_service_recurrence'],
+                name='recurrence_pending_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_frequency_display()} cada {self.interval} - cliente {self.fk_client_id}"
+
 class ServiceLog(models.Model):
     pk_service_log = models.AutoField(primary_key=True)
     completed_date = models.DateTimeField()
@@ -87,25 +180,198 @@ class ServiceLog(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(0)]
     )
-    document = models.FileField(upload_to='service_logs/', blank=True, null=True)
+    # Nombre por SHA-256 (apps.core.storage): archivos repetidos se guardan una vez
+    document = models.FileField(upload_to='service_logs/', storage=get_content_addressed_storage, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     fk_user = models.ForeignKey(
         User,  # Asume que hay un modelo Collector
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_index=False  # Cubierto por servicelog_user_done_idx
     )
     fk_services = models.ForeignKey(
         'Services',  # Asume que hay un modelo Service
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_index=False  # Cubierto por servicelog_service_done_idx
     )
 
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
     class Meta:
         db_table = 'ServiceLog'
+        indexes = [
+            # Bitácora de un servicio / de un recolector, más reciente primero.
+            # Parciales: las filas sin servicio o sin usuario nunca se consultan así.
+            models.Index(
+                fields=['fk_services', 'completed_date', 'pk_service_log'],
+                name='servicelog_service_done_idx',
+                condition=models.Q(fk_services__isnull=False),
+            ),
+            models.Index(
+                fields=['fk_user', 'completed_date', 'pk_service_log'],
+                name='servicelog_user_done_idx',
+                condition=models.Q(fk_user__isnull=False),
+            ),
+            # Listado general (KeysetPagination: -completed_date, -pk_service_log)
+            models.Index(fields=['completed_date', 'pk_service_log'], name='servicelog_done_idx'),
+        ]
         verbose_name = 'Service Log'
         verbose_name_plural = 'Service Logs'
 
     def __str__(self):
-        return f"ServiceLog {self.pk_service_log} - {self.completed_date}"
\ No newline at end of file
+        return f"ServiceLog {self.pk_service_log} - {self.completed_date}"
+
+class BackupJob(models.Model):
+    """
+    Backup/restore operation queued by the API and executed by the
+    run_backup_worker command outside the HTTP request.
+    """
+    KIND_BACKUP = 'backup'
+    KIND_RESTORE_LAST = 'restore_last'
+    KIND_RESTORE_BASE = 'restore_base'
+    KIND_CHOICES = (
+        (KIND_BACKUP, 'Respaldo completo'),
+        (KIND_RESTORE_LAST, 'Restaurar último respaldo'),
+        (KIND_RESTORE_BASE, 'Restaurar respaldo base'),
+    )
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'En cola'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_SUCCEEDED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    )
+
+    # UUID: una restauración reinicia las secuencias, un id autoincremental podría repetirse
+    pk_backup_job = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    phase = models.CharField(max_length=100, blank=True, default='')
+    params = models.JSONField(default=dict, blank=True)
+    bytes_processed = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    # Veces que un worker tomó el job; más de una si el anterior murió a medias
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'BackupJob'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='backupjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"BackupJob {self.pk_backup_job} - {self.kind} ({self.status})"
+
+
+class DeletedRecord(models.Model):
+    """
+    Tombstone of a deleted row of a table with incremental exports, so a
+    delta can replay deletions as well as changes.
+    """
+    pk_deleted_record = models.BigAutoField(primary_key=True)
+    table_name = models.CharField(max_length=100)
+    record_pk = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'DeletedRecord'
+        indexes = [
+            models.Index(fields=['table_name', 'deleted_at'], name='deletedrecord_window_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.table_name} #{self.record_pk} eliminado {self.deleted_at}"
+
+
+class TableExport(models.Model):
+    """
+    One CSV file of an incremental export chain. ``until`` is the watermark:
+    the next delta exports rows changed after it.
+    """
+    KIND_BASE = 'base'
+    KIND_DELTA = 'delta'
+    KIND_CHOICES = (
+        (KIND_BASE, 'Base'),
+        (KIND_DELTA, 'Delta'),
+    )
+
+    pk_table_export = models.AutoField(primary_key=True)
+    table_name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    file = models.CharField(max_length=500)
+    deleted_file = models.CharField(max_length=500, blank=True, default='')
+    since = models.DateTimeField(blank=True, null=True)
+    until = models.DateTimeField()
+    rows = models.BigIntegerField(default=0)
+    deleted = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'TableExport'
+        ordering = ['-until']
+        indexes = [
+            models.Index(fields=['table_name', 'until'], name='tableexport_chain_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.table_name} {self.kind} hasta {self.until}"
+
+
+class WasteRollup(models.Model):
+    """
+    Waste collected per management, client, waste, subcategory and day,
+    kept up to date by the ServiceLog/Services/Client signals (apps.services.rollups)
+    so reports do not have to scan ServiceLog.
+    """
+    pk_waste_rollup = models.BigAutoField(primary_key=True)
+    fk_management = models.ForeignKey(Management, on_delete=models.CASCADE, related_name='+')
+    fk_client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='+')
+    fk_waste = models.ForeignKey(Waste, on_delete=models.CASCADE, related_name='+')
+    fk_waste_subcategory = models.ForeignKey(WasteSubCategory, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+
+    waste_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    log_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'WasteRollup'
+        constraints = [
+            # La gerencia y el día al frente: las consultas filtran por gerencia y rango de fechas
+            models.UniqueConstraint(
+                fields=['fk_management', 'day', 'fk_client', 'fk_waste', 'fk_waste_subcategory'],
+                name='wasterollup_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} cliente {self.fk_client_id}: {self.waste_amount}"
+
+
+class ServiceNumberSequence(models.Model):
+    """
+    Counter behind service_number. apps.services.scheduling reserves blocks
+    of numbers with one locked UPDATE, however many services are created.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'ServiceNumberSequence'
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
@@ -0,0 +1,176 @@
+"""
+Materialization of recurring services.
+
+Each ServiceRecurrence keeps a watermark (``generated_until``). A run takes
+the active rules whose watermark is behind the horizon (today plus
+SERVICES_RECURRENCE_HORIZON_DAYS) in batches, computes their missing
+occurrences in Python and inserts them with bulk_create, numbered from one
+block of the service number sequence. The cost of a batch is a handful of
+queries whatever the number of rules or occurrences in it.
+
+Reruns are idempotent: the watermark skips what was generated, existing
+(rule, date) services are never inserted again, and the
+services_recurrence_date_uniq constraint backs both. Editing a rule
+deletes its future services that have not started (discard_future) and
+clears the watermark, so they are generated again from the new rule.
+"""
+import calendar
+import datetime
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from apps.services import routing
+from apps.services.models import Services, ServiceLog, ServiceRecurrence
+from apps.services.scheduling import BULK_BATCH_SIZE, allocate_service_numbers
+
+
+HORIZON_DAYS = getattr(settings, 'SERVICES_RECURRENCE_HORIZON_DAYS', 60)
+BATCH_SIZE = 1000
+
+FREQUENCY_DAYS = {
+    ServiceRecurrence.FREQUENCY_DAILY: 1,
+    ServiceRecurrence.FREQUENCY_WEEKLY: 7,
+}
+
+
+def add_months(day, months):
+    """``day`` moved ``months`` months, clamped to the end of shorter months."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return datetime.date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrences(recurrence, start, end):
+    """Dates of ``recurrence`` between ``start`` and ``end`` (both included)."""
+    first = recurrence.start_date
+    start = max(start, first)
+    if recurrence.end_date:
+        end = min(end, recurrence.end_date)
+    if start > end:
+        return []
+
+    dates = []
+    if recurrence.frequency == ServiceRecurrence.FREQUENCY_MONTHLY:
+        # Siempre desde la primera fecha: el día 31 no se corre a 28 para siempre
+        months = (start.year - first.year) * 12 + start.month - first.month
+        step = months // recurrence.interval
+        while True:
+            day = add_months(first, step * recurrence.interval)
+            if day > end:
+                return dates
+            if day >= start:
+                dates.append(day)
+            step += 1
+
+    days = FREQUENCY_DAYS[recurrence.frequency] * recurrence.interval
+    # Primera ocurrencia >= start
+    day = first + datetime.timedelta(days=-(-(start - first).days // days) * days)
+    while day <= end:
+        dates.append(day)
+        day += datetime.timedelta(days=days)
+    return dates
+
+
+def pending(horizon):
+    """Active rules whose watermark is behind ``horizon`` and that can still occur."""
+    return ServiceRecurrence.objects.filter(is_active=True).filter(
+        Q(generated_until__isnull=True)
+        | (Q(generated_until__lt=horizon) & (Q(end_date__isnull=True) | Q(end_date__gt=F('generated_until'))))
+    )
+
+
+def discard_future(recurrence, today=None):
+    """
+    Deletes the services of ``recurrence`` from ``today`` on that have not
+    started: still in the rule's status and without logs. Returns how many.
+    """
+    today = today or timezone.localdate()
+    services = Services.objects.filter(
+        fk_recurrence=recurrence, scheduled_date__gte=today, fk_status_id=recurrence.fk_status_id,
+    ).exclude(Exists(ServiceLog.objects.filter(fk_services=OuterRef('pk'))))
+    # delete() envía las señales: lápidas, rollups y rutas de esos días
+    return services.delete()[1].get(Services._meta.label, 0)
+
+
+def generate_batch(horizon, batch_size=BATCH_SIZE, today=None):
+    """
+    Materializes the services of one batch of pending rules up to
+    ``horizon`` and advances their watermark. SKIP LOCKED lets several
+    workers run at once. Returns (rules, services created).
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        batch = list(
+            pending(horizon).select_for_update(skip_locked=True)
+            .order_by('pk_service_recurrence')[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+
+        # Desde el día siguiente a la marca de agua; nunca en el pasado
+        wanted = {}
+        for recurrence in batch:
+            start = today
+            if recurrence.generated_until is not None:
+                start = max(start, recurrence.generated_until + datetime.timedelta(days=1))
+            for day in occurrences(recurrence, start, horizon):
+                wanted[(recurrence.pk, day)] = recurrence
+
+        if wanted:
+            existing = set(
+                Services.objects.filter(
+                    fk_recurrence__in=batch,
+                    scheduled_date__gte=min(day for _, day in wanted),
+                    scheduled_date__lte=horizon,
+                ).values_list('fk_recurrence_id', 'scheduled_date')
+            )
+            missing = sorted((day, pk) for pk, day in wanted if (pk, day) not in existing)
+            numbers = allocate_service_numbers(len(missing))
+            services = []
+            for (day, pk), number in zip(missing, numbers):
+                recurrence = wanted[(pk, day)]
+                services.append(Services(
+                    service_number=number,
+                    scheduled_date=day,
+                    fk_clients_id=recurrence.fk_client_id,
+                    fk_locations_id=recurrence.fk_location_id,
+                    fk_status_id=recurrence.fk_status_id,
+                    fk_type_services_id=recurrence.fk_type_services_id,
+                    fk_waste_id=recurrence.fk_waste_id,
+                    fk_waste_subcategory_id=recurrence.fk_waste_subcategory_id,
+                    fk_recurrence_id=pk,
+                ))
+            Services.objects.bulk_create(services, batch_size=BULK_BATCH_SIZE)
+            routing.invalidate({day for day, _ in missing})
+        else:
+            services = []
+
+        ServiceRecurrence.objects.filter(pk__in=[recurrence.pk for recurrence in batch]).update(generated_until=horizon)
+    return len(batch), len(services)
+
+
+def generate(horizon_days=None, batch_size=BATCH_SIZE, today=None):
+    """
+    Brings every active rule up to today plus ``horizon_days``.
+    Returns (rules, services created).
+    """
+    today = today or timezone.localdate()
+    horizon = today + datetime.timedelta(days=HORIZON_DAYS if horizon_days is None else horizon_days)
+    rules = created = 0
+    while True:
+        batch_rules, batch_created = generate_batch(horizon, batch_size, today)
+        if not batch_rules:
+            return rules, created
+        rules += batch_rules
+        created += batch_created
+
+
+def work(interval, horizon_days=None, batch_size=BATCH_SIZE):
+    """Runs ``generate`` every ``interval`` seconds, forever."""
+    while True:
+        generate(horizon_days, batch_size)
+        time.sleep(interval)
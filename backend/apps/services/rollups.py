@@ -0,0 +1,170 @@
+"""
+Incremental maintenance of WasteRollup.
+
+Every ServiceLog change is turned into a delta (amount, count) on the
+rollup row of its key, so a write costs one or two small UPDATEs and
+reports read the pre-aggregated rows instead of the log table.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.services.models import Services, ServiceLog, WasteRollup
+
+
+ROLLUP_BATCH_SIZE = 1000
+
+# Campos del servicio que determinan la llave del rollup
+SERVICE_KEY_FIELDS = ('fk_clients_id', 'fk_clients__fk_management_id', 'fk_waste_id', 'fk_waste_subcategory_id')
+
+
+def log_day(value):
+    """Day of a completed_date, in the current time zone (as TruncDate)."""
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def service_key(service_id):
+    """Rollup key columns of a service, or None if it does not exist."""
+    if service_id is None:
+        return None
+    row = Services.objects.filter(pk=service_id).values_list(*SERVICE_KEY_FIELDS).first()
+    if row is None:
+        return None
+    client_id, management_id, waste_id, subcategory_id = row
+    return {
+        'fk_management_id': management_id,
+        'fk_client_id': client_id,
+        'fk_waste_id': waste_id,
+        'fk_waste_subcategory_id': subcategory_id,
+    }
+
+
+def log_snapshot(log):
+    """(service id, day, amount) of a ServiceLog as far as the rollup is concerned."""
+    return (log.fk_services_id, log_day(log.completed_date), Decimal(str(log.waste_amount or 0)))
+
+
+def apply_delta(key, day, amount, count):
+    """Adds ``amount``/``count`` to the rollup row of ``key`` and ``day``."""
+    if key is None or (not amount and not count):
+        return
+    lookup = {**key, 'day': day}
+    with transaction.atomic():
+        rollups = WasteRollup.objects.filter(**lookup)
+        changes = {'waste_amount': F('waste_amount') + amount, 'log_count': F('log_count') + count}
+        if not rollups.update(**changes):
+            try:
+                with transaction.atomic():
+                    WasteRollup.objects.create(**lookup, waste_amount=amount, log_count=count)
+            except IntegrityError:
+                # Otra transacción creó la fila primero
+                rollups.update(**changes)
+        if count < 0:
+            rollups.filter(log_count__lte=0).delete()
+
+
+def log_changed(previous, current):
+    """Moves a ServiceLog's contribution from its previous snapshot to the current one."""
+    if previous == current:
+        return
+    if previous is not None:
+        service_id, day, amount = previous
+        apply_delta(service_key(service_id), day, -amount, -1)
+    if current is not None:
+        service_id, day, amount = current
+        apply_delta(service_key(service_id), day, amount, 1)
+
+
+def service_totals(service_id):
+    """Amount and count of a service's logs, per day."""
+    return (
+        ServiceLog.objects.filter(fk_services_id=service_id)
+        .annotate(day=TruncDate('completed_date'))
+        .values('day')
+        .annotate(amount=Sum('waste_amount'), logs=Count('pk_service_log'))
+        .order_by()
+    )
+
+
+def move_service(service_id, old_key, new_key):
+    """
+    Moves the contribution of every log of a service from ``old_key`` to
+    ``new_key`` (either may be None, e.g. when the service is deleted).
+    """
+    if old_key == new_key:
+        return
+    for row in service_totals(service_id):
+        if old_key is not None:
+            apply_delta(old_key, row['day'], -row['amount'], -row['logs'])
+        if new_key is not None:
+            apply_delta(new_key, row['day'], row['amount'], row['logs'])
+
+
+def move_client(client_id, management_id):
+    """
+    Moves the rollup rows of a client to ``management_id`` after the client
+    changed management. One UPDATE; if the new management already has rows
+    of the client (rollups out of date), they are merged row by row.
+    """
+    rows = WasteRollup.objects.filter(fk_client_id=client_id).exclude(fk_management_id=management_id)
+    try:
+        with transaction.atomic():
+            rows.update(fk_management_id=management_id)
+    except IntegrityError:
+        with transaction.atomic():
+            for row in rows:
+                key = {
+                    'fk_management_id': management_id,
+                    'fk_client_id': client_id,
+                    'fk_waste_id': row.fk_waste_id,
+                    'fk_waste_subcategory_id': row.fk_waste_subcategory_id,
+                }
+                apply_delta(key, row.day, row.waste_amount, row.log_count)
+                row.delete()
+
+
+def rebuild():
+    """
+    Recomputes every rollup row from ServiceLog. Backfill for existing data
+    and repair after bulk writes that skip signals (QuerySet.update/delete).
+    """
+    rows = (
+        ServiceLog.objects.filter(fk_services__isnull=False)
+        .annotate(day=TruncDate('completed_date'))
+        .values(
+            'day',
+            fk_management_id=F('fk_services__fk_clients__fk_management_id'),
+            fk_client_id=F('fk_services__fk_clients_id'),
+            fk_waste_id=F('fk_services__fk_waste_id'),
+            fk_waste_subcategory_id=F('fk_services__fk_waste_subcategory_id'),
+        )
+        .annotate(amount=Sum('waste_amount'), logs=Count('pk_service_log'))
+        .order_by()
+    )
+    with transaction.atomic():
+        WasteRollup.objects.all().delete()
+        batch = []
+        created = 0
+        for row in rows.iterator(chunk_size=ROLLUP_BATCH_SIZE):
+            batch.append(WasteRollup(
+                fk_management_id=row['fk_management_id'],
+                fk_client_id=row['fk_client_id'],
+                fk_waste_id=row['fk_waste_id'],
+                fk_waste_subcategory_id=row['fk_waste_subcategory_id'],
+                day=row['day'],
+                waste_amount=row['amount'],
+                log_count=row['logs'],
+            ))
+            if len(batch) >= ROLLUP_BATCH_SIZE:
+                created += len(WasteRollup.objects.bulk_create(batch))
+                batch = []
+        created += len(WasteRollup.objects.bulk_create(batch))
+    return created
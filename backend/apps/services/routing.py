@@ -0,0 +1,176 @@
+"""
+Route planning for a collector's day.
+
+The stops of a route are the locations of the day's services (the ones of
+the collector's managements, as in the manifest). The haversine distance
+matrix between them is built with NumPy in one vectorized expression, a
+nearest-neighbour tour gives the first order and 2-opt improves it; each
+2-opt step evaluates every reversal that starts at one position with a
+single array operation, so 300 stops take a few tens of milliseconds.
+The route is an open path: it starts at the given point (or at the best
+stop when there is none) and ends at whichever stop is left last.
+
+Plans are cached under the versions ``routes:<day>`` and ``routes``
+(apps.core.catalog_cache). Writes to services bump the version of their
+day and writes to locations bump ``routes``, so a cached plan is never
+served after its services or coordinates change. Like the catalogs, plans
+are only cached when the cache is shared by every server process.
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core import catalog_cache
+from apps.core.geo import EARTH_RADIUS_KM
+from apps.services.models import Services
+
+
+CACHE_PREFIX = 'routes:data:'
+
+
+def distance_matrix(points):
+    """Haversine distances in km between every pair of (latitude, longitude) points."""
+    radians = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    latitude, longitude = radians[:, :1], radians[:, 1:]
+    half_chord = (
+        np.sin((latitude - latitude.T) / 2) ** 2
+        + np.cos(latitude) * np.cos(latitude.T) * np.sin((longitude - longitude.T) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(half_chord, 0, 1)))
+
+
+def nearest_neighbour(matrix, start=0):
+    """Tour that always moves to the closest unvisited node."""
+    visited = np.zeros(len(matrix), dtype=bool)
+    visited[start] = True
+    route = [start]
+    for _ in range(len(matrix) - 1):
+        following = int(np.where(visited, np.inf, matrix[route[-1]]).argmin())
+        visited[following] = True
+        route.append(following)
+    return route
+
+
+def two_opt(matrix, route):
+    """
+    Improves an open path by reversing segments while one shortens it.
+    The first node stays first; the end is free.
+    """
+    size = len(route)
+    if size < 3:
+        return list(route)
+    # Nodo ficticio a distancia 0 de todos: el final del camino queda libre
+    end = len(matrix)
+    extended = np.zeros((end + 1, end + 1))
+    extended[:end, :end] = matrix
+    path = np.array([*route, end])
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, size - 1):
+            before, first = path[i - 1], path[i]
+            last, after = path[i + 1:size], path[i + 2:size + 1]
+            # Ahorro de invertir path[i..k] para todos los k > i de una vez
+            delta = extended[before, last] + extended[first, after] - extended[before, first] - extended[last, after]
+            k = int(delta.argmin())
+            if delta[k] < -1e-9:
+                path[i:i + k + 2] = path[i:i + k + 2][::-1].copy()
+                improved = True
+    return path[:size].tolist()
+
+
+def plan(points, start=None):
+    """
+    Visiting order of ``points`` (indexes) and the distance of each leg.
+    Without ``start`` the path may begin at any point.
+    """
+    if not points:
+        return [], []
+    if start is None:
+        # Origen ficticio a distancia 0: 2-opt elige por dónde empezar.
+        # El vecino más cercano arranca en el punto más alejado del centro.
+        matrix = np.zeros((len(points) + 1, len(points) + 1))
+        matrix[1:, 1:] = distance_matrix(points)
+        center = np.asarray(points, dtype=float).mean(axis=0)
+        farthest = int(distance_matrix([tuple(center), *points])[0, 1:].argmax())
+        visited = nearest_neighbour(matrix[1:, 1:], farthest)
+        route = two_opt(matrix, [0, *(index + 1 for index in visited)])
+    else:
+        matrix = distance_matrix([start, *points])
+        route = two_opt(matrix, nearest_neighbour(matrix))
+
+    legs = [float(matrix[previous, current]) for previous, current in zip(route, route[1:])]
+    return [index - 1 for index in route[1:]], legs
+
+
+def day_services(day, management_ids, status_id=None):
+    """Services of ``day`` for the given managements, with their location."""
+    services = Services.objects.filter(scheduled_date=day, fk_clients__fk_management_id__in=management_ids)
+    if status_id is not None:
+        services = services.filter(fk_status_id=status_id)
+    return services.order_by('fk_locations_id', 'service_number').values(
+        'pk_services', 'service_number', 'fk_status', 'fk_locations',
+        'fk_locations__name', 'fk_locations__latitude', 'fk_locations__longitude',
+    )
+
+
+def build_route(day, management_ids, status_id=None, start=None):
+    """Stops of the day in visiting order, plus the stops without coordinates."""
+    stops = {}
+    for service in day_services(day, management_ids, status_id):
+        stop = stops.get(service['fk_locations'])
+        if stop is None:
+            stop = stops[service['fk_locations']] = {
+                'location': {
+                    'pk_location': service['fk_locations'],
+                    'name': service['fk_locations__name'],
+                    'latitude': service['fk_locations__latitude'],
+                    'longitude': service['fk_locations__longitude'],
+                },
+                'services': [],
+            }
+        stop['services'].append({
+            'pk_services': service['pk_services'],
+            'service_number': service['service_number'],
+            'fk_status': service['fk_status'],
+        })
+
+    located = [stop for stop in stops.values() if stop['location']['latitude'] is not None]
+    order, legs = plan([(stop['location']['latitude'], stop['location']['longitude']) for stop in located], start)
+    route = []
+    for position, (index, leg) in enumerate(zip(order, legs), start=1):
+        route.append({'order': position, 'leg_km': round(leg, 3), **located[index]})
+    return {
+        'distance_km': round(sum(legs), 3),
+        'stops': route,
+        # Sin coordenadas no se pueden ordenar: van aparte
+        'unrouted': [stop for stop in stops.values() if stop['location']['latitude'] is None],
+    }
+
+
+def cached_route(day, management_ids, status_id=None, start=None):
+    """``build_route`` served from the cache until the day's services or the locations change."""
+    if not catalog_cache.is_shared():
+        return build_route(day, management_ids, status_id, start)
+    versions = catalog_cache.get_versions(['routes', f'routes:{day}'])
+    signature = hashlib.md5(
+        f'{versions}:{day}:{sorted(management_ids)}:{status_id}:{start}'.encode()
+    ).hexdigest()
+    route = cache.get(CACHE_PREFIX + signature)
+    if route is None:
+        route = build_route(day, management_ids, status_id, start)
+        cache.set(CACHE_PREFIX + signature, route, timeout=catalog_cache.DATA_TIMEOUT)
+    return route
+
+
+def invalidate(days=None):
+    """Drops the cached routes of ``days`` (of every day when None)."""
+    names = ['routes'] if days is None else [f'routes:{day}' for day in days]
+    if not names:
+        return
+    catalog_cache.bump(*names)
+    # Otra vez al confirmar: una lectura concurrente pudo guardar la ruta anterior
+    transaction.on_commit(lambda: catalog_cache.bump(*names))
@@ -0,0 +1,111 @@
+"""
+Bulk scheduling of services.
+
+Service numbers come from ServiceNumberSequence in blocks: one locked
+UPDATE reserves the numbers of a whole batch. Foreign keys are checked
+with one query per related model for the whole batch, and the valid
+services are inserted with bulk_create in a single transaction, so the
+cost of scheduling a month of services does not grow with one request
+(and its validation queries) per service.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.client.models import Client
+from apps.core.models import Location
+from apps.services import routing
+from apps.services.models import Services, ServiceNumberSequence, Status, TypeServices
+from apps.waste.models import Waste, WasteSubCategory
+
+
+SEQUENCE_NAME = 'services'
+BULK_BATCH_SIZE = 500
+BULK_MAX_ITEMS = getattr(settings, 'SERVICES_BULK_MAX_ITEMS', 5000)
+
+# Relación -> modelo que se valida por lote
+FOREIGN_KEYS = {
+    'fk_clients': Client,
+    'fk_locations': Location,
+    'fk_status': Status,
+    'fk_type_services': TypeServices,
+    'fk_waste': Waste,
+    'fk_waste_subcategory': WasteSubCategory,
+}
+
+
+def allocate_service_numbers(count):
+    """
+    Reserves ``count`` consecutive service numbers. The sequence row is
+    locked only for this short transaction; numbers of a failed insert are
+    simply skipped, as with a database sequence.
+    """
+    if count <= 0:
+        return []
+    sequences = ServiceNumberSequence.objects.filter(name=SEQUENCE_NAME)
+    with transaction.atomic():
+        # El UPDATE bloquea la fila hasta el commit: los bloques no se traslapan
+        if not sequences.update(last_value=F('last_value') + count):
+            ServiceNumberSequence.objects.get_or_create(name=SEQUENCE_NAME)
+            sequences.update(last_value=F('last_value') + count)
+        last_value = sequences.values_list('last_value', flat=True).get()
+    start = last_value - count + 1
+    timestamp = timezone.localtime().strftime('%Y%m%d%H%M')
+    return [f"SRV-{timestamp}-{value:08d}" for value in range(start, start + count)]
+
+
+def check_foreign_keys(items):
+    """
+    Validates the foreign keys of every item with one query per related
+    model. Returns ``{index: {field: [message]}}`` for the invalid items.
+    """
+    existing = {}
+    for field, model in FOREIGN_KEYS.items():
+        ids = {item[field] for item in items.values()}
+        if field == 'fk_waste_subcategory':
+            # Además del id, el residuo al que pertenece cada subcategoría
+            existing[field] = dict(model.objects.filter(pk__in=ids).values_list('pk', 'fk_waste_id'))
+        else:
+            existing[field] = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+    errors = {}
+    for index, item in items.items():
+        item_errors = {
+            field: [f'No existe el registro {item[field]}.']
+            for field in FOREIGN_KEYS
+            if item[field] not in existing[field]
+        }
+        subcategory_waste = existing['fk_waste_subcategory'].get(item['fk_waste_subcategory'])
+        if subcategory_waste is not None and subcategory_waste != item['fk_waste']:
+            item_errors.setdefault('fk_waste_subcategory', []).append('La subcategoría no pertenece al residuo.')
+        if item_errors:
+            errors[index] = item_errors
+    return errors
+
+
+def create_services(items):
+    """
+    Inserts ``{index: validated item}`` in one transaction with numbers
+    from a single block. Returns ``{index: Services}``.
+    """
+    indexes = list(items)
+    numbers = allocate_service_numbers(len(indexes))
+    services = [
+        Services(
+            service_number=number,
+            scheduled_date=items[index]['scheduled_date'],
+            fk_clients_id=items[index]['fk_clients'],
+            fk_locations_id=items[index]['fk_locations'],
+            fk_status_id=items[index]['fk_status'],
+            fk_type_services_id=items[index]['fk_type_services'],
+            fk_waste_id=items[index]['fk_waste'],
+            fk_waste_subcategory_id=items[index]['fk_waste_subcategory'],
+        )
+        for index, number in zip(indexes, numbers)
+    ]
+    with transaction.atomic():
+        Services.objects.bulk_create(services, batch_size=BULK_BATCH_SIZE)
+        # bulk_create no envía post_save
+        routing.invalidate({service.scheduled_date for service in services})
+    return dict(zip(indexes, services))
@@ -0,0 +1,103 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from apps.client.models import Client
+from apps.core.models import Location
+from apps.services import backups, rollups, routing
+from apps.services.models import DeletedRecord, Services, ServiceLog
+
+
+def record_deletion(sender, instance, **kwargs):
+    """Stores a tombstone so the next incremental export replays the delete."""
+    DeletedRecord.objects.create(table_name=sender._meta.db_table, record_pk=str(instance.pk))
+
+
+def remember_log(sender, instance, raw=False, **kwargs):
+    """Keeps the stored version of a ServiceLog to compute the rollup delta on save."""
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    row = ServiceLog.objects.filter(pk=instance.pk).values_list('fk_services_id', 'completed_date', 'waste_amount').first()
+    if row is not None:
+        service_id, completed_date, amount = row
+        instance._rollup_previous = (service_id, rollups.log_day(completed_date), amount)
+
+
+def rollup_log_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.log_changed(getattr(instance, '_rollup_previous', None), rollups.log_snapshot(instance))
+
+
+def rollup_log_deleted(sender, instance, **kwargs):
+    rollups.log_changed(rollups.log_snapshot(instance), None)
+
+
+def remember_service(sender, instance, raw=False, **kwargs):
+    """Keeps the stored rollup key of a Services row, its logs move if it changes."""
+    instance._rollup_key = None if raw or instance.pk is None else rollups.service_key(instance.pk)
+
+
+def rollup_service_saved(sender, instance, created=False, raw=False, **kwargs):
+    old_key = getattr(instance, '_rollup_key', None)
+    if raw or created or old_key is None:
+        return
+    rollups.move_service(instance.pk, old_key, rollups.service_key(instance.pk))
+
+
+def rollup_service_deleted(sender, instance, **kwargs):
+    # Los registros quedan con fk_services en NULL y dejan de contar
+    rollups.move_service(instance.pk, rollups.service_key(instance.pk), None)
+
+
+def remember_client_management(sender, instance, raw=False, **kwargs):
+    """Keeps the stored management of a Client, its rollup rows move if it changes."""
+    instance._rollup_management = None
+    if not raw and instance.pk is not None:
+        instance._rollup_management = Client.objects.filter(pk=instance.pk).values_list('fk_management_id', flat=True).first()
+
+
+def rollup_client_saved(sender, instance, created=False, raw=False, **kwargs):
+    old_management = getattr(instance, '_rollup_management', None)
+    if raw or created or old_management is None or old_management == instance.fk_management_id:
+        return
+    rollups.move_client(instance.pk, instance.fk_management_id)
+
+
+def remember_route_day(sender, instance, raw=False, **kwargs):
+    """Keeps the stored day of a Services row: moving it changes two days' routes."""
+    instance._route_day = None
+    if not raw and instance.pk is not None:
+        instance._route_day = Services.objects.filter(pk=instance.pk).values_list('scheduled_date', flat=True).first()
+
+
+def route_service_changed(sender, instance, **kwargs):
+    routing.invalidate({instance.scheduled_date, getattr(instance, '_route_day', None)} - {None})
+
+
+def route_location_changed(sender, instance, **kwargs):
+    # Las coordenadas de una ubicación cambian las rutas de cualquier día
+    routing.invalidate()
+
+
+def connect_signals():
+    for model in backups.incremental_models().values():
+        post_delete.connect(record_deletion, sender=model, dispatch_uid=f'tombstone_{model._meta.db_table}')
+    for model in backups.set_null_dependents():
+        pre_delete.connect(
+            backups.touch_set_null_dependents, sender=model, dispatch_uid=f'touch_dependents_{model._meta.label_lower}',
+        )
+
+    pre_save.connect(remember_log, sender=ServiceLog, dispatch_uid='rollup_log_pre_save')
+    post_save.connect(rollup_log_saved, sender=ServiceLog, dispatch_uid='rollup_log_post_save')
+    post_delete.connect(rollup_log_deleted, sender=ServiceLog, dispatch_uid='rollup_log_post_delete')
+    pre_save.connect(remember_service, sender=Services, dispatch_uid='rollup_service_pre_save')
+    post_save.connect(rollup_service_saved, sender=Services, dispatch_uid='rollup_service_post_save')
+    pre_delete.connect(rollup_service_deleted, sender=Services, dispatch_uid='rollup_service_pre_delete')
+    pre_save.connect(remember_client_management, sender=Client, dispatch_uid='rollup_client_pre_save')
+    post_save.connect(rollup_client_saved, sender=Client, dispatch_uid='rollup_client_post_save')
+
+    pre_save.connect(remember_route_day, sender=Services, dispatch_uid='route_service_pre_save')
+    post_save.connect(route_service_changed, sender=Services, dispatch_uid='route_service_post_save')
+    post_delete.connect(route_service_changed, sender=Services, dispatch_uid='route_service_post_delete')
+    post_save.connect(route_location_changed, sender=Location, dispatch_uid='route_location_post_save')
+    post_delete.connect(route_location_changed, sender=Location, dispatch_uid='route_location_post_delete')
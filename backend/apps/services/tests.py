@@ -1,3 +1,1361 @@
-from django.test import TestCase
+import base64
+import csv
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+import psycopg2
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User, OneTimePassword
+from apps.client.models import Client, ClientsLocations
+from apps.core.models import Location
+from apps.management.models import Management, CollectorUsers, ManagementWaste
+from apps.services import backups, jobs, recurrence, rollups, routing
+from apps.services.models import Status, TypeServices, Services, ServiceLog, BackupJob, DeletedRecord, TableExport, WasteRollup, ServiceRecurrence
+from apps.waste.models import Waste, WasteSubCategory
+
+
+class ServicesFixtureMixin:
+    """
+    Crea el catálogo mínimo que necesita un servicio y permite generar
+    servicios en bloque para las pruebas.
+    """
+
+    def create_catalog(self):
+        self.management = Management.objects.create(name="Gerencia", email="gerencia@example.com")
+        self.client_obj = Client.objects.create(
+            fk_management=self.management,
+            name="Cliente",
+            legal_name="Cliente SA de CV",
+            rfc="CLI010101AAA",
+            email="cliente@example.com",
+        )
+        self.location = Location.objects.create(name="Planta Norte", city="Monterrey")
+        self.status = Status.objects.create(name="Pendiente")
+        self.type_service = TypeServices.objects.create(fk_management=self.management, name="Recolección")
+        self.waste = Waste.objects.create(name="Orgánico")
+        self.subcategory = WasteSubCategory.objects.create(
+            fk_waste=self.waste, name="Poda", description="Residuos de poda"
+        )
+        self.collector = User.objects.create_user(
+            email="collector@example.com",
+            username="collector",
+            first_name="Col",
+            last_name="Lector",
+            password="collectorpass123",
+            role="collector",
+        )
+
+    def create_services(self, count, start=0):
+        today = date.today()
+        return Services.objects.bulk_create(
+            Services(
+                service_number=f"SRV-TEST-{start + i:06d}",
+                scheduled_date=today + timedelta(days=i % 30),
+                fk_clients=self.client_obj,
+                fk_locations=self.location,
+                fk_status=self.status,
+                fk_type_services=self.type_service,
+                fk_waste=self.waste,
+                fk_waste_subcategory=self.subcategory,
+            )
+            for i in range(count)
+        )
+
+
+class PlanStatisticsMixin:
+    """
+    Estadísticas del planificador para las pruebas de EXPLAIN. Se toman en
+    setUp, con los datos de la clase. ANALYZE actualiza pg_class fuera de la
+    transacción de la prueba y las filas revertidas dejan páginas muertas:
+    antes y después de la clase se hace VACUUM ANALYZE de las tablas vacías,
+    para que ningún plan dependa de las clases que se ejecutaron antes.
+    """
+    analyzed_models = ()
+
+    @classmethod
+    def analyze(cls, vacuum=False):
+        command = 'VACUUM ANALYZE' if vacuum else 'ANALYZE'
+        with connection.cursor() as cursor:
+            for model in cls.analyzed_models:
+                cursor.execute(f'{command} "{model._meta.db_table}"')
+
+    @classmethod
+    def setUpClass(cls):
+        # Antes de abrir la transacción de la clase: VACUUM no puede ir dentro de una
+        cls.analyze(vacuum=True)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        self.analyze()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.analyze(vacuum=True)
+
+
+class ServicesQueryCountTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.create_catalog()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_services_list_query_count_is_constant(self):
+        self.create_services(10)
+        small, _ = self.count_queries('/api/v1/services/services/')
+
+        self.create_services(10000 - 10, start=10)
+        large, response = self.count_queries('/api/v1/services/services/?page_size=500')
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 2)
+        self.assertEqual(len(response.data['results']), 500)
+
+    def test_services_nested_representation(self):
+        service = self.create_services(1)[0]
+        _, response = self.count_queries(f'/api/v1/services/services/{service.pk_services}/')
+        self.assertEqual(response.data['fk_clients']['name'], "Cliente")
+        self.assertEqual(response.data['fk_locations']['name'], "Planta Norte")
+        self.assertEqual(response.data['fk_status']['name'], "Pendiente")
+        self.assertEqual(response.data['fk_type_services']['name'], "Recolección")
+        self.assertEqual(response.data['fk_waste']['name'], "Orgánico")
+        self.assertEqual(response.data['fk_waste_subcategory']['fk_waste']['name'], "Orgánico")
+
+    def test_service_logs_list_query_count_is_constant(self):
+        services = self.create_services(50)
+
+        def create_logs(items):
+            ServiceLog.objects.bulk_create(
+                ServiceLog(
+                    completed_date=timezone.now(),
+                    waste_amount=10,
+                    fk_user=self.collector,
+                    fk_services=service,
+                )
+                for service in items
+            )
+
+        create_logs(services[:5])
+        small, _ = self.count_queries('/api/v1/services/service-logs/')
+
+        create_logs(services[5:])
+        large, response = self.count_queries('/api/v1/services/service-logs/')
+
+        self.assertEqual(small, large)
+        first = response.data['results'][0]
+        self.assertEqual(first['fk_user']['username'], "collector")
+        self.assertEqual(first['fk_services']['fk_clients']['name'], "Cliente")
+
+
+class SparseFieldsetsTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+        self.services = self.create_services(20)
+        ServiceLog.objects.bulk_create(
+            ServiceLog(completed_date=timezone.now(), waste_amount=5, fk_user=self.collector, fk_services=service)
+            for service in self.services
+        )
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, queries
+
+    def test_flat_ids_and_names_join_only_what_they_read(self):
+        response, queries = self.get(
+            '/api/v1/services/services/', fields='pk_services,service_number,fk_locations,client_name,status_name'
+        )
+        first = response.data['results'][0]
+        self.assertEqual(set(first), {'pk_services', 'service_number', 'fk_locations', 'client_name', 'status_name'})
+        self.assertEqual((first['fk_locations'], first['client_name'], first['status_name']), (self.location.pk, "Cliente", "Pendiente"))
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertEqual(sql.count(' JOIN '), 2)
+        self.assertNotIn(Location._meta.db_table, sql)
+
+        full, _ = self.get('/api/v1/services/services/')
+        self.assertLess(len(response.content), len(full.content) / 4)
+
+    def test_expand_embeds_only_the_requested_relations(self):
+        response, queries = self.get('/api/v1/services/services/', expand='fk_clients')
+        first = response.data['results'][0]
+        self.assertEqual(first['fk_clients']['name'], "Cliente")
+        self.assertEqual((first['fk_locations'], first['fk_waste_subcategory']), (self.location.pk, self.subcategory.pk))
+        self.assertNotIn('client_name', first)
+        self.assertEqual(queries[0]['sql'].count(' JOIN '), 1)
+
+    def test_nested_expansion_of_service_logs(self):
+        response, queries = self.get('/api/v1/services/service-logs/', expand='fk_services,fk_services.fk_status')
+        first = response.data['results'][0]
+        self.assertEqual(first['fk_user'], self.collector.pk)
+        self.assertEqual(first['fk_services']['fk_status']['name'], "Pendiente")
+        self.assertEqual(first['fk_services']['fk_clients'], self.client_obj.pk)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.get('/api/v1/services/service-logs/', fields='pk_service_log,waste_amount,service_number,user_name')
+        self.assertEqual(
+            response.data['results'][0],
+            {'pk_service_log': first['pk_service_log'], 'waste_amount': '5.00', 'service_number': first['fk_services']['service_number'], 'user_name': "Col Lector"},
+        )
+        self.assertEqual(queries[0]['sql'].count(' JOIN '), 2)
+
+
+class ServicesPaginationTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.create_catalog()
+        # 30 fechas distintas con 5 servicios cada una: muchos empates en scheduled_date
+        self.services = self.create_services(150)
+
+    def walk(self, url):
+        seen, pages = [], 0
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['pk_services'] for item in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return seen, pages
+
+    def test_pages_follow_scheduled_date_then_pk(self):
+        seen, pages = self.walk('/api/v1/services/services/?page_size=7')
+        expected = list(
+            Services.objects.order_by('-scheduled_date', 'pk_services').values_list('pk_services', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 22)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.api.get('/api/v1/services/services/?page_size=7').data
+        self.assertIsNone(first['previous'])
+        second = self.api.get(first['next']).data
+        back = self.api.get(second['previous']).data
+        self.assertEqual(
+            [item['pk_services'] for item in back['results']],
+            [item['pk_services'] for item in first['results']],
+        )
+
+    def test_service_logs_walk_by_completed_date(self):
+        now = timezone.now()
+        ServiceLog.objects.bulk_create(
+            ServiceLog(
+                completed_date=now - timedelta(minutes=i % 4, microseconds=i),
+                waste_amount=1,
+                fk_services=service,
+            )
+            for i, service in enumerate(self.services[:20])
+        )
+        seen, url = [], '/api/v1/services/service-logs/?page_size=3'
+        while url:
+            data = self.api.get(url).data
+            seen.extend(item['pk_service_log'] for item in data['results'])
+            url = data['next']
+        expected = list(
+            ServiceLog.objects.order_by('-completed_date', '-pk_service_log').values_list('pk_service_log', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.api.get('/api/v1/services/services/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_position(self):
+        for position in ([{'a': 1}, 1], [[1], 1], [None, 1], ['no-es-fecha', 1], ['2030-01-01', 'uno']):
+            cursor = base64.b64encode(urlencode({'p': json.dumps(position)}).encode()).decode()
+            response = self.api.get('/api/v1/services/services/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+    def test_filters(self):
+        other_client = Client.objects.create(
+            fk_management=Management.objects.create(name="Otra", email="otra@example.com"),
+            name="Otro", legal_name="Otro SA", rfc="OTR010101AAA", email="otro@example.com",
+        )
+        done = Status.objects.create(name="Completado")
+        Services.objects.filter(pk__in=[service.pk for service in self.services[:10]]).update(fk_clients=other_client)
+        Services.objects.filter(pk__in=[service.pk for service in self.services[5:15]]).update(fk_status=done)
+        today = date.today()
+
+        def pks(**params):
+            seen, _ = self.walk('/api/v1/services/services/?' + '&'.join(f'{key}={value}' for key, value in params.items()))
+            return sorted(seen)
+
+        def expected(**lookups):
+            return sorted(Services.objects.filter(**lookups).values_list('pk_services', flat=True))
+
+        self.assertEqual(pks(client=other_client.pk), expected(fk_clients=other_client))
+        self.assertEqual(pks(management=self.management.pk), expected(fk_clients=self.client_obj))
+        self.assertEqual(pks(client=other_client.pk, status=done.pk), expected(fk_clients=other_client, fk_status=done))
+        self.assertEqual(
+            pks(date_from=today + timedelta(days=3), date_to=today + timedelta(days=5), status=self.status.pk),
+            expected(scheduled_date__range=(today + timedelta(days=3), today + timedelta(days=5)), fk_status=self.status),
+        )
+        for param, field, value in (
+            ('location', 'fk_locations', self.location), ('type', 'fk_type_services', self.type_service),
+            ('waste', 'fk_waste', self.waste), ('subcategory', 'fk_waste_subcategory', self.subcategory),
+        ):
+            self.assertEqual(pks(**{param: value.pk, 'page_size': 50}), expected(**{field: value}))
+        self.assertEqual(self.api.get('/api/v1/services/services/?client=abc').status_code, 400)
+        self.assertEqual(self.api.get('/api/v1/services/services/?date_from=2026-02-01&date_to=2026-01-01').status_code, 400)
+
+    def test_whitelisted_ordering(self):
+        seen, _ = self.walk('/api/v1/services/services/?ordering=-service_number&page_size=40')
+        self.assertEqual(
+            seen, list(Services.objects.order_by('-service_number').values_list('pk_services', flat=True))
+        )
+        # Un campo fuera de la lista se ignora y se usa el orden por defecto
+        seen, _ = self.walk('/api/v1/services/services/?ordering=fk_clients__name&page_size=40')
+        self.assertEqual(
+            seen, list(Services.objects.order_by('-scheduled_date', 'pk_services').values_list('pk_services', flat=True))
+        )
+
+
+class CsvExportTestCase(TestCase):
+    def test_unknown_table_is_rejected(self):
+        response = APIClient().post('/api/v1/services/export-csv/', {'table': 'no_such_table'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY y cursores con nombre requieren PostgreSQL')
+class CsvStreamingExportTestCase(ServicesFixtureMixin, TransactionTestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.create_catalog()
+        self.create_services(20000)
+        self.table = Services._meta.db_table
+
+    def test_export_to_disk_uses_copy(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(backups, 'CSV_EXPORT_DIR', tmp):
+            response = self.api.post('/api/v1/services/export-csv/', {'table': self.table}, format='json')
+            self.assertEqual(response.status_code, 201)
+            (name,) = os.listdir(os.path.join(tmp, self.table))
+            with open(os.path.join(tmp, self.table, name), encoding='utf-8') as f:
+                lines = sum(1 for _ in f)
+        self.assertEqual(lines, 20001)
+
+    def test_download_streams_response(self):
+        response = self.api.post(
+            '/api/v1/services/export-csv/', {'table': self.table, 'download': True}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content.count('\n'), 20001)
+        self.assertTrue(content.startswith('pk_services,'))
+
+    def test_stream_memory_is_bounded_by_batch(self):
+        tracemalloc.start()
+        for _ in backups.iter_table_csv(self.table, batch_size=500):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # 20k filas ocupan varios MB; un lote de 500 debe quedar muy por debajo
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY FROM STDIN requiere PostgreSQL')
+class CsvRestoreTestCase(ServicesFixtureMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_catalog()
+        self.create_services(3000)
+        self.table = Services._meta.db_table
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'services.csv')
+        backups.export_table_to_file(self.table, self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def index_names(self):
+        with connection.cursor() as cursor:
+            return {
+                name for name, info in connection.introspection.get_constraints(cursor, self.table).items()
+                if info['index'] or info['foreign_key']
+            }
+
+    def test_restore_reloads_rows_and_resets_sequence(self):
+        indexes = self.index_names()
+        Services.objects.all().delete()
+
+        stats = backups.restore_table(self.table, self.path, chunk_size=4096)
+
+        self.assertEqual(stats['rows'], 3000)
+        self.assertGreater(stats['rows_per_second'], 0)
+        self.assertEqual(Services.objects.count(), 3000)
+        self.assertEqual(self.index_names(), indexes)
+
+        max_pk = Services.objects.order_by('-pk_services').values_list('pk_services', flat=True)[0]
+        new = self.create_services(1, start=99999)[0]
+        self.assertGreater(new.pk_services, max_pk)
+
+    def test_failed_restore_rolls_back(self):
+        with open(self.path, encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        # Copia de una fila exportada con un cliente inexistente: falla al volver a crear la llave foránea
+        bad = {**rows[-1], 'pk_services': '999999', 'service_number': 'SRV-BAD', 'fk_clients_id': '999999'}
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            csv.DictWriter(f, fieldnames=rows[0].keys(), lineterminator='\n').writerow(bad)
+        with self.assertRaises(psycopg2.errors.ForeignKeyViolation):
+            backups.restore_table(self.table, self.path)
+        self.assertEqual(Services.objects.count(), 3000)
+
+
+class BackupJobQueueTestCase(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+
+    def test_backup_endpoint_returns_job_immediately(self):
+        with mock.patch.object(backups, 'dump_database') as dump:
+            response = self.api.post('/api/v1/services/backupCompleteDB/')
+        self.assertEqual(response.status_code, 202)
+        dump.assert_not_called()
+
+        job = BackupJob.objects.get(pk=response.data['job'])
+        self.assertEqual(job.status, BackupJob.STATUS_QUEUED)
+        self.assertTrue(response.data['status_url'].endswith(f'/backup-jobs/{job.pk}/'))
+
+    def test_parallel_jobs_are_bounded(self):
+        with mock.patch.object(backups, 'BACKUP_MAX_PARALLEL_JOBS', 2):
+            accepted = self.api.post('/api/v1/services/backupCompleteDB/', {'jobs': 2}, format='json')
+            too_many = self.api.post('/api/v1/services/backupCompleteDB/', {'jobs': 3}, format='json')
+            not_a_number = self.api.post('/api/v1/services/backupCompleteDB/', {'jobs': 'muchos'}, format='json')
+            parallel = self.api.post('/api/v1/services/backupCompleteDB/', {'parallel': True}, format='json')
+        self.assertEqual(accepted.status_code, 202)
+        self.assertEqual(BackupJob.objects.get(pk=accepted.data['job']).params, {'jobs': 2})
+        self.assertEqual((too_many.status_code, not_a_number.status_code), (400, 400))
+        self.assertIn('2', too_many.data['error'])
+        # El valor por omisión (BACKUP_PARALLEL_JOBS) también respeta el tope
+        self.assertEqual(BackupJob.objects.get(pk=parallel.data['job']).params, {'jobs': 2})
+        self.assertEqual(BackupJob.objects.count(), 2)
+
+    def test_abandoned_running_job_is_reclaimed(self):
+        job = jobs.enqueue(BackupJob.KIND_BACKUP)
+        self.assertEqual(jobs.claim_next_job().pk, job.pk)
+        # Dentro de la reserva nadie más lo toma
+        self.assertIsNone(jobs.claim_next_job())
+
+        BackupJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - jobs.JOB_LEASE - timedelta(minutes=1))
+        reclaimed = jobs.claim_next_job()
+        self.assertEqual((reclaimed.pk, reclaimed.status, reclaimed.attempts), (job.pk, BackupJob.STATUS_RUNNING, 2))
+
+        # Tras MAX_ATTEMPTS workers muertos queda fallido en lugar de volver a correr
+        BackupJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - jobs.JOB_LEASE - timedelta(minutes=1))
+        self.assertIsNone(jobs.claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackupJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+
+    def test_worker_runs_job_and_reports_progress(self):
+        job = jobs.enqueue(BackupJob.KIND_BACKUP)
+
+        def fake_dump(path, progress=None, jobs=None):
+            progress('dumping', 512)
+            self.assertEqual(BackupJob.objects.get(pk=job.pk).bytes_processed, 512)
+            return 1024
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(backups, 'BACKUP_DIR', tmp), \
+                mock.patch.object(backups, 'dump_database', side_effect=fake_dump):
+            self.assertEqual(jobs.work(once=True), 1)
+
+        response = self.api.get(f'/api/v1/services/backup-jobs/{job.pk}/')
+        self.assertEqual(response.data['status'], BackupJob.STATUS_SUCCEEDED)
+        self.assertEqual(response.data['bytes_processed'], 1024)
+        self.assertEqual(response.data['result']['bytes'], 1024)
+        self.assertIsNotNone(response.data['finished_at'])
+
+    def test_failed_job_records_error(self):
+        job = jobs.enqueue(BackupJob.KIND_RESTORE_LAST)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(backups, 'BACKUP_DIR', tmp):
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackupJob.STATUS_FAILED)
+        self.assertIn('No hay backups', job.error)
+
+    def test_restore_without_backups_is_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(backups, 'BACKUP_DIR', tmp):
+            response = self.api.post('/api/v1/services/restoreCompleteDB/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(BackupJob.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'pg_dump requiere PostgreSQL')
+class BackupJobDumpTestCase(TestCase):
+    def test_worker_dumps_database(self):
+        job = jobs.enqueue(BackupJob.KIND_BACKUP)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(backups, 'BACKUP_DIR', tmp):
+            jobs.work(once=True)
+            job.refresh_from_db()
+            self.assertEqual(job.status, BackupJob.STATUS_SUCCEEDED, job.error)
+            self.assertTrue(os.path.getsize(job.result['file']) > 0)
+            self.assertEqual(job.bytes_processed, os.path.getsize(job.result['file']))
+
+    def test_worker_dumps_directory_format_in_parallel(self):
+        job = jobs.enqueue(BackupJob.KIND_BACKUP, jobs=2)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(backups, 'BACKUP_DIR', tmp):
+            jobs.work(once=True)
+            job.refresh_from_db()
+            self.assertEqual(job.status, BackupJob.STATUS_SUCCEEDED, job.error)
+            self.assertTrue(os.path.isdir(job.result['file']))
+            self.assertTrue(os.path.exists(os.path.join(job.result['file'], 'toc.dat')))
+            self.assertEqual(job.bytes_processed, backups.backup_size(job.result['file']))
+            self.assertEqual(backups.latest_backup(), job.result['file'])
+
+
+class ChangeTrackingTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+
+    def test_services_track_updated_at(self):
+        service = self.create_services(1)[0]
+        before = Services.objects.get(pk=service.pk).updated_at
+        service.save()
+        self.assertGreater(Services.objects.get(pk=service.pk).updated_at, before)
+
+    def test_delete_leaves_tombstone(self):
+        service = self.create_services(1)[0]
+        pk = service.pk
+        service.delete()
+        self.assertTrue(
+            DeletedRecord.objects.filter(table_name=Services._meta.db_table, record_pk=str(pk)).exists()
+        )
+
+    def test_incremental_export_rejects_untracked_table(self):
+        response = APIClient().post(
+            '/api/v1/services/export-csv/', {'table': 'TypeServices', 'mode': 'incremental'}, format='json'
+        )
+        self.assertIn(response.status_code, (400, 404))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY requiere PostgreSQL')
+class IncrementalExportTestCase(ServicesFixtureMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_catalog()
+        self.services = self.create_services(200)
+        self.table = Services._meta.db_table
+        self.tmp = tempfile.TemporaryDirectory()
+        patches = [
+            mock.patch.object(backups, 'CSV_EXPORT_DIR', self.tmp.name),
+            mock.patch.object(backups, 'WATERMARK_OVERLAP', timedelta(0)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def snapshot(self):
+        return list(Services.objects.order_by('pk_services').values_list('pk_services', 'service_number', 'fk_status'))
+
+    def test_deltas_contain_only_changes_and_replay(self):
+        base = backups.export_incremental(self.table)
+        self.assertEqual((base.kind, base.rows), (TableExport.KIND_BASE, 200))
+
+        changed = self.services[0]
+        changed.fk_status = Status.objects.create(name="Completado")
+        changed.save()
+        self.services[1].delete()
+        self.create_services(3, start=1000)
+
+        delta = backups.export_incremental(self.table)
+        self.assertEqual((delta.kind, delta.rows, delta.deleted), (TableExport.KIND_DELTA, 4, 1))
+
+        self.services[2].delete()
+        second = backups.export_incremental(self.table)
+        self.assertEqual((second.rows, second.deleted), (0, 1))
+
+        expected = self.snapshot()
+        Services.objects.all().delete()
+
+        stats = backups.restore_incremental(self.table)
+        self.assertEqual(stats['deltas'], 2)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_deleting_a_service_marks_its_logs(self):
+        table = ServiceLog._meta.db_table
+        service = self.services[0]
+        ServiceLog.objects.bulk_create(
+            ServiceLog(fk_services=service, fk_user=self.collector, completed_date=timezone.now(), waste_amount=i)
+            for i in range(3)
+        )
+        ServiceLog.objects.create(fk_services=self.services[1], completed_date=timezone.now(), waste_amount=9)
+        backups.export_incremental(table)
+
+        # SET_NULL limpia fk_services con un UPDATE que no toca updated_at
+        service.delete()
+        delta = backups.export_incremental(table)
+        self.assertEqual(delta.rows, 3)
+
+        expected = list(ServiceLog.objects.order_by('pk').values_list('pk', 'fk_services', 'fk_user'))
+        # Sin el cambio en el delta, la bitácora restaurada apuntaría al servicio borrado y fallaría la FK
+        backups.restore_incremental(table)
+        self.assertEqual(list(ServiceLog.objects.order_by('pk').values_list('pk', 'fk_services', 'fk_user')), expected)
+
+        self.collector.delete()
+        self.assertEqual(backups.export_incremental(table).rows, 3)
+
+    def test_exports_purge_their_tombstones(self):
+        backups.export_incremental(self.table)
+        self.services[0].delete()
+        Location.objects.create(name="Borrada").delete()
+        self.assertEqual(DeletedRecord.objects.count(), 2)
+
+        delta = backups.export_incremental(self.table)
+        self.assertEqual(delta.deleted, 1)
+        # Solo las de la tabla exportada: la de Location la necesita su siguiente delta
+        self.assertEqual(list(DeletedRecord.objects.values_list('table_name', flat=True)), [Location._meta.db_table])
+
+    def test_delta_reusing_unique_values(self):
+        table = Status._meta.db_table
+        reused = Status.objects.create(name="Reusado")
+        first, second = Status.objects.create(name="Uno"), Status.objects.create(name="Dos")
+        backups.export_incremental(table)
+
+        # Otra fila toma el nombre de una borrada, y dos filas intercambian sus nombres
+        reused.delete()
+        Status.objects.create(name="Reusado")
+        first.name = "Temporal"
+        first.save()
+        second.name = "Uno"
+        second.save()
+        first.name = "Dos"
+        first.save()
+        backups.export_incremental(table)
+
+        expected = list(Status.objects.order_by('pk').values_list('pk', 'name'))
+        backups.restore_incremental(table)
+        self.assertEqual(list(Status.objects.order_by('pk').values_list('pk', 'name')), expected)
+
+
+class WasteRollupTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+        self.service = self.create_services(1)[0]
+        self.now = timezone.now()
+
+    def log(self, amount, days_ago=0, service=None):
+        return ServiceLog.objects.create(
+            fk_services=service or self.service,
+            fk_user=self.collector,
+            completed_date=self.now - timedelta(days=days_ago),
+            waste_amount=amount,
+        )
+
+    def rollup_rows(self):
+        return list(
+            WasteRollup.objects.order_by('fk_client', 'day')
+            .values_list('fk_management', 'fk_client', 'fk_waste', 'fk_waste_subcategory', 'day', 'waste_amount', 'log_count')
+        )
+
+    def test_rollups_follow_log_writes(self):
+        today = timezone.localdate(self.now)
+        first = self.log('10.50')
+        self.log('4.50')
+        self.assertEqual(
+            self.rollup_rows(),
+            [(self.management.pk, self.client_obj.pk, self.waste.pk, self.subcategory.pk, today, Decimal('15.00'), 2)],
+        )
+
+        first.waste_amount = Decimal('1.50')
+        first.completed_date = self.now - timedelta(days=1)
+        first.save()
+        self.assertEqual(
+            [(row[4], row[5], row[6]) for row in self.rollup_rows()],
+            [(today - timedelta(days=1), Decimal('1.50'), 1), (today, Decimal('4.50'), 1)],
+        )
+
+        first.delete()
+        self.assertEqual([(row[4], row[6]) for row in self.rollup_rows()], [(today, 1)])
+
+    def test_service_changes_move_rollups(self):
+        self.log('7.00')
+        self.log('3.00', days_ago=2)
+        other_management = Management.objects.create(name="Otra", email="otra@example.com")
+        other_client = Client.objects.create(
+            fk_management=other_management, name="Otro", legal_name="Otro SA", rfc="OTR010101AAA", email="otro@example.com"
+        )
+
+        self.service.fk_clients = other_client
+        self.service.save()
+        self.assertEqual({row[:2] for row in self.rollup_rows()}, {(other_management.pk, other_client.pk)})
+        self.assertEqual(sum(row[5] for row in self.rollup_rows()), Decimal('10.00'))
+
+        self.service.delete()
+        self.assertFalse(WasteRollup.objects.exists())
+
+    def test_client_management_change_moves_rollups(self):
+        self.log('7.00')
+        self.log('3.00', days_ago=2)
+        other_management = Management.objects.create(name="Otra", email="otra@example.com")
+
+        self.client_obj.fk_management = other_management
+        self.client_obj.save()
+        self.assertEqual({row[:2] for row in self.rollup_rows()}, {(other_management.pk, self.client_obj.pk)})
+        self.assertEqual(sum(row[5] for row in self.rollup_rows()), Decimal('10.00'))
+
+        # update() no envía señales: la fila de hoy queda repetida en las dos gerencias
+        Client.objects.filter(pk=self.client_obj.pk).update(fk_management=self.management)
+        self.log('1.00')
+        self.client_obj.fk_management = other_management
+        self.client_obj.save()
+        incremental = self.rollup_rows()
+        self.assertEqual({row[0] for row in incremental}, {other_management.pk})
+        self.assertEqual(sum(row[5] for row in incremental), Decimal('11.00'))
+        rollups.rebuild()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        other = self.create_services(1, start=1)[0]
+        for days_ago in range(5):
+            self.log('2.25', days_ago=days_ago)
+            self.log('1.00', days_ago=days_ago % 2, service=other)
+        incremental = self.rollup_rows()
+        self.assertEqual(rollups.rebuild(), len(incremental))
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_waste_totals_endpoint(self):
+        for days_ago in range(3):
+            self.log('5.00', days_ago=days_ago)
+            self.log('1.00', days_ago=days_ago)
+        today = timezone.localdate(self.now)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get('/api/v1/services/waste-totals/', {
+                'management': self.management.pk,
+                'date_from': (today - timedelta(days=1)).isoformat(),
+                'date_to': today.isoformat(),
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(response.data['totals'], {'waste_amount': Decimal('12.00'), 'logs': 4})
+        self.assertEqual(
+            [(row['period'], row['waste_amount']) for row in response.data['series']],
+            [(today - timedelta(days=1), Decimal('6.00')), (today, Decimal('6.00'))],
+        )
+        self.assertEqual(response.data['by_waste'][0]['waste_name'], self.waste.name)
+
+    def test_waste_totals_rejects_inverted_range(self):
+        response = APIClient().get('/api/v1/services/waste-totals/', {'date_from': '2026-02-01', 'date_to': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHE_SHARED=True)
+class CollectorManifestTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+        CollectorUsers.objects.create(
+            fk_management=self.management, fk_user=self.collector, name="Col", last_name="Lector"
+        )
+        self.second_location = Location.objects.create(name="Almacén Sur", city="Monterrey")
+        # 60 servicios: create_services reparte las fechas en 30 días -> 2 por día
+        self.services = self.create_services(60)
+        Services.objects.filter(pk=self.services[30].pk).update(fk_locations=self.second_location)
+        self.day = self.services[0].scheduled_date
+
+    def get_manifest(self, **params):
+        return APIClient().get('/api/v1/services/manifest/', {'collector': self.collector.pk, **params})
+
+    def test_manifest_groups_day_by_location(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_manifest(date=self.day.isoformat())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['by_status'], {self.status.name: 2})
+        self.assertEqual(
+            [(entry['location']['name'], len(entry['services'])) for entry in response.data['locations']],
+            [("Almacén Sur", 1), ("Planta Norte", 1)],
+        )
+        self.assertEqual(
+            {service['service_number'] for entry in response.data['locations'] for service in entry['services']},
+            {self.services[0].service_number, self.services[30].service_number},
+        )
+
+    def test_manifest_excludes_other_managements(self):
+        other = Management.objects.create(name="Otra", email="otra@example.com")
+        Client.objects.filter(pk=self.client_obj.pk).update(fk_management=other)
+        response = self.get_manifest(date=self.day.isoformat())
+        self.assertEqual((response.status_code, response.data['total']), (200, 0))
+
+    def test_authenticated_collector_needs_only_the_services_query(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.collector.tokens()['access']}")
+        client.get('/api/v1/services/manifest/', {'date': self.day.isoformat()})
+        # El usuario y sus gerencias ya están en caché
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/services/manifest/', {'date': self.day.isoformat()})
+        self.assertEqual((response.status_code, response.data['total']), (200, 2))
+        self.assertEqual(len(queries), 1)
+
+    def test_manifest_validates_parameters(self):
+        self.assertEqual(self.get_manifest(date='18-10-2026').status_code, 400)
+        self.assertEqual(APIClient().get('/api/v1/services/manifest/').status_code, 400)
+        self.assertEqual(self.get_manifest(collector=self.collector.pk + 100).status_code, 404)
+
+
+class CollectorRouteTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+        CollectorUsers.objects.create(
+            fk_management=self.management, fk_user=self.collector, name="Col", last_name="Lector"
+        )
+        self.day = date.today()
+        # Paradas sobre una línea, creadas en desorden; el orden óptimo es el de la longitud
+        self.stops = []
+        for position in (4, 0, 7, 2, 9, 5, 1, 8, 3, 6):
+            location = Location.objects.create(name=f"Parada {position}", latitude=25.68, longitude=-100.40 + position * 0.01)
+            self.stops.append(location)
+            self.create_service(location)
+        self.create_service(Location.objects.create(name="Sin coordenadas"))
+
+    def create_service(self, location, day=None):
+        number = Services.objects.count()
+        return Services.objects.create(
+            service_number=f"SRV-RUTA-{number:04d}", scheduled_date=day or self.day,
+            fk_clients=self.client_obj, fk_locations=location, fk_status=self.status,
+            fk_type_services=self.type_service, fk_waste=self.waste, fk_waste_subcategory=self.subcategory,
+        )
+
+    def get_route(self, **params):
+        return APIClient().get('/api/v1/services/route/', {'collector': self.collector.pk, 'date': self.day.isoformat(), **params})
+
+    def stop_names(self, response):
+        return [stop['location']['name'] for stop in response.data['stops']]
+
+    def test_route_orders_the_stops(self):
+        response = self.get_route()
+        self.assertEqual(response.status_code, 200)
+        names = self.stop_names(response)
+        line = [f"Parada {position}" for position in range(10)]
+        self.assertIn(names, (line, line[::-1]))
+        self.assertAlmostEqual(response.data['distance_km'], sum(stop['leg_km'] for stop in response.data['stops']), places=2)
+        self.assertAlmostEqual(response.data['distance_km'], 9 * 1.003, delta=0.05)
+        self.assertEqual([stop['location']['name'] for stop in response.data['unrouted']], ["Sin coordenadas"])
+
+        # Desde un punto de partida, la primera parada es la más cercana a él
+        response = self.get_route(start_latitude=25.68, start_longitude=-100.29)
+        self.assertEqual(self.stop_names(response), line[::-1])
+        self.assertGreater(response.data['stops'][0]['leg_km'], 0)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_route_is_cached_until_services_change(self):
+        first = self.get_route().data
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_route().data, first)
+        # Solo las gerencias del recolector: la ruta sale del caché
+        self.assertEqual(len(queries), 1)
+
+        extra = self.create_service(Location.objects.create(name="Parada 10", latitude=25.68, longitude=-100.30))
+        self.assertIn("Parada 10", self.stop_names(self.get_route()))
+
+        # Mover un servicio a otro día cambia la ruta de los dos días
+        extra.scheduled_date = self.day + timedelta(days=1)
+        extra.save()
+        self.assertNotIn("Parada 10", self.stop_names(self.get_route()))
+        self.assertEqual(self.stop_names(self.get_route(date=extra.scheduled_date.isoformat())), ["Parada 10"])
+
+        # Los cambios masivos de estado no envían señales y también invalidan
+        done = Status.objects.create(name="Completado")
+        pending = self.get_route(status=self.status.pk).data
+        self.assertEqual(len(pending['stops']), 10)
+        self.api_bulk_status(done, [service.pk for service in Services.objects.filter(fk_locations=self.stops[0])])
+        self.assertEqual(len(self.get_route(status=self.status.pk).data['stops']), 9)
+
+        # Las coordenadas nuevas de una ubicación también
+        self.stops[0].longitude = -100.2
+        self.stops[0].save()
+        route = self.get_route().data
+        self.assertEqual(
+            next(stop for stop in route['stops'] if stop['location']['pk_location'] == self.stops[0].pk)['location']['longitude'],
+            -100.2,
+        )
+
+    def api_bulk_status(self, target, ids):
+        response = APIClient().post('/api/v1/services/services/bulk-status/', {'status': target.pk, 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_route_validates_parameters(self):
+        self.assertEqual(self.get_route(date='18-10-2026').status_code, 400)
+        self.assertEqual(self.get_route(start_latitude=95, start_longitude=0).status_code, 400)
+        self.assertEqual(self.get_route(start_latitude=25).status_code, 400)
+        self.assertEqual(self.get_route(collector=self.collector.pk + 100).status_code, 404)
+
+
+class RoutePlanTestCase(TestCase):
+    def test_plan_is_a_permutation_close_to_the_optimum(self):
+        rng = random.Random(5)
+        for trial in range(40):
+            points = [(25 + rng.uniform(0, 0.2), -100 + rng.uniform(0, 0.2)) for _ in range(rng.randint(1, 7))]
+            order, legs = routing.plan(points)
+            self.assertEqual(sorted(order), list(range(len(points))))
+            matrix = routing.distance_matrix(points)
+            best = min(
+                sum(matrix[a, b] for a, b in zip(path, path[1:]))
+                for path in itertools.permutations(range(len(points)))
+            )
+            self.assertLessEqual(sum(legs), best * 1.2 + 1e-9)
+
+    def test_three_hundred_stops(self):
+        rng = random.Random(11)
+        points = [(25.6 + rng.uniform(-0.3, 0.3), -100.3 + rng.uniform(-0.3, 0.3)) for _ in range(300)]
+        started = time.perf_counter()
+        order, legs = routing.plan(points, start=(25.6, -100.3))
+        elapsed = time.perf_counter() - started
+        self.assertEqual(sorted(order), list(range(300)))
+        matrix = routing.distance_matrix(points)
+        greedy = routing.nearest_neighbour(matrix)
+        self.assertLess(sum(legs), sum(matrix[a, b] for a, b in zip(greedy, greedy[1:])))
+        self.assertLess(elapsed, 0.5)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN de PostgreSQL')
+class QueryPlanTestCase(PlanStatisticsMixin, ServicesFixtureMixin, TestCase):
+    """
+    Plan regression tests for the hot queries. The tables are seeded and
+    ANALYZEd, then every query is EXPLAINed with enable_seqscan off: a seeded
+    test database is too small for the planner's costs to be representative,
+    so the test checks that the intended index *can* serve the query. A
+    missing or unusable index leaves a Seq Scan in the plan and fails.
+    """
+    analyzed_models = (Services, ServiceLog, OneTimePassword, Client)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_catalog(cls)
+        services = cls.create_services(cls, 2000)
+        others = cls.create_other_services(8000)
+        now = timezone.now()
+        ServiceLog.objects.bulk_create(
+            ServiceLog(
+                fk_services=services[i % len(services)],
+                fk_user=cls.collector if i % 3 else None,
+                completed_date=now - timedelta(hours=i),
+                waste_amount=i % 100,
+            )
+            for i in range(8000)
+        )
+        OneTimePassword.objects.bulk_create(
+            OneTimePassword(user=cls.collector, otp=f"{i:06d}") for i in range(1000)
+        )
+        Client.objects.bulk_create(
+            Client(
+                fk_management=cls.management if i % 5 == 0 else others[i % len(others)].fk_clients.fk_management,
+                name=f"Cliente {i:04d}",
+                legal_name=f"Cliente {i:04d} SA",
+                rfc=f"CLI{i:09d}",
+                email=f"cliente{i}@example.com",
+            )
+            for i in range(500)
+        )
+        cls.services = services
+
+    @classmethod
+    def create_other_services(cls, count, variants=8):
+        """
+        Servicios de otros catálogos, para que los filtros de las pruebas no
+        coincidan con todas las filas: con un filtro que no descarta nada, el
+        planificador puede preferir con razón otro índice.
+        """
+        managements = [Management.objects.create(name=f"Otra {i}", email=f"otra{i}@example.com") for i in range(variants)]
+        wastes = [Waste.objects.create(name=f"Otro residuo {i}") for i in range(variants)]
+        catalog = [
+            {
+                'fk_clients': Client.objects.create(
+                    fk_management=managements[i], name=f"Otro {i}", legal_name=f"Otro {i} SA",
+                    rfc=f"OTR{i:09d}", email=f"otro{i}@example.com",
+                ),
+                'fk_locations': Location.objects.create(name=f"Otra planta {i}"),
+                'fk_status': Status.objects.create(name=f"Otro estado {i}"),
+                'fk_type_services': TypeServices.objects.create(fk_management=managements[i], name=f"Otro tipo {i}"),
+                'fk_waste': wastes[i],
+                'fk_waste_subcategory': WasteSubCategory.objects.create(fk_waste=wastes[i], name=f"Otra {i}", description=f"Otra {i}"),
+            }
+            for i in range(variants)
+        ]
+        today = date.today()
+        return Services.objects.bulk_create(
+            Services(
+                service_number=f"SRV-OTHER-{i:06d}",
+                scheduled_date=today + timedelta(days=i % 30),
+                **catalog[i % variants],
+            )
+            for i in range(count)
+        )
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertIndexScan(self, queryset, *indexes):
+        """Fails on a sequential scan or when none of ``indexes`` appears in the plan."""
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+        self.assertTrue(any(index in plan for index in indexes), plan)
+
+    def test_service_logs_of_a_service(self):
+        self.assertIndexScan(
+            ServiceLog.objects.filter(fk_services=self.services[7]).order_by('-completed_date', '-pk_service_log')[:51],
+            'servicelog_service_done_idx',
+        )
+
+    def test_service_logs_of_a_collector(self):
+        self.assertIndexScan(
+            ServiceLog.objects.filter(fk_user=self.collector).order_by('-completed_date', '-pk_service_log')[:51],
+            'servicelog_user_done_idx',
+        )
+
+    def test_service_log_list(self):
+        self.assertIndexScan(
+            ServiceLog.objects.order_by('-completed_date', '-pk_service_log')[:51],
+            'servicelog_done_idx',
+        )
+
+    def test_services_list(self):
+        self.assertIndexScan(Services.objects.order_by('-scheduled_date', 'pk_services')[:51], 'services_recent_idx')
+
+    def test_services_of_a_day(self):
+        day = self.services[0].scheduled_date
+        # Ambos índices empiezan por scheduled_date; el planificador elige cualquiera
+        self.assertIndexScan(
+            Services.objects.filter(scheduled_date=day, fk_locations=self.location, fk_status=self.status),
+            'services_schedule_idx', 'services_recent_idx',
+        )
+
+    def test_filtered_services_lists(self):
+        today = date.today()
+        for field, index in (
+            ('fk_clients', 'services_clients_idx'),
+            ('fk_locations', 'services_locations_idx'),
+            ('fk_status', 'services_status_idx'),
+            ('fk_type_services', 'services_type_services_idx'),
+            ('fk_waste', 'services_waste_idx'),
+            ('fk_waste_subcategory', 'services_waste_subcategory_idx'),
+        ):
+            with self.subTest(field=field):
+                value = getattr(self.services[0], f'{field}_id')
+                self.assertIndexScan(
+                    Services.objects.filter(**{field: value, 'scheduled_date__gte': today})
+                    .order_by('-scheduled_date', 'pk_services')[:51],
+                    index,
+                )
+
+    def test_otp_lookup(self):
+        self.assertIndexScan(OneTimePassword.objects.filter(user=self.collector, otp="000123"), 'otp_user_code_uniq')
+
+    def test_otp_purge(self):
+        self.assertIndexScan(OneTimePassword.objects.filter(expires_at__lte=timezone.now()).order_by('expires_at'), 'otp_expiry_idx')
+
+    def test_clients_of_a_management(self):
+        self.assertIndexScan(
+            Client.objects.filter(fk_management=self.management).order_by('name', 'pk_client'),
+            'client_management_name_idx',
+        )
+
+
+class ServiceFormDataTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+        ManagementWaste.objects.create(fk_management=self.management, fk_waste=self.waste)
+        Waste.objects.create(name="Sin gerencia")
+        second_client = Client.objects.create(
+            fk_management=self.management, name="Cliente B", legal_name="Cliente B SA", rfc="CLB010101AAA", email="b@example.com"
+        )
+        ClientsLocations.objects.create(fk_client=self.client_obj, fk_location=self.location)
+        ClientsLocations.objects.create(fk_client=second_client, fk_location=self.location)
+        self.second_client = second_client
+        self.url = f'/api/v1/services/management/{self.management.pk}/form-data/'
+
+    def add_locations(self, count):
+        start = Location.objects.count()
+        for i in range(start, start + count):
+            location = Location.objects.create(name=f"Sucursal {i:03d}")
+            ClientsLocations.objects.create(fk_client=self.second_client, fk_location=location)
+
+    def test_form_data_is_scoped_and_mapped(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([client['name'] for client in response.data['clients']], ["Cliente", "Cliente B"])
+        self.assertEqual(
+            response.data['locations'][0]['client_ids'], [self.client_obj.pk, self.second_client.pk]
+        )
+        self.assertEqual([waste['name'] for waste in response.data['wastes']], [self.waste.name])
+        self.assertEqual(len(response.data['waste_subcategories']), 1)
+        self.assertEqual(len(response.data['type_services']), 1)
+        self.assertEqual(len(response.data['statuses']), 1)
+
+    def test_query_count_does_not_grow_with_locations(self):
+        self.add_locations(2)
+        with CaptureQueriesContext(connection) as few:
+            APIClient().get(self.url)
+        self.add_locations(40)
+        with CaptureQueriesContext(connection) as many:
+            response = APIClient().get(self.url)
+        self.assertEqual(len(response.data['locations']), 43)
+        self.assertEqual(len(many), len(few))
+        self.assertLessEqual(len(many), 7)
+
+    def test_unknown_management(self):
+        self.assertEqual(APIClient().get('/api/v1/services/management/999999/form-data/').status_code, 404)
+
+
+class BulkScheduleTestCase(ServicesFixtureMixin, TestCase):
+    url = '/api/v1/services/services/bulk/'
+
+    def setUp(self):
+        self.create_catalog()
+        self.today = date.today()
+
+    def item(self, days=0, **overrides):
+        return {
+            'scheduled_date': (self.today + timedelta(days=days)).isoformat(),
+            'fk_clients': self.client_obj.pk,
+            'fk_locations': self.location.pk,
+            'fk_status': self.status.pk,
+            'fk_type_services': self.type_service.pk,
+            'fk_waste': self.waste.pk,
+            'fk_waste_subcategory': self.subcategory.pk,
+            **overrides,
+        }
+
+    def post(self, items):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().post(self.url, {'services': items}, format='json')
+        # Sin los INSERT: SQLite parte bulk_create en lotes por su límite de parámetros
+        return response, len([query for query in queries if not query['sql'].startswith('INSERT')])
+
+    def test_month_of_services_in_one_request(self):
+        self.post([self.item()])  # crea la fila de la secuencia
+        response, small = self.post([self.item(days=i % 30) for i in range(10)])
+        self.assertEqual(response.status_code, 201)
+        response, large = self.post([self.item(days=i % 30) for i in range(300)])
+        self.assertEqual((response.status_code, response.data['created'], response.data['failed']), (201, 300, 0))
+        # Las validaciones y la numeración no dependen del número de servicios
+        self.assertEqual(small, large)
+        self.assertEqual(Services.objects.count(), 311)
+
+        numbers = [int(service['service_number'].rsplit('-', 1)[1]) for service in response.data['services']]
+        self.assertEqual(numbers, list(range(12, 312)))
+        self.assertEqual([service['index'] for service in response.data['services']], list(range(300)))
+
+    def test_invalid_items_are_reported_without_failing_the_batch(self):
+        other_waste = Waste.objects.create(name="Inorgánico")
+        response, _ = self.post([
+            self.item(),
+            self.item(fk_clients=999999),
+            self.item(days=-1),
+            self.item(fk_waste=other_waste.pk),
+            {'scheduled_date': self.today.isoformat()},
+            self.item(days=1),
+        ])
+        self.assertEqual((response.status_code, response.data['created'], response.data['failed']), (201, 2, 4))
+        self.assertEqual([service['index'] for service in response.data['services']], [0, 5])
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {1, 2, 3, 4})
+        self.assertIn('fk_clients', errors[1])
+        self.assertIn('scheduled_date', errors[2])
+        self.assertIn('fk_waste_subcategory', errors[3])
+        self.assertIn('fk_locations', errors[4])
+        self.assertEqual(Services.objects.count(), 2)
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response, _ = self.post([self.item(fk_status=999999)])
+        self.assertEqual((response.status_code, response.data['created']), (400, 0))
+        self.assertEqual(APIClient().post(self.url, {'services': []}, format='json').status_code, 400)
+
+    def test_single_create_continues_the_sequence(self):
+        self.post([self.item(), self.item()])
+        response = APIClient().post('/api/v1/services/services/', self.item(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['service_number'].endswith('-00000003'))
+
+
+class ServiceRecurrenceTestCase(ServicesFixtureMixin, TestCase):
+    def setUp(self):
+        self.create_catalog()
+        self.today = date(2026, 1, 5)
+
+    def rule(self, frequency=ServiceRecurrence.FREQUENCY_WEEKLY, **fields):
+        fields.setdefault('start_date', self.today)
+        return ServiceRecurrence.objects.create(
+            fk_client=self.client_obj,
+            fk_location=self.location,
+            fk_status=self.status,
+            fk_type_services=self.type_service,
+            fk_waste=self.waste,
+            fk_waste_subcategory=self.subcategory,
+            frequency=frequency,
+            **fields,
+        )
+
+    def dates(self, rule):
+        return list(rule.services.order_by('scheduled_date').values_list('scheduled_date', flat=True))
+
+    def test_occurrences(self):
+        weekly = ServiceRecurrence(frequency='weekly', interval=2, start_date=date(2026, 1, 1))
+        self.assertEqual(
+            recurrence.occurrences(weekly, date(2026, 1, 10), date(2026, 2, 12)),
+            [date(2026, 1, 15), date(2026, 1, 29), date(2026, 2, 12)],
+        )
+        # El día 31 se ajusta al fin de mes sin recorrer los meses siguientes
+        monthly = ServiceRecurrence(frequency='monthly', interval=1, start_date=date(2026, 1, 31), end_date=date(2026, 4, 30))
+        self.assertEqual(
+            recurrence.occurrences(monthly, date(2026, 1, 1), date(2026, 12, 31)),
+            [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)],
+        )
+
+    def test_generation_is_incremental_and_idempotent(self):
+        weekly = self.rule()
+        ended = self.rule(frequency=ServiceRecurrence.FREQUENCY_DAILY, end_date=self.today + timedelta(days=2))
+        self.rule(is_active=False)
+
+        self.assertEqual(recurrence.generate(horizon_days=20, today=self.today), (2, 6))
+        self.assertEqual(self.dates(weekly), [self.today + timedelta(days=days) for days in (0, 7, 14)])
+        self.assertEqual(len(self.dates(ended)), 3)
+        self.assertEqual(Services.objects.values('service_number').distinct().count(), 6)
+
+        # Otra vez el mismo día: nada pendiente
+        self.assertEqual(recurrence.generate(horizon_days=20, today=self.today), (0, 0))
+        # Una semana después solo se agrega la ocurrencia nueva; la regla vencida ya no se toma
+        self.assertEqual(recurrence.generate(horizon_days=20, today=self.today + timedelta(days=7)), (1, 1))
+        self.assertEqual(self.dates(weekly)[-1], self.today + timedelta(days=21))
+
+        # Sin marca de agua tampoco se duplican las fechas existentes
+        ServiceRecurrence.objects.update(generated_until=None)
+        self.assertEqual(recurrence.generate(horizon_days=27, today=self.today + timedelta(days=7)), (2, 1))
+        self.assertEqual(len(self.dates(weekly)), 5)
+
+    def test_batch_cost_does_not_depend_on_rules(self):
+        def queries(rules):
+            ServiceRecurrence.objects.all().delete()
+            for _ in range(rules):
+                self.rule()
+            with CaptureQueriesContext(connection) as captured:
+                recurrence.generate_batch(self.today + timedelta(days=30), batch_size=500, today=self.today)
+            return len([query for query in captured if not query['sql'].startswith('INSERT')])
+
+        queries(1)  # crea la fila de la secuencia
+        self.assertEqual(queries(5), queries(200))
+        # Los servicios de las reglas borradas quedan sin regla (SET_NULL)
+        self.assertEqual(Services.objects.filter(fk_recurrence__isnull=False).count(), 200 * 5)
+
+    def test_generation_runs_in_batches(self):
+        for _ in range(25):
+            self.rule()
+        with mock.patch.object(recurrence, 'generate_batch', wraps=recurrence.generate_batch) as generate_batch:
+            self.assertEqual(recurrence.generate(horizon_days=6, batch_size=10, today=self.today), (25, 25))
+        self.assertEqual(generate_batch.call_count, 4)
+
+    def test_api_update_resets_the_watermark(self):
+        rule = self.rule()
+        recurrence.generate(horizon_days=20, today=self.today)
+        response = APIClient().patch(f'/api/v1/services/recurrences/{rule.pk}/', {'interval': 2}, format='json')
+        self.assertEqual(response.status_code, 200)
+        rule.refresh_from_db()
+        self.assertIsNone(rule.generated_until)
+        response = APIClient().patch(
+            f'/api/v1/services/recurrences/{rule.pk}/', {'end_date': (self.today - timedelta(days=1)).isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+    def test_api_update_replaces_future_services(self):
+        today = timezone.localdate()
+        rule = self.rule(start_date=today - timedelta(days=7))
+        recurrence.generate(horizon_days=27, today=today - timedelta(days=7))
+        self.assertEqual(self.dates(rule), [today + timedelta(days=days) for days in (-7, 0, 7, 14)])
+        # Ya empezado: se queda aunque cambie la regla, igual que el del pasado
+        started = rule.services.get(scheduled_date=today + timedelta(days=7))
+        ServiceLog.objects.create(fk_services=started, fk_user=self.collector, completed_date=timezone.now(), waste_amount=1)
+        other_location = Location.objects.create(name="Bodega nueva")
+
+        # Mismo intervalo, tres días después y en otra ubicación
+        response = APIClient().patch(f'/api/v1/services/recurrences/{rule.pk}/', {
+            'start_date': (today - timedelta(days=4)).isoformat(), 'fk_location': other_location.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.dates(rule), [today + timedelta(days=days) for days in (-7, 7)])
+
+        self.assertEqual(recurrence.generate(horizon_days=20, today=today), (1, 3))
+        self.assertEqual(rule.services.count(), 5)
+        self.assertEqual(
+            set(rule.services.filter(scheduled_date__gte=today).exclude(pk=started.pk).values_list('fk_locations', flat=True)),
+            {other_location.pk},
+        )
+
+
+class BulkStatusTestCase(ServicesFixtureMixin, TestCase):
+    url = '/api/v1/services/services/bulk-status/'
+
+    def setUp(self):
+        self.create_catalog()
+        self.in_process = Status.objects.create(name="En Proceso")
+        self.done = Status.objects.create(name="Completado")
+        self.services = self.create_services(6)
+        self.ids = [service.pk for service in self.services]
+
+    def post(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().post(self.url, data, format='json')
+        return response, len(queries)
+
+    def test_moves_ids_with_one_update(self):
+        Services.objects.filter(pk=self.ids[0]).update(fk_status=self.done)
+        Services.objects.filter(pk=self.ids[1]).update(fk_status=self.in_process)
+        before = Services.objects.get(pk=self.ids[2]).updated_at
+
+        response, queries = self.post({'status': self.in_process.pk, 'ids': self.ids[:4]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            {'status': self.in_process.pk, 'updated': 2, 'unchanged': 1, 'rejected': [self.ids[0]], 'not_found': []},
+        )
+        # Estado destino + catálogo + filas bloqueadas + UPDATE
+        self.assertEqual(queries, 4)
+        self.assertEqual(
+            list(Services.objects.filter(pk__in=self.ids[2:4]).values_list('fk_status', flat=True)),
+            [self.in_process.pk] * 2,
+        )
+        self.assertGreater(Services.objects.get(pk=self.ids[2]).updated_at, before)
+        self.assertEqual(Services.objects.filter(pk__in=self.ids[4:], fk_status=self.status).count(), 2)
+
+    def test_unknown_ids_are_reported(self):
+        response, _ = self.post({'status': self.done.pk, 'ids': [self.ids[0], 999999]})
+        self.assertEqual((response.data['updated'], response.data['not_found']), (1, [999999]))
+
+    def test_moves_a_filtered_selection(self):
+        day = self.services[0].scheduled_date
+        selected = sorted(Services.objects.filter(scheduled_date=day).values_list('pk', flat=True))
+        response, _ = self.post({'status': self.done.pk, 'filter': {'scheduled_date': day.isoformat(), 'location': self.location.pk}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], len(selected))
+        self.assertNotIn('not_found', response.data)
+        # Completado no admite transiciones
+        response, _ = self.post({'status': self.status.pk, 'filter': {'scheduled_date': day.isoformat()}})
+        self.assertEqual((response.data['updated'], response.data['rejected']), (0, selected))
+
+    def test_requires_ids_or_a_filter(self):
+        self.assertEqual(self.post({'status': self.done.pk})[0].status_code, 400)
+        self.assertEqual(self.post({'status': self.done.pk, 'filter': {}})[0].status_code, 400)
+        self.assertEqual(self.post({'status': self.done.pk, 'ids': self.ids, 'filter': {'location': 1}})[0].status_code, 400)
+        self.assertEqual(self.post({'status': 999999, 'ids': self.ids})[0].status_code, 400)
@@ -0,0 +1,62 @@
+"""
+Bulk status transitions of services.
+
+The allowed transitions are defined between the default statuses
+(create_default_statuses) by name. A status outside STATUS_TRANSITIONS
+(one added by hand to the catalog) is not restricted as a source.
+A transition is applied with one conditional UPDATE (only rows whose
+current status may move to the target), so a concurrent change can never
+be overwritten with a transition that is no longer allowed.
+"""
+from django.utils import timezone
+
+from apps.services import routing
+from apps.services.models import Status
+
+
+STATUS_TRANSITIONS = {
+    'Pendiente': ('En Proceso', 'Completado', 'Cancelado'),
+    'En Proceso': ('Pendiente', 'Completado', 'Cancelado'),
+    'Completado': (),
+    'Cancelado': ('Pendiente',),
+}
+
+
+def allowed_sources(target):
+    """Ids of the statuses a service may leave to move to ``target``."""
+    return [
+        pk for pk, name in Status.objects.exclude(pk=target.pk).values_list('pk', 'name')
+        if name not in STATUS_TRANSITIONS or target.name in STATUS_TRANSITIONS[name]
+    ]
+
+
+def apply(services, target, ids=None):
+    """
+    Moves ``services`` (a Services queryset, already restricted to ``ids``
+    when given) to ``target``. Returns the counts plus the ids whose
+    current status cannot move to ``target`` and, with ``ids``, the ids
+    that do not exist.
+    """
+    sources = allowed_sources(target)
+    # Las filas que no se van a mover: ya en el destino o con transición no permitida
+    blocked = dict(services.exclude(fk_status_id__in=sources).values_list('pk', 'fk_status_id'))
+    # update() no aplica auto_now: updated_at se fija aquí (lo usan las exportaciones incrementales)
+    updated = services.filter(fk_status_id__in=sources).update(fk_status=target, updated_at=timezone.now())
+    if updated:
+        # update() no envía post_save; los días afectados no se conocen sin otra consulta
+        routing.invalidate()
+
+    result = {
+        'status': target.pk,
+        'updated': updated,
+        'unchanged': sum(1 for status_id in blocked.values() if status_id == target.pk),
+        'rejected': sorted(pk for pk, status_id in blocked.items() if status_id != target.pk),
+    }
+    if ids is not None:
+        found = updated + len(blocked)
+        if found < len(ids):
+            existing = set(services.model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            result['not_found'] = sorted(set(ids) - existing)
+        else:
+            result['not_found'] = []
+    return result
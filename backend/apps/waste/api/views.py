@@ -1,6 +1,8 @@
 from rest_framework import viewsets
 from apps.waste.api.serializer import WasteSerializer, WasteSubCategorySerializer, WasteSubCategoryCreateUpdateSerializer, WasteUpdateSerializer
 from apps.waste.models import Waste, WasteSubCategory
+from apps.core.pagination import KeysetPagination
+from apps.core.catalog_cache import CatalogCacheMixin, cached_response
 # Create Waste for Mnagement
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -11,12 +13,16 @@ from apps.management.api.serializer import ManagementSerializer, ManagementWaste
 from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.exceptions import PermissionDenied
 
-class WasteViewSet(viewsets.ModelViewSet):
+class WasteViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    catalogs = ('waste',)
     queryset = Waste.objects.all()
     serializer_class = WasteSerializer
+    pagination_class = KeysetPagination
+    ordering = ('name', 'pk_waste')
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
 
-class WasteSubCategoryViewSet(viewsets.ModelViewSet):
+class WasteSubCategoryViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    catalogs = ('waste',)
     queryset = WasteSubCategory.objects.select_related('fk_waste').all()
     
     def get_serializer_class(self):
@@ -67,10 +73,15 @@ class UpdateWasteForManagementAPIView(RetrieveUpdateAPIView):
 
 class WasteByManagementAPIView(APIView):
     def get(self, request, management_id):
-        # Obtiene los Waste relacionados con el Management
+        return cached_response(
+            request, ['waste', f'management_waste:{management_id}'], lambda: self.build(management_id)
+        )
+
+    def build(self, management_id):
+        # Obtiene los Waste relacionados con el Management (una sola consulta con subconsulta)
         waste_ids = ManagementWaste.objects.filter(
             fk_management=management_id
-        ).values_list('fk_waste', flat=True)  # Lista de IDs de Waste
+        ).values('fk_waste')
         
         wastes = Waste.objects.filter(pk_waste__in=waste_ids)
         serializer = WasteSerializer(wastes, many=True)
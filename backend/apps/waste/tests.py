@@ -1,3 +1,86 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.management.models import Management, ManagementWaste
+from apps.services.models import TypeServices
+from apps.waste.models import Waste, WasteSubCategory
+
+
+@override_settings(CACHE_SHARED=True)
+class CatalogCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.management = Management.objects.create(name="Gerencia", email="gerencia@example.com")
+        self.waste = Waste.objects.create(name="Orgánico")
+        WasteSubCategory.objects.create(fk_waste=self.waste, name="Poda", description="Residuos de poda")
+        ManagementWaste.objects.create(fk_management=self.management, fk_waste=self.waste)
+        self.by_management_url = f'/api/v1/management/management/{self.management.pk}/wastes/'
+
+    def test_repeated_requests_are_served_from_cache(self):
+        first = self.client.get('/api/v1/waste/waste/')
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'])
+        self.assertTrue(first['Last-Modified'])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get('/api/v1/waste/waste/')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.data, first.data)
+
+    def test_revalidation_returns_not_modified(self):
+        first = self.client.get('/api/v1/waste/subcategory/')
+        with CaptureQueriesContext(connection) as queries:
+            by_etag = self.client.get('/api/v1/waste/subcategory/', HTTP_IF_NONE_MATCH=first['ETag'])
+            by_date = self.client.get('/api/v1/waste/subcategory/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual((by_etag.status_code, by_date.status_code), (304, 304))
+        self.assertEqual(len(queries), 0)
+
+    def test_writes_invalidate_the_catalog(self):
+        first = self.client.get('/api/v1/waste/waste/')
+        Waste.objects.create(name="Inorgánico")
+        second = self.client.get('/api/v1/waste/waste/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(len(second.data['results']), 2)
+
+    def test_wastes_by_management_is_keyed_by_management(self):
+        glass = Waste.objects.create(name="Vidrio")
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get(self.by_management_url)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([waste['name'] for waste in first.data], ["Orgánico"])
+
+        # Un cambio en otra gerencia no invalida esta
+        other = Management.objects.create(name="Otra", email="otra@example.com")
+        ManagementWaste.objects.create(fk_management=other, fk_waste=glass)
+        self.assertEqual(self.client.get(self.by_management_url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        ManagementWaste.objects.filter(fk_management=self.management).delete()
+        ManagementWaste.objects.create(fk_management=self.management, fk_waste=glass)
+        self.assertEqual([waste['name'] for waste in self.client.get(self.by_management_url).data], ["Vidrio"])
+
+    def test_moving_a_row_invalidates_both_managements(self):
+        other = Management.objects.create(name="Otra", email="otra@example.com")
+        type_service = TypeServices.objects.create(fk_management=self.management, name="Recolección")
+        urls = [f'/api/v1/services/typeServices/?management={management.pk}' for management in (self.management, other)]
+        before = [self.client.get(url) for url in urls]
+        self.assertEqual([len(response.data) for response in before], [1, 0])
+
+        type_service.fk_management = other
+        type_service.save()
+        after = [self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']) for url, response in zip(urls, before)]
+        self.assertEqual([response.status_code for response in after], [200, 200])
+        self.assertEqual([len(response.data) for response in after], [0, 1])
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_is_not_used(self):
+        # Un caché por proceso no se invalida en los demás: cada petición consulta
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/v1/waste/waste/')
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(len(queries), 0)
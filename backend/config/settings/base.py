@@ -20,6 +20,7 @@ BASE_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 LOCAL_APPS = [
     "apps.core",
@@ -92,12 +93,59 @@ AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT con el usuario en caché (invalidado al modificarlo; solo con CACHE_SHARED)
+        "apps.accounts.authentication.CachedJWTAuthentication",
     )
 }
 
+# Keyset pagination (apps.core.pagination.KeysetPagination)
+# El cliente puede pedir otro tamaño con ?page_size= hasta API_MAX_PAGE_SIZE
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 500))
+
+# Caché de catálogos (apps.core.catalog_cache). Con varios procesos de servidor
+# se necesita un backend compartido para que la invalidación llegue a todos, p. ej.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://...
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+# Si la caché la comparten todos los procesos del servidor. La LocMemCache es de cada
+# proceso: un worker no ve las invalidaciones de los demás, así que sin caché compartida
+# no se cachean el usuario del JWT, los catálogos ni las rutas. Con un solo proceso
+# (runserver) se puede forzar con CACHE_SHARED=1
+CACHE_SHARED = os.environ.get(
+    "CACHE_SHARED", str(CACHES["default"]["BACKEND"] != "django.core.cache.backends.locmem.LocMemCache")
+).lower() in ("1", "true", "yes")
+
+# Servicios por solicitud en POST services/services/bulk/ (apps.services.scheduling)
+SERVICES_BULK_MAX_ITEMS = int(os.environ.get("SERVICES_BULK_MAX_ITEMS", 5000))
+# Días hacia adelante que generate_recurring_services programa (apps.services.recurrence)
+SERVICES_RECURRENCE_HORIZON_DAYS = int(os.environ.get("SERVICES_RECURRENCE_HORIZON_DAYS", 60))
+# Radio máximo de las búsquedas por cercanía de ubicaciones (apps.core.geo)
+LOCATIONS_MAX_RADIUS_KM = int(os.environ.get("LOCATIONS_MAX_RADIUS_KM", 200))
+# Subidas por fragmentos reanudables (apps.core.uploads); las que no avanzan en
+# UPLOADS_EXPIRE_HOURS las borra purge_stale_uploads
+UPLOADS_MAX_SIZE = int(os.environ.get("UPLOADS_MAX_SIZE", 100 * 1024 * 1024))
+UPLOADS_MAX_CHUNK_SIZE = int(os.environ.get("UPLOADS_MAX_CHUNK_SIZE", 8 * 1024 * 1024))
+UPLOADS_EXPIRE_HOURS = int(os.environ.get("UPLOADS_EXPIRE_HOURS", 24))
+
+# Respaldos en paralelo (pg_dump -F d -j / pg_restore -j)
+# BACKUP_COMPRESSION acepta un nivel gzip ("6") o, con PostgreSQL 16+, "zstd:3" / "lz4"
+BACKUP_PARALLEL_JOBS = int(os.environ.get("BACKUP_PARALLEL_JOBS", 4))
+# Tope de "jobs" que acepta la API; cada uno es un proceso y una conexión a la base
+BACKUP_MAX_PARALLEL_JOBS = int(os.environ.get("BACKUP_MAX_PARALLEL_JOBS", os.cpu_count() or 1))
+BACKUP_COMPRESSION = os.environ.get("BACKUP_COMPRESSION", "6")
+# Un job "running" con started_at más viejo que esto es de un worker muerto y se
+# vuelve a tomar; debe superar al respaldo o restauración más largo
+BACKUP_JOB_LEASE_MINUTES = int(os.environ.get("BACKUP_JOB_LEASE_MINUTES", 360))
+
 SIMPLE_JWT = {
-    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
+    # El usuario autenticado se cachea mientras dura el token; con 5 minutos los
+    # clientes renovaban el token (y la caché) a cada rato
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.environ.get("JWT_ACCESS_TOKEN_MINUTES", 30))),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
@@ -140,3 +188,13 @@ EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 EMAIL_PORT = os.environ.get("EMAIL_PORT", "2525")
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = "no-reply@example.com"
+
+# Bandeja de salida (apps.accounts.outbox, comando run_email_worker)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 6))
+# Reintentos: RETRY_DELAY * 2^(intento-1) segundos, como máximo RETRY_MAX_DELAY
+EMAIL_OUTBOX_RETRY_DELAY = int(os.environ.get("EMAIL_OUTBOX_RETRY_DELAY", 30))
+EMAIL_OUTBOX_RETRY_MAX_DELAY = int(os.environ.get("EMAIL_OUTBOX_RETRY_MAX_DELAY", 3600))
+
+# Vigencia de los OTP de verificación; los vencidos los borra purge_expired_otps
+OTP_TTL_MINUTES = int(os.environ.get("OTP_TTL_MINUTES", 5))
@@ -7,4 +7,81 @@ const api = axios.create({
     },
 });
 
-export default api;
\ No newline at end of file
+export default api;
+
+// Los listados con paginación por cursor devuelven { next, previous, results }.
+export interface Page<T> {
+    next: string | null;
+    previous: string | null;
+    results: T[];
+}
+
+// Máximo de elementos por página que acepta el backend (API_MAX_PAGE_SIZE)
+export const MAX_PAGE_SIZE = 500;
+
+// Una sola página: la primera con `pageSize`, o la de un enlace `next`/`previous`
+// (que ya lleva su page_size). Las tablas piden la siguiente solo cuando hace falta.
+export const getPage = async <T>(url: string, pageSize?: number): Promise<Page<T>> => {
+    const separator = url.includes('?') ? '&' : '?';
+    const response = await api.get<Page<T>>(pageSize ? `${url}${separator}page_size=${pageSize}` : url);
+    return response.data;
+};
+
+// Catálogo para selects (residuos, recolectores): una sola página acotada, nunca se
+// recorren todos los cursores. `complete` es false si el servidor tiene más filas de
+// las descargadas; la pantalla lo avisa o usa searchRecords en su lugar.
+export interface Catalog<T> {
+    items: T[];
+    complete: boolean;
+}
+
+export const getCatalog = async <T>(url: string, limit = MAX_PAGE_SIZE): Promise<Catalog<T>> => {
+    const page = await getPage<T>(url, limit);
+    return { items: page.results, complete: page.next === null };
+};
+
+export type SearchType = 'clients' | 'locations' | 'services';
+
+// Búsqueda por prefijo del backend (core/search/): regresa a lo más `limit` filas por tipo
+export const searchRecords = async <T>(
+    q: string,
+    type: SearchType,
+    options: { limit?: number; management?: number } = {},
+): Promise<T[]> => {
+    const response = await api.get<Record<SearchType, T[]>>('core/search/', {
+        params: { q, types: type, ...options },
+    });
+    return response.data[type] ?? [];
+};
+
+// Subida por fragmentos reanudable (core/uploads/): si se corta la conexión se
+// pregunta al servidor cuántos bytes recibió y se sigue desde ahí. Regresa el id
+// de la subida completa, que se envía como document_upload / pdf_upload.
+export const uploadInChunks = async (file: File, retries = 5): Promise<string> => {
+    const { data: upload } = await api.post('core/uploads/', { filename: file.name, size: file.size });
+    const url = `core/uploads/${upload.pk_upload}/`;
+    let offset: number | null = 0;
+    let failures = 0;
+    while (offset === null || offset < file.size) {
+        try {
+            if (offset === null) {
+                // Tras un corte de red se pregunta cuántos bytes llegaron
+                offset = (await api.get(url)).data.offset as number;
+                continue;
+            }
+            const response = await api.patch(url, file.slice(offset, offset + upload.chunk_size), {
+                headers: { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset) },
+            });
+            offset = response.data.offset as number;
+            failures = 0;
+        } catch (error) {
+            if (!axios.isAxiosError(error) || (error.response && error.response.status !== 409) || ++failures > retries) {
+                throw error;
+            }
+            // Un 409 ya trae el offset correcto
+            offset = error.response?.data.offset ?? null;
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        }
+    }
+    return upload.pk_upload;
+};
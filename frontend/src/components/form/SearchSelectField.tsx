@@ -0,0 +1,118 @@
+import { useEffect, useState } from "react";
+import { searchRecords, SearchType } from "../../api";
+
+export interface SearchSelectFieldProps<T> {
+    type: SearchType;
+    value?: number | null;
+    // Texto del valor actual; el padre lo guarda junto con el valor (onChange)
+    selectedLabel?: string;
+    getValue: (row: T) => number;
+    getLabel: (row: T) => string;
+    onChange: (value: number | null, label: string) => void;
+    management?: number;
+    label?: string;
+    placeholder?: string;
+    error?: string;
+    className?: string;
+}
+
+// Select con búsqueda en el servidor: en lugar de descargar todos los registros
+// se piden los que coinciden con lo escrito (a partir de 2 caracteres).
+const SearchSelectField = <T,>({
+    type,
+    value,
+    selectedLabel = "",
+    getValue,
+    getLabel,
+    onChange,
+    management,
+    label,
+    placeholder = "Buscar...",
+    error,
+    className = "w-full p-2 text-sm border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500",
+}: SearchSelectFieldProps<T>) => {
+    const [text, setText] = useState(selectedLabel);
+    const [results, setResults] = useState<T[]>([]);
+    const [isOpen, setIsOpen] = useState(false);
+
+    // Al limpiar el formulario o cargar otro registro se muestra el texto de su valor
+    useEffect(() => {
+        setText(value ? selectedLabel : "");
+    }, [value, selectedLabel]);
+
+    useEffect(() => {
+        if (!isOpen || text.trim().length < 2) {
+            setResults([]);
+            return;
+        }
+        let cancelled = false;
+        // Espera a que se deje de escribir para no pedir una búsqueda por tecla
+        const timer = setTimeout(async () => {
+            try {
+                const rows = await searchRecords<T>(text, type, { limit: 20, management });
+                if (!cancelled) setResults(rows);
+            } catch (error) {
+                console.error("Error searching:", error);
+            }
+        }, 250);
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+        };
+    }, [text, isOpen, type, management]);
+
+    const select = (row: T) => {
+        setText(getLabel(row));
+        setIsOpen(false);
+        onChange(getValue(row), getLabel(row));
+    };
+
+    const clear = () => {
+        setText("");
+        setResults([]);
+        onChange(null, "");
+    };
+
+    return (
+        <div className="relative">
+            {label && <label className="block text-green-700 mb-1 text-sm font-medium">{label}</label>}
+            <div className="flex">
+                <input
+                    type="text"
+                    value={text}
+                    placeholder={placeholder}
+                    onChange={(e) => {
+                        setText(e.target.value);
+                        setIsOpen(true);
+                    }}
+                    onFocus={() => setIsOpen(true)}
+                    onBlur={() => setIsOpen(false)}
+                    className={className}
+                />
+                {value ? (
+                    <button type="button" onClick={clear} className="ml-1 px-2 text-gray-500 hover:text-gray-700">
+                        ×
+                    </button>
+                ) : null}
+            </div>
+            {isOpen && results.length > 0 && (
+                <ul className="absolute z-10 mt-1 w-full max-h-60 overflow-y-auto bg-white border border-green-300 rounded shadow">
+                    {results.map((row) => (
+                        <li
+                            key={getValue(row)}
+                            // Sin perder el foco: el blur cerraría la lista antes del clic
+                            onMouseDown={(e) => e.preventDefault()}
+                            onClick={() => select(row)}
+                            className="px-3 py-2 text-sm cursor-pointer hover:bg-green-50"
+                        >
+                            {getLabel(row)}
+                        </li>
+                    ))}
+                </ul>
+            )}
+            {error && <p className="text-red-500 text-sm mt-1">{error}</p>}
+        </div>
+    );
+};
+
+export default SearchSelectField;
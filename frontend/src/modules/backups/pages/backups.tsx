@@ -6,12 +6,36 @@ const apiBase = "http://127.0.0.1:8000/api/v1/services";
 const BackupsIndex = () => {
   const [loading, setLoading] = useState<string | null>(null);
 
+  // Los respaldos y restauraciones se ejecutan en segundo plano: consulta el job hasta que
+  // termine, a lo más POLL_MAX_ATTEMPTS veces (el job sigue en el servidor si se deja de esperar)
+  const POLL_INTERVAL_MS = 2000;
+  const POLL_MAX_ATTEMPTS = 900; // 30 minutos
+  const waitForJob = async (statusUrl: string) => {
+    for (let attempt = 0; attempt < POLL_MAX_ATTEMPTS; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+      let res: Response;
+      try {
+        res = await fetch(statusUrl);
+      } catch {
+        continue; // el servidor puede no responder durante una restauración
+      }
+      if (!res.ok) continue; // la base de datos puede no estar disponible durante una restauración
+      const job = await res.json();
+      if (job.status === "succeeded") return job.result;
+      if (job.status === "failed") throw new Error(job.error);
+    }
+    throw new Error(`the job is still running after ${(POLL_MAX_ATTEMPTS * POLL_INTERVAL_MS) / 60000} minutes; check ${statusUrl} later`);
+  };
+
   const callApi = async (url: string, options?: RequestInit, actionName?: string) => {
     try {
       setLoading(actionName || null);
       const res = await fetch(url, options);
       if (!res.ok) throw new Error(`Error ${res.status}: ${res.statusText}`);
-      const data = await res.json();
+      let data = await res.json();
+      if (res.status === 202 && data.status_url) {
+        data = await waitForJob(data.status_url);
+      }
       toast.success(`${actionName} completed successfully`);
       console.log(data);
     } catch (error: any) {
@@ -1,4 +1,4 @@
-import api from "../../../api";
+import api, { uploadInChunks } from "../../../api";
 import { CertificateFormData } from "../schemas/certificateSchemas";
 
 const API_URL = "management/certificate/";
@@ -18,7 +18,8 @@ export const createCertificate = async (data: CertificateFormData) => {
     formData.append('fk_management', data.fk_management.toString());
     formData.append('certificate_name', data.certificate_name);
     if (data.pdf) {
-        formData.append('pdf', data.pdf);
+        // El PDF va por fragmentos: se reanuda si la conexión falla
+        formData.append('pdf_upload', await uploadInChunks(data.pdf));
     }
 
     const response = await api.post(API_URL, formData, {
@@ -34,7 +35,8 @@ export const updateCertificate = async (id: number, data: CertificateFormData) =
     formData.append('fk_management', data.fk_management.toString());
     formData.append('certificate_name', data.certificate_name);
     if (data.pdf) {
-        formData.append('pdf', data.pdf);
+        // El PDF va por fragmentos: se reanuda si la conexión falla
+        formData.append('pdf_upload', await uploadInChunks(data.pdf));
     }
 
     const response = await api.put(`${API_URL}${id}/`, formData, {
@@ -38,6 +38,8 @@ export const AddLocationForm = () => {
                 state: "",
                 country: "Mexico",
                 phone_number: "",
+                latitude: "",
+                longitude: "",
             }
         },
         mode: "onTouched"
@@ -103,6 +105,8 @@ export const AddLocationForm = () => {
                     ...data.fk_location,
                     interior_number: data.fk_location.interior_number === "" ? null : data.fk_location.interior_number,
                     postcode: data.fk_location.postcode === "" ? null : data.fk_location.postcode,
+                    latitude: data.fk_location.latitude ? Number(data.fk_location.latitude) : null,
+                    longitude: data.fk_location.longitude ? Number(data.fk_location.longitude) : null,
                 }
             };
 
@@ -236,6 +240,20 @@ export const AddLocationForm = () => {
                         label="País *"
                         placeholder="Ej: México"
                     />
+                    <FormInput
+                        name="fk_location.latitude"
+                        label="Latitud"
+                        placeholder="Ej: 25.6866"
+                        optional
+                        inputMode="decimal"
+                    />
+                    <FormInput
+                        name="fk_location.longitude"
+                        label="Longitud"
+                        placeholder="Ej: -100.3161"
+                        optional
+                        inputMode="decimal"
+                    />
                 </FormSection>
 
                 {/* Sección Contacto */}
@@ -7,7 +7,7 @@ interface FormInputProps {
     placeholder?: string;
     optional?: boolean;
     disabled?: boolean;
-    inputMode?: "text" | "numeric" | "tel" | "email";
+    inputMode?: "text" | "numeric" | "decimal" | "tel" | "email";
 }
 
 export const FormInput = ({
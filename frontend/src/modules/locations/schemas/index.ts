@@ -44,23 +44,43 @@ export const locationSchema = z.object({
     phone_number: z.string()
         .min(7, "El teléfono debe tener al menos 7 caracteres")
         .max(20, "El teléfono no puede exceder 20 caracteres")
-        .regex(/^[0-9+]+$/, "Solo se permiten números y el signo +")
-});
+        .regex(/^[0-9+]+$/, "Solo se permiten números y el signo +"),
+
+    // Coordenadas opcionales (grados decimales); habilitan las búsquedas por cercanía
+    latitude: z.string()
+        .regex(/^-?\d{1,2}(\.\d+)?$/, "La latitud debe estar en grados decimales (Ej: 25.6866)")
+        .refine(value => Math.abs(Number(value)) <= 90, "La latitud debe estar entre -90 y 90")
+        .optional()
+        .or(z.literal("")),
+
+    longitude: z.string()
+        .regex(/^-?\d{1,3}(\.\d+)?$/, "La longitud debe estar en grados decimales (Ej: -100.3161)")
+        .refine(value => Math.abs(Number(value)) <= 180, "La longitud debe estar entre -180 y 180")
+        .optional()
+        .or(z.literal(""))
+}).refine(
+    data => !data.latitude === !data.longitude,
+    { message: "La latitud y la longitud van juntas", path: ["longitude"] }
+);
 
 // Tipo para los datos del formulario (siempre strings)
 export type LocationFormData = z.infer<typeof locationSchema>;
 
 // Tipo para los datos recibidos del API (pueden ser números)
-type LocationApiData = Omit<LocationFormData, 'exterior_number' | 'interior_number'> & {
+type LocationApiData = Omit<LocationFormData, 'exterior_number' | 'interior_number' | 'latitude' | 'longitude'> & {
     exterior_number: string | number;
     interior_number?: string | number;
+    latitude?: number | null;
+    longitude?: number | null;
 };
 
 // Función para transformar datos del API al formato del formulario
 export const transformLocationData = (data: LocationApiData): LocationFormData => ({
     ...data,
     exterior_number: String(data.exterior_number),
-    interior_number: data.interior_number ? String(data.interior_number) : undefined
+    interior_number: data.interior_number ? String(data.interior_number) : undefined,
+    latitude: data.latitude != null ? String(data.latitude) : "",
+    longitude: data.longitude != null ? String(data.longitude) : ""
 });
 
 export const managementLocationSchema = z.object({
@@ -10,6 +10,8 @@ export interface Location {
     city: string;
     state: string;
     phone_number?: string;
+    latitude?: number | null;
+    longitude?: number | null;
     created_at: string;
     is_active: boolean;
 }
@@ -83,6 +85,8 @@ export interface LocationAPI {
     state: string;
     city: string;
     phone_number: string;
+    latitude: number | null;
+    longitude: number | null;
     created_at: string;
     updated_at: string;
     is_active: boolean;
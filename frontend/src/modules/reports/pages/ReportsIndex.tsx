@@ -3,18 +3,22 @@ import { useForm } from "react-hook-form";
 import { zodResolver } from "@hookform/resolvers/zod";
 import { toast } from "react-toastify";
 import { ServiceLogFormData, serviceLogSchema } from "../schemas/serviceLogSchema";
-import { getServiceLogs, getServiceLog, createServiceLog, updateServiceLog, deleteServiceLog, ServiceLog, ServiceLogFormPayload, } from "../services/serviceLogService";
-import { getServices, getClients, getStatuses, getCollectors, Service, Client, Status, User } from "../services/filtersService";
+import { getServiceLogs, getMoreServiceLogs, getServiceLog, createServiceLog, updateServiceLog, deleteServiceLog, ServiceLog, ServiceLogFormPayload, } from "../services/serviceLogService";
+import { getStatuses, getCollectors, Service, Client, Status, User } from "../services/filtersService";
 import ServiceLogTable from "../components/ServiceLogTable";
+import SearchSelectField from "../../../components/form/SearchSelectField";
 import { useAuth } from "../../../context/AuthContext";
 import { handleApiError } from "../../../components/handleApiError";
 
 const ReportsIndex = () => {
   const [serviceLogs, setServiceLogs] = useState<ServiceLog[]>([]);
-  const [services, setServices] = useState<Service[]>([]);
+  // Cursor de la siguiente página de bitácoras (null: no hay más)
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [users, setUsers] = useState<User[]>([]);
-  const [clients, setClients] = useState<Client[]>([]);
   const [statuses, setStatuses] = useState<Status[]>([]);
+  // Texto de los servicios y clientes elegidos en los buscadores
+  const [labels, setLabels] = useState({ service_id: '', client_id: '', fk_services: '' });
   const [isEditing, setIsEditing] = useState(false);
   const [currentId, setCurrentId] = useState<number | null>(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -27,11 +31,16 @@ const ReportsIndex = () => {
     register,
     handleSubmit,
     reset,
+    setValue,
+    watch,
     formState: { errors },
   } = useForm<ServiceLogFormData>({
     resolver: zodResolver(serviceLogSchema),
   });
 
+  const serviceLabel = (service: { service_number: string; scheduled_date: string }) =>
+    `#${service.service_number} - ${service.scheduled_date}`;
+
   useEffect(() => {
     fetchData();
     fetchRelatedData();
@@ -47,8 +56,9 @@ const ReportsIndex = () => {
       if (filters.status_id) filterParams.status_id = parseInt(filters.status_id);
       if (filters.selected_date) filterParams.selected_date = filters.selected_date;
       
-      const data = await getServiceLogs(filterParams);
-      setServiceLogs(data);
+      const page = await getServiceLogs(filterParams);
+      setServiceLogs(page.results);
+      setNextPage(page.next);
     } catch (error) {
       toast.error("Error al cargar bitácoras de servicio");
     } finally {
@@ -56,26 +66,37 @@ const ReportsIndex = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPage) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await getMoreServiceLogs(nextPage);
+      setServiceLogs(current => [...current, ...page.results]);
+      setNextPage(page.next);
+    } catch (error) {
+      toast.error("Error al cargar bitácoras de servicio");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const fetchRelatedData = async () => {
     try {
-      // Obtener datos reales de la base de datos
-      const [servicesData, clientsData, statusesData, collectorsData] = await Promise.all([
-        getServices(),
-        getClients(),
+      // Servicios y clientes no se descargan: se buscan al escribir en su filtro
+      const [statusesData, collectorsData] = await Promise.all([
         getStatuses(),
         getCollectors()
       ]);
 
-      setServices(servicesData);
-      setClients(clientsData);
       setStatuses(statusesData);
-      setUsers(collectorsData);
+      setUsers(collectorsData.items);
+      if (!collectorsData.complete) {
+        toast.warning(`Solo se muestran los primeros ${collectorsData.items.length} recolectores`);
+      }
       
       console.log('Datos cargados:', {
-        services: servicesData.length,
-        clients: clientsData.length,
         statuses: statusesData.length,
-        collectors: collectorsData.length
+        collectors: collectorsData.items.length
       });
     } catch (error) {
       console.error("Error fetching related data:", error);
@@ -117,6 +138,10 @@ const ReportsIndex = () => {
         fk_services: serviceLog.fk_services?.pk_services || 0,
         fk_user: serviceLog.fk_user?.id || 0,
       });
+      setLabels(prev => ({
+        ...prev,
+        fk_services: serviceLog.fk_services ? serviceLabel(serviceLog.fk_services) : '',
+      }));
       setIsEditing(true);
       setCurrentId(id);
       setShowForm(true);
@@ -139,6 +164,7 @@ const ReportsIndex = () => {
 
   const resetForm = () => {
     reset();
+    setLabels(prev => ({ ...prev, fk_services: '' }));
     setIsEditing(false);
     setCurrentId(null);
     setShowForm(false);
@@ -149,6 +175,11 @@ const ReportsIndex = () => {
     setFilters(prev => ({ ...prev, [name]: value }));
   };
 
+  const handleSearchFilterChange = (name: 'service_id' | 'client_id', value: number | null, label: string) => {
+    setFilters(prev => ({ ...prev, [name]: value ? String(value) : '' }));
+    setLabels(prev => ({ ...prev, [name]: label }));
+  };
+
   const applyFilters = () => {
     fetchData();
   };
@@ -170,6 +201,7 @@ const ReportsIndex = () => {
       status_id: '', 
       selected_date: '', // Solo una fecha
     });
+    setLabels(prev => ({ ...prev, service_id: '', client_id: '' }));
     setTimeout(() => {
       fetchData();
     }, 100);
@@ -228,20 +260,16 @@ const ReportsIndex = () => {
 
           {/* Filtro por Cliente */}
           <div>
-            <label className="block text-green-700 mb-1 text-sm font-medium">Cliente</label>
-            <select
-              name="client_id"
-              value={filters.client_id}
-              onChange={handleFilterChange}
-              className="w-full p-2 text-sm border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500"
-            >
-              <option value="">Todos los clientes</option>
-              {clients.map((client) => (
-                <option key={client.pk_client} value={client.pk_client}>
-                  {client.name}
-                </option>
-              ))}
-            </select>
+            <SearchSelectField<Client>
+              type="clients"
+              label="Cliente"
+              placeholder="Todos los clientes"
+              value={filters.client_id ? Number(filters.client_id) : null}
+              selectedLabel={labels.client_id}
+              getValue={(client) => client.pk_client}
+              getLabel={(client) => client.name}
+              onChange={(value, label) => handleSearchFilterChange('client_id', value, label)}
+            />
           </div>
 
           {/* Filtro por Estado */}
@@ -264,20 +292,16 @@ const ReportsIndex = () => {
 
           {/* Filtro por Servicio */}
           <div>
-            <label className="block text-green-700 mb-1 text-sm font-medium">Servicio</label>
-            <select
-              name="service_id"
-              value={filters.service_id}
-              onChange={handleFilterChange}
-              className="w-full p-2 text-sm border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500"
-            >
-              <option value="">Todos los servicios</option>
-              {services.map((service) => (
-                <option key={service.pk_services} value={service.pk_services}>
-                  #{service.service_number} - {service.fk_clients?.name}
-                </option>
-              ))}
-            </select>
+            <SearchSelectField<Service>
+              type="services"
+              label="Servicio"
+              placeholder="Todos los servicios (buscar por número)"
+              value={filters.service_id ? Number(filters.service_id) : null}
+              selectedLabel={labels.service_id}
+              getValue={(service) => service.pk_services}
+              getLabel={serviceLabel}
+              onChange={(value, label) => handleSearchFilterChange('service_id', value, label)}
+            />
           </div>
           
           {/* Filtro por Recolector */}
@@ -327,20 +351,20 @@ const ReportsIndex = () => {
               {/* Servicio */}
               <div>
                 <label className="block text-green-700 mb-1">Servicio</label>
-                <select
-                  {...register("fk_services", { valueAsNumber: true })}
+                <SearchSelectField<Service>
+                  type="services"
+                  placeholder="Buscar servicio por número"
+                  value={watch("fk_services")}
+                  selectedLabel={labels.fk_services}
+                  getValue={(service) => service.pk_services}
+                  getLabel={serviceLabel}
+                  onChange={(value, label) => {
+                    setValue("fk_services", value ?? (undefined as any), { shouldValidate: true });
+                    setLabels(prev => ({ ...prev, fk_services: label }));
+                  }}
+                  error={errors.fk_services?.message}
                   className="w-full p-2 border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500"
-                >
-                  <option value="">Seleccionar servicio</option>
-                  {services.map((service) => (
-                    <option key={service.pk_services} value={service.pk_services}>
-                      #{service.service_number} - {service.fk_clients?.name}
-                    </option>
-                  ))}
-                </select>
-                {errors.fk_services && (
-                  <p className="text-red-500 text-sm mt-1">{errors.fk_services.message}</p>
-                )}
+                />
               </div>
 
               {/* Recolector */}
@@ -404,6 +428,19 @@ const ReportsIndex = () => {
         onDelete={handleDelete}
         isLoading={isLoading}
       />
+
+      {/* Las bitácoras se piden por páginas; la siguiente solo al pedirla */}
+      {nextPage && !isLoading && (
+        <div className="flex justify-center mt-4">
+          <button
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="bg-green-600 text-white px-6 py-2 rounded hover:bg-green-700 transition-colors duration-200 disabled:opacity-50"
+          >
+            {isLoadingMore ? "Cargando..." : "Cargar más"}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
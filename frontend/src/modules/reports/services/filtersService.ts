@@ -1,20 +1,19 @@
-import api from '../../../api';
+import api, { Catalog, getCatalog } from '../../../api';
 
 // Interfaces para los datos de filtros
+// Servicios y clientes vienen de la búsqueda (core/search/), no de un listado completo
 export interface Service {
   pk_services: number;
   service_number: string;
-  fk_clients?: {
-    pk_client: number;
-    name: string;
-    legal_name: string;
-  };
+  scheduled_date: string;
+  fk_clients_id: number;
 }
 
 export interface Client {
   pk_client: number;
   name: string;
   legal_name: string;
+  rfc?: string;
 }
 
 export interface Status {
@@ -33,22 +32,11 @@ export interface User {
 }
 
 // Servicios para obtener datos de filtros
-export const getServices = async (): Promise<Service[]> => {
-  const response = await api.get('services/services/');
-  return response.data;
-};
-
-export const getClients = async (): Promise<Client[]> => {
-  const response = await api.get('client/client/');
-  return response.data;
-};
-
 export const getStatuses = async (): Promise<Status[]> => {
   const response = await api.get('services/status/');
   return response.data;
 };
 
-export const getCollectors = async (): Promise<User[]> => {
-  const response = await api.get('accounts/auth/users/?role=collector');
-  return response.data;
+export const getCollectors = async (): Promise<Catalog<User>> => {
+  return getCatalog<User>('accounts/auth/users/?role=collector');
 };
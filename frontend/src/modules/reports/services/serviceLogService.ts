@@ -1,4 +1,4 @@
-import api from '../../../api';
+import api, { getPage, Page } from '../../../api';
 
 export interface ServiceLog {
   pk_service_log: number;
@@ -48,7 +48,7 @@ export const getServiceLogs = async (filters?: {
   client_id?: number; 
   status_id?: number; 
   selected_date?: string; // Cambio: solo una fecha
-}): Promise<ServiceLog[]> => {
+}, pageSize = 50): Promise<Page<ServiceLog>> => {
   const params = new URLSearchParams();
   if (filters?.service_id) params.append('service_id', filters.service_id.toString());
   if (filters?.user_id) params.append('user_id', filters.user_id.toString());
@@ -56,8 +56,11 @@ export const getServiceLogs = async (filters?: {
   if (filters?.status_id) params.append('status_id', filters.status_id.toString());
   if (filters?.selected_date) params.append('selected_date', filters.selected_date);
   
-  const response = await api.get(`services/service-logs/?${params.toString()}`);
-  return response.data;
+  return getPage<ServiceLog>(`services/service-logs/?${params.toString()}`, pageSize);
+};
+
+export const getMoreServiceLogs = async (next: string): Promise<Page<ServiceLog>> => {
+  return getPage<ServiceLog>(next);
 };
 
 export const getServiceLog = async (id: number): Promise<ServiceLog> => {
@@ -78,3 +81,29 @@ export const updateServiceLog = async (id: number, data: ServiceLogFormPayload):
 export const deleteServiceLog = async (id: number): Promise<void> => {
   await api.delete(`services/service-logs/${id}/`);
 };
+
+export interface WasteTotalsRow {
+  waste_amount: string;
+  logs: number;
+}
+
+export interface WasteTotals {
+  interval: 'day' | 'week' | 'month';
+  totals: WasteTotalsRow;
+  series: (WasteTotalsRow & { period: string })[];
+  by_waste: (WasteTotalsRow & { fk_waste: number; waste_name: string })[];
+}
+
+// Totales precalculados en el backend (tabla WasteRollup), sin descargar la bitácora completa
+export const getWasteTotals = async (filters: {
+  management?: number;
+  client?: number;
+  waste?: number;
+  subcategory?: number;
+  date_from?: string;
+  date_to?: string;
+  interval?: 'day' | 'week' | 'month';
+}): Promise<WasteTotals> => {
+  const response = await api.get('services/waste-totals/', { params: filters });
+  return response.data;
+};
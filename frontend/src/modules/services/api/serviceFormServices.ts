@@ -1,4 +1,4 @@
-import api from '../../../api';
+import api, { Catalog, getCatalog } from '../../../api';
 
 // Interfaces para los datos del formulario de servicios
 export interface Client {
@@ -44,15 +44,16 @@ export interface WasteSubcategory {
   };
 }
 
-// Servicios para obtener datos para el formulario de servicios
-export const getClientsForForm = async (): Promise<Client[]> => {
-  const response = await api.get('client/client/');
-  return response.data;
-};
-
-export const getLocationsForForm = async (): Promise<Location[]> => {
-  const response = await api.get('core/locations/');
-  return response.data;
+// Ubicaciones de un cliente, para el formulario cuando los clientes se buscan en el servidor
+export const getClientLocations = async (clientId: number): Promise<Location[]> => {
+  const response = await api.get(`client/${clientId}/locations/list/`);
+  return response.data.locations.map((clientLocation: any) => ({
+    pk_location: clientLocation.fk_location.pk_location,
+    name: clientLocation.fk_location.name,
+    city: clientLocation.fk_location.city,
+    state: clientLocation.fk_location.state,
+    client_ids: [clientId]
+  }));
 };
 
 // Nueva función para obtener ubicaciones con información de clientes para servicios
@@ -89,8 +90,7 @@ export const getLocationsForServices = async (managementId: number): Promise<Loc
     return Array.from(locationMap.values());
   } catch (error) {
     console.error('Error fetching locations for services:', error);
-    // Fallback al endpoint original sin client_ids
-    return getLocationsForForm();
+    throw error;
   }
 };
 
@@ -104,9 +104,8 @@ export const getTypeServicesForForm = async (): Promise<TypeService[]> => {
   return response.data;
 };
 
-export const getWastesForForm = async (): Promise<Waste[]> => {
-  const response = await api.get('waste/waste/');
-  return response.data;
+export const getWastesForForm = async (): Promise<Catalog<Waste>> => {
+  return getCatalog<Waste>('waste/waste/');
 };
 
 export const getWasteSubcategoriesForForm = async (): Promise<WasteSubcategory[]> => {
@@ -114,12 +113,37 @@ export const getWasteSubcategoriesForForm = async (): Promise<WasteSubcategory[]
   return response.data;
 };
 
+interface ServiceFormDataResponse {
+  clients: Client[];
+  locations: Location[];
+  statuses: Status[];
+  type_services: TypeService[];
+  wastes: Waste[];
+  waste_subcategories: WasteSubcategory[];
+}
+
 // Función para obtener todos los datos necesarios para el formulario
 export const getServiceFormData = async (managementId?: number) => {
   try {
-    const [clients, locations, statuses, typeServices, wastes, wasteSubcategories] = await Promise.all([
-      getClientsForForm(),
-      managementId ? getLocationsForServices(managementId) : getLocationsForForm(),
+    if (managementId) {
+      // Una sola petición con todo el catálogo de la gerencia (ubicaciones ya con client_ids)
+      const response = await api.get<ServiceFormDataResponse>(`services/management/${managementId}/form-data/`);
+      const data = response.data;
+      return {
+        clients: data.clients,
+        locations: data.locations,
+        statuses: data.statuses,
+        typeServices: data.type_services,
+        wastes: data.wastes,
+        wasteSubcategories: data.waste_subcategories,
+        searchClients: false,
+        wastesComplete: true
+      };
+    }
+
+    // Sin gerencia no se descargan todos los clientes: el formulario los busca en el
+    // servidor y pide las ubicaciones del cliente elegido
+    const [statuses, typeServices, wastes, wasteSubcategories] = await Promise.all([
       getStatusesForForm(),
       getTypeServicesForForm(),
       getWastesForForm(),
@@ -127,12 +151,14 @@ export const getServiceFormData = async (managementId?: number) => {
     ]);
 
     return {
-      clients,
-      locations,
+      clients: [] as Client[],
+      locations: [] as Location[],
       statuses,
       typeServices,
-      wastes,
-      wasteSubcategories
+      wastes: wastes.items,
+      wasteSubcategories,
+      searchClients: true,
+      wastesComplete: wastes.complete
     };
   } catch (error) {
     console.error('Error fetching service form data:', error);
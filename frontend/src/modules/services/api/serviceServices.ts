@@ -1,11 +1,32 @@
 import { ServiceFormData } from "../schemas/serviceSchema";
-import api from "../../../api";
+import api, { getPage, Page } from "../../../api";
 
 const API_URL = "services/services/";
 
-export const getServices = async () => {
-    const response = await api.get(API_URL);
-    return response.data;
+export interface ServiceFilters {
+    client?: number;
+    location?: number;
+    status?: number;
+    type?: number;
+    waste?: number;
+    subcategory?: number;
+    date_from?: string;
+    date_to?: string;
+    ordering?: string;
+}
+
+// Los filtros se aplican en el servidor; se pide una página y la siguiente con `next`
+export const getServices = async (filters: ServiceFilters = {}, pageSize = 50): Promise<Page<any>> => {
+    const params = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+        if (value !== undefined && value !== "") params.append(key, String(value));
+    });
+    const query = params.toString();
+    return getPage(query ? `${API_URL}?${query}` : API_URL, pageSize);
+};
+
+export const getMoreServices = async (next: string): Promise<Page<any>> => {
+    return getPage(next);
 };
 
 export const getService = async (id: number) => {
@@ -25,4 +46,36 @@ export const updateService = async (id: number, data: ServiceFormData) => {
 
 export const deleteService = async (id: number) => {
     await api.delete(`${API_URL}${id}/`);
-};
\ No newline at end of file
+};
+export interface BulkServicesResult {
+    created: number;
+    failed: number;
+    services: { index: number; pk_services: number; service_number: string; scheduled_date: string }[];
+    errors: { index: number; errors: Record<string, string[]> }[];
+}
+
+// Programa varios servicios en una sola petición; los inválidos vienen en `errors` por posición
+export const bulkCreateServices = async (services: ServiceFormData[]): Promise<BulkServicesResult> => {
+    const response = await api.post(`${API_URL}bulk/`, { services }, {
+        // 400 también trae el detalle por servicio
+        validateStatus: (status) => status === 201 || status === 400,
+    });
+    return response.data;
+};
+
+export interface BulkStatusResult {
+    status: number;
+    updated: number;
+    unchanged: number;
+    rejected: number[];
+    not_found?: number[];
+}
+
+// Cambia el estado de varios servicios (por ids o por filtro) con una sola petición
+export const bulkUpdateServiceStatus = async (
+    status: number,
+    selection: { ids: number[] } | { filter: { management?: number; client?: number; location?: number; status?: number; scheduled_date?: string } },
+): Promise<BulkStatusResult> => {
+    const response = await api.post(`${API_URL}bulk-status/`, { status, ...selection });
+    return response.data;
+};
@@ -1,7 +1,9 @@
 // src/components/Services/ServiceForm.tsx
-import React, { useMemo, useEffect } from "react";
+import React, { useMemo, useEffect, useState } from "react";
 import { UseFormReturn } from "react-hook-form";
 import { ServiceFormData } from "../schemas/serviceSchema";
+import { getClientLocations } from "../api/serviceFormServices";
+import SearchSelectField from "../../../components/form/SearchSelectField";
 
 interface ServiceFormProps {
     form: UseFormReturn<ServiceFormData>;
@@ -16,6 +18,10 @@ interface ServiceFormProps {
     onReset: () => void;
     selectedWaste?: number;
     isWasteCollectionService?: boolean;
+    // Sin catálogo completo de clientes: se buscan en el servidor
+    searchClients?: boolean;
+    clientLabel?: string;
+    onClientLabelChange?: (label: string) => void;
 }
 
 const ServiceForm: React.FC<ServiceFormProps> = ({
@@ -31,15 +37,43 @@ const ServiceForm: React.FC<ServiceFormProps> = ({
     onReset,
     selectedWaste,
     isWasteCollectionService = false,
+    searchClients = false,
+    clientLabel = "",
+    onClientLabelChange,
 }) => {
     const { register, handleSubmit, formState: { errors }, watch, setValue } = form;
 
     // Observar el cliente seleccionado
     const selectedClient = watch("fk_clients");
 
+    // Al buscar clientes no hay catálogo de ubicaciones: se piden las del cliente elegido
+    const [clientLocations, setClientLocations] = useState<{ client: number; items: any[] } | null>(null);
+
+    useEffect(() => {
+        if (!searchClients || !selectedClient) return;
+        let cancelled = false;
+        getClientLocations(selectedClient)
+            .then((items) => {
+                if (!cancelled) setClientLocations({ client: selectedClient, items });
+            })
+            .catch((error) => {
+                console.error("Error fetching client locations:", error);
+                if (!cancelled) setClientLocations({ client: selectedClient, items: [] });
+            });
+        return () => {
+            cancelled = true;
+        };
+    }, [searchClients, selectedClient]);
+
+    const isLoadingLocations = searchClients && !!selectedClient && clientLocations?.client !== selectedClient;
+
     // Filtrar ubicaciones basándose en el cliente seleccionado
     const filteredLocations = useMemo(() => {
-        if (!selectedClient || !locations) return [];
+        if (!selectedClient) return [];
+        if (searchClients) {
+            return clientLocations?.client === selectedClient ? clientLocations.items : [];
+        }
+        if (!locations) return [];
         
         // Filtrar ubicaciones que pertenecen al cliente seleccionado
         // Asumimos que las ubicaciones tienen una propiedad client_ids o similar
@@ -51,10 +85,12 @@ const ServiceForm: React.FC<ServiceFormProps> = ({
             // Fallback: si no hay client_ids, mostrar todas (comportamiento anterior)
             return true;
         });
-    }, [selectedClient, locations]);
+    }, [selectedClient, locations, searchClients, clientLocations]);
 
     // Limpiar ubicación seleccionada cuando cambie el cliente
     useEffect(() => {
+        // Mientras llegan las ubicaciones del cliente no se puede saber si la actual es suya
+        if (isLoadingLocations) return;
         const currentLocation = form.getValues("fk_locations");
         if (currentLocation && selectedClient) {
             // Verificar si la ubicación actual pertenece al nuevo cliente seleccionado
@@ -65,12 +101,15 @@ const ServiceForm: React.FC<ServiceFormProps> = ({
             // Si no pertenece, resetear la ubicación
             if (!locationBelongsToClient) {
                 setValue("fk_locations", "" as any);
+            } else if (searchClients) {
+                // Las opciones llegaron después del valor: se vuelve a aplicar al select
+                setValue("fk_locations", currentLocation);
             }
         } else if (!selectedClient) {
             // Si no hay cliente seleccionado, limpiar ubicación
             setValue("fk_locations", "" as any);
         }
-    }, [selectedClient, filteredLocations, form, setValue]);
+    }, [selectedClient, filteredLocations, isLoadingLocations, searchClients, form, setValue]);
 
     return (
         <div className="bg-white rounded-lg shadow-md p-6 mb-8 border border-green-200">
@@ -97,17 +136,33 @@ const ServiceForm: React.FC<ServiceFormProps> = ({
                     {/* Client */}
                     <div>
                         <label className="block text-green-700 mb-1">Cliente</label>
-                        <select
-                            {...register("fk_clients", { valueAsNumber: true })}
-                            className="w-full p-2 border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500"
-                        >
-                            <option value="">Seleccionar Cliente</option>
-                            {clients.map((client) => (
-                                <option key={client.pk_client} value={client.pk_client}>
-                                    {client.name} - {client.legal_name}
-                                </option>
-                            ))}
-                        </select>
+                        {searchClients ? (
+                            <SearchSelectField<any>
+                                type="clients"
+                                placeholder="Buscar cliente"
+                                value={selectedClient || null}
+                                selectedLabel={clientLabel}
+                                getValue={(client) => client.pk_client}
+                                getLabel={(client) => `${client.name} - ${client.legal_name}`}
+                                onChange={(value, label) => {
+                                    setValue("fk_clients", value ?? ("" as any), { shouldValidate: true });
+                                    onClientLabelChange?.(label);
+                                }}
+                                className="w-full p-2 border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500"
+                            />
+                        ) : (
+                            <select
+                                {...register("fk_clients", { valueAsNumber: true })}
+                                className="w-full p-2 border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500"
+                            >
+                                <option value="">Seleccionar Cliente</option>
+                                {clients.map((client) => (
+                                    <option key={client.pk_client} value={client.pk_client}>
+                                        {client.name} - {client.legal_name}
+                                    </option>
+                                ))}
+                            </select>
+                        )}
                         {errors.fk_clients && (
                             <p className="text-red-500 text-sm mt-1">{errors.fk_clients.message}</p>
                         )}
@@ -119,10 +174,14 @@ const ServiceForm: React.FC<ServiceFormProps> = ({
                         <select
                             {...register("fk_locations", { valueAsNumber: true })}
                             className="w-full p-2 border border-green-300 rounded focus:ring-2 focus:ring-green-500 focus:border-green-500"
-                            disabled={!selectedClient}
+                            disabled={!selectedClient || isLoadingLocations}
                         >
                             <option value="">
-                                {!selectedClient ? "Primero selecciona un cliente" : "Seleccionar Ubicación"}
+                                {!selectedClient
+                                    ? "Primero selecciona un cliente"
+                                    : isLoadingLocations
+                                        ? "Cargando ubicaciones..."
+                                        : "Seleccionar Ubicación"}
                             </option>
                             {filteredLocations.map((location) => (
                                 <option key={location.pk_location} value={location.pk_location}>
@@ -6,10 +6,12 @@ import { useAuth } from "../../../context/AuthContext";
 import { ServiceFormData, serviceSchema } from "../schemas/serviceSchema";
 import {
   getServices,
+  getMoreServices,
   getService,
   createService,
   updateService,
   deleteService,
+  ServiceFilters,
 } from "../api/serviceServices";
 import { 
   getServiceFormData,
@@ -22,9 +24,13 @@ import {
 } from "../api/serviceFormServices";
 import ServiceForm from "../components/ServiceForm";
 import ServicesTable from "../components/ServiceTable";
+import SearchSelectField from "../../../components/form/SearchSelectField";
 
 const ServicesIndex = () => {
   const [services, setServices] = useState<any[]>([]);
+  // Cursor de la siguiente página de servicios (null: no hay más)
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [clients, setClients] = useState<Client[]>([]);
   const [locations, setLocations] = useState<Location[]>([]);
   const [statuses, setStatuses] = useState<Status[]>([]);
@@ -35,6 +41,11 @@ const ServicesIndex = () => {
   const [currentId, setCurrentId] = useState<number | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [defaultStatusId, setDefaultStatusId] = useState<number | null>(null);
+  const [filters, setFilters] = useState<ServiceFilters>({});
+  // Sin catálogo completo de clientes el formulario y el filtro los buscan en el servidor
+  const [searchClients, setSearchClients] = useState(false);
+  // Texto del cliente elegido en el formulario y en el filtro
+  const [labels, setLabels] = useState({ form: '', filter: '' });
 
   const { user } = useAuth();
 
@@ -62,10 +73,21 @@ const ServicesIndex = () => {
   };
 
   useEffect(() => {
-    fetchData();
     fetchFormData();
   }, []);
 
+  // Cada cambio de filtro vuelve a pedir la lista al servidor
+  useEffect(() => {
+    fetchData();
+  }, [filters]);
+
+  const updateFilter = (key: keyof ServiceFilters, value: string) => {
+    setFilters(current => ({
+      ...current,
+      [key]: value === "" ? undefined : key.startsWith("date_") ? value : Number(value),
+    }));
+  };
+
   // Resetear subcategoría cuando cambia el residuo seleccionado
   useEffect(() => {
     if (selectedWaste) {
@@ -112,6 +134,10 @@ const ServicesIndex = () => {
       setTypeServices(data.typeServices);
       setWastes(data.wastes);
       setWasteSubcategories(data.wasteSubcategories);
+      setSearchClients(data.searchClients);
+      if (!data.wastesComplete) {
+        toast.warning(`Solo se muestran los primeros ${data.wastes.length} residuos`);
+      }
 
       // Buscar el estado "En progreso" para establecerlo como default
       const inProgressStatus = data.statuses.find(status => 
@@ -143,8 +169,9 @@ const ServicesIndex = () => {
   const fetchData = async () => {
     setIsLoading(true);
     try {
-      const data = await getServices();
-      setServices(data);
+      const page = await getServices(filters);
+      setServices(page.results);
+      setNextPage(page.next);
     } catch (error) {
       showErrorToast("Error fetching services");
     } finally {
@@ -152,6 +179,20 @@ const ServicesIndex = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPage) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await getMoreServices(nextPage);
+      setServices(current => [...current, ...page.results]);
+      setNextPage(page.next);
+    } catch (error) {
+      showErrorToast("Error fetching services");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Función para mostrar toasts de éxito
   const showSuccessToast = (message: string) => {
     toast.success(message, {
@@ -229,6 +270,7 @@ const ServicesIndex = () => {
         fk_waste_subcategory: service.fk_waste_subcategory?.pk_waste_subcategory,
       };
       form.reset(formData);
+      setLabels(prev => ({ ...prev, form: `${service.fk_clients.name} - ${service.fk_clients.legal_name}` }));
       setIsEditing(true);
       setCurrentId(id);
     } catch (error) {
@@ -282,6 +324,7 @@ const ServicesIndex = () => {
 
   const resetForm = () => {
     form.reset();
+    setLabels(prev => ({ ...prev, form: '' }));
     setIsEditing(false);
     setCurrentId(null);
   };
@@ -304,14 +347,91 @@ const ServicesIndex = () => {
           onReset={resetForm}
           selectedWaste={selectedWaste}
           isWasteCollectionService={isWasteCollectionService()}
+          searchClients={searchClients}
+          clientLabel={labels.form}
+          onClientLabelChange={(label) => setLabels(prev => ({ ...prev, form: label }))}
         />
 
+        <div className="bg-white rounded-lg shadow p-4 mb-6 grid grid-cols-1 md:grid-cols-5 gap-4">
+          {searchClients ? (
+            <SearchSelectField<Client>
+              type="clients"
+              placeholder="Todos los clientes"
+              value={filters.client ?? null}
+              selectedLabel={labels.filter}
+              getValue={(client) => client.pk_client}
+              getLabel={(client) => client.name}
+              onChange={(value, label) => {
+                updateFilter("client", value ? String(value) : "");
+                setLabels(prev => ({ ...prev, filter: label }));
+              }}
+              className="w-full border rounded px-3 py-2"
+            />
+          ) : (
+            <select
+              value={filters.client ?? ""}
+              onChange={(e) => updateFilter("client", e.target.value)}
+              className="border rounded px-3 py-2"
+            >
+              <option value="">Todos los clientes</option>
+              {clients.map(client => (
+                <option key={client.pk_client} value={client.pk_client}>{client.name}</option>
+              ))}
+            </select>
+          )}
+          <select
+            value={filters.status ?? ""}
+            onChange={(e) => updateFilter("status", e.target.value)}
+            className="border rounded px-3 py-2"
+          >
+            <option value="">Todos los estados</option>
+            {statuses.map(status => (
+              <option key={status.pk_status} value={status.pk_status}>{status.name}</option>
+            ))}
+          </select>
+          <select
+            value={filters.waste ?? ""}
+            onChange={(e) => updateFilter("waste", e.target.value)}
+            className="border rounded px-3 py-2"
+          >
+            <option value="">Todos los residuos</option>
+            {wastes.map(waste => (
+              <option key={waste.pk_waste} value={waste.pk_waste}>{waste.name}</option>
+            ))}
+          </select>
+          <input
+            type="date"
+            value={filters.date_from ?? ""}
+            onChange={(e) => updateFilter("date_from", e.target.value)}
+            className="border rounded px-3 py-2"
+          />
+          <input
+            type="date"
+            value={filters.date_to ?? ""}
+            onChange={(e) => updateFilter("date_to", e.target.value)}
+            className="border rounded px-3 py-2"
+          />
+        </div>
+
         <ServicesTable
           services={services}
           isLoading={isLoading}
           onEdit={handleEdit}
           onDelete={handleDelete}
         />
+
+        {/* Los servicios se piden por páginas; la siguiente solo al pedirla */}
+        {nextPage && !isLoading && (
+          <div className="flex justify-center mt-4">
+            <button
+              onClick={loadMore}
+              disabled={isLoadingMore}
+              className="bg-green-600 text-white px-6 py-2 rounded hover:bg-green-700 transition-colors duration-200 disabled:opacity-50"
+            >
+              {isLoadingMore ? "Cargando..." : "Cargar más"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -45,8 +45,11 @@ const WasteSubcategoryIndex = () => {
 
   const fetchWastes = async () => {
     try {
-      const data = await getWastes();
-      setWastes(data);
+      const { items, complete } = await getWastes();
+      setWastes(items);
+      if (!complete) {
+        toast.warning(`Solo se muestran los primeros ${items.length} residuos`);
+      }
     } catch (error) {
       toast.error('Error al cargar residuos');
     }
@@ -1,4 +1,4 @@
-import api from '../../../api';
+import api, { Catalog, getCatalog } from '../../../api';
 
 // Interfaces
 export interface WasteSubcategory {
@@ -52,7 +52,6 @@ export const deleteWasteSubcategory = async (id: number): Promise<void> => {
 };
 
 // Servicio para obtener residuos (para el dropdown)
-export const getWastes = async (): Promise<Waste[]> => {
-  const response = await api.get('waste/waste/');
-  return response.data;
+export const getWastes = async (): Promise<Catalog<Waste>> => {
+  return getCatalog<Waste>('waste/waste/');
 };